@@ -0,0 +1,29 @@
+import http from "k6/http";
+import { check, sleep } from "k6";
+
+// Mesmo perfil de k6.js, em /health e /ledger/accounts/me (token em TOKEN).
+// Rode uma vez por versao do middleware e compare http_reqs/s e p(99) de cada rota.
+const BASE_URL = __ENV.BASE_URL || "http://localhost:8000";
+const TOKEN = __ENV.TOKEN || "";
+
+export const options = {
+  stages: [
+    { duration: "10s", target: 200 },
+    { duration: "20s", target: 1000 },
+    { duration: "10s", target: 0 }
+  ],
+  summaryTrendStats: ["avg", "p(50)", "p(95)", "p(99)", "max"]
+};
+
+export default function () {
+  const health = http.get(`${BASE_URL}/health`, { tags: { route: "health" } });
+  check(health, { "health 200": (r) => r.status === 200 });
+  if (TOKEN) {
+    const me = http.get(`${BASE_URL}/ledger/accounts/me`, {
+      headers: { Authorization: `Bearer ${TOKEN}` },
+      tags: { route: "accounts_me" }
+    });
+    check(me, { "accounts/me 200": (r) => r.status === 200 });
+  }
+  sleep(1);
+}
@@ -0,0 +1,251 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import numpy as np
+from sqlalchemy import event, func, insert, select
+
+from src.domain.fraud import ml
+from src.domain.fraud.engine import FraudEngine
+from src.domain.fraud.features import feature_store
+from src.domain.fraud.graph import transfer_graph
+from src.domain.ledger import models as ledger_models
+from src.domain.security import models as security_models
+from src.infra.database import async_engine, async_session, init_db
+
+STAGES = ("build_features", "rule_score", "score_models", "total")
+IP_POOL = ["10.0.0.1", "10.0.0.2", "177.10.20.30", "189.1.2.3", "203.0.113.7", "198.51.100.9"]
+
+
+def _summary(samples: list[float]) -> dict:
+    values = np.array(samples, dtype=float) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(values, 50)), 4),
+        "p95_ms": round(float(np.percentile(values, 95)), 4),
+        "p99_ms": round(float(np.percentile(values, 99)), 4),
+        "mean_ms": round(float(values.mean()), 4),
+    }
+
+
+async def _seed(accounts: int, transactions: int, days: int, seed: int) -> dict:
+    """Popula usuarios, contas, transferencias (com postings) e sessoes com insercoes em lote."""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    now = datetime.utcnow()
+    tag = f"{int(now.timestamp())}{seed}"
+    async with async_session() as db:
+        base_user = int((await db.execute(select(func.coalesce(func.max(ledger_models.User.id), 0)))).scalar())
+        base_account = int((await db.execute(select(func.coalesce(func.max(ledger_models.Account.id), 0)))).scalar())
+        base_tx = int((await db.execute(select(func.coalesce(func.max(ledger_models.Transaction.id), 0)))).scalar())
+
+        users = []
+        account_rows = []
+        sessions = []
+        for i in range(accounts):
+            user_id = base_user + i + 1
+            created_at = now - timedelta(days=rng.randint(1, 900))
+            users.append({
+                "id": user_id,
+                "name": f"Bench {i}",
+                "cpf": f"bench-{tag}-{i}",
+                "email": f"bench-{tag}-{i}@bench.local",
+                "hashed_password": "x",
+                "created_at": created_at,
+            })
+            account_rows.append({
+                "id": base_account + i + 1,
+                "account_number": f"B{tag}{i}",
+                "balance": Decimal("0"),
+                "user_id": user_id,
+                "created_at": created_at,
+            })
+            for j in range(rng.randint(1, 3)):
+                sessions.append({
+                    "user_id": user_id,
+                    "jti": f"bench-{tag}-{i}-{j}",
+                    "ip_address": rng.choice(IP_POOL),
+                    "created_at": now - timedelta(hours=rng.uniform(0, 48)),
+                })
+        await db.execute(insert(ledger_models.User), users)
+        await db.execute(insert(ledger_models.Account), account_rows)
+        await db.execute(insert(security_models.Session), sessions)
+
+        balances = {row["id"]: Decimal("0") for row in account_rows}
+        txs = []
+        postings = []
+        window = days * 86400
+        for k in range(transactions):
+            tx_id = base_tx + k + 1
+            payer = rng.choice(account_rows)["id"]
+            payee = rng.choice(account_rows)["id"]
+            while payee == payer and accounts > 1:
+                payee = rng.choice(account_rows)["id"]
+            amount = Decimal(str(round(rng.lognormvariate(4, 1.2), 2)))
+            timestamp = now - timedelta(seconds=window * (1 - k / max(1, transactions)))
+            txs.append({
+                "id": tx_id,
+                "idempotency_key": f"bench-{tag}-{k}",
+                "amount": amount,
+                "operation_type": "TRANSFER",
+                "timestamp": timestamp,
+                "account_id": payer,
+            })
+            postings.append({"transaction_id": tx_id, "account_id": payer, "amount": -amount, "timestamp": timestamp})
+            postings.append({"transaction_id": tx_id, "account_id": payee, "amount": amount, "timestamp": timestamp})
+            balances[payer] -= amount
+            balances[payee] += amount
+        for chunk in range(0, len(txs), 5000):
+            await db.execute(insert(ledger_models.Transaction), txs[chunk:chunk + 5000])
+        for chunk in range(0, len(postings), 10000):
+            await db.execute(insert(ledger_models.Posting), postings[chunk:chunk + 10000])
+        for account_id, balance in balances.items():
+            await db.execute(
+                ledger_models.Account.__table__.update()
+                .where(ledger_models.Account.id == account_id)
+                .values(balance=balance)
+            )
+        await db.commit()
+
+        # Mesmo aquecimento que um deploy faria: stores repopulados a partir do ledger
+        features = await feature_store.rebuild(db)
+        graph = await transfer_graph.rebuild(db)
+    return {
+        "accounts": accounts,
+        "transactions": transactions,
+        "sessions": len(sessions),
+        "features_rebuild": features,
+        "graph_rebuild": graph,
+        "duration_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+
+async def _synthetic_stream(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed + 1)
+    async with async_session() as db:
+        account_ids = list((await db.execute(select(ledger_models.Account.id))).scalars().all())
+    if not account_ids:
+        return []
+    return [
+        {
+            "account_id": rng.choice(account_ids),
+            "amount": round(rng.lognormvariate(4, 1.4), 2),
+            "ip": rng.choice(IP_POOL),
+            "user_agent": "Mozilla/5.0 (bench)",
+            "device_fingerprint": rng.choice([None, "fp-bench"]),
+        }
+        for _ in range(count)
+    ]
+
+
+def _load_stream(path: str) -> list[dict]:
+    # Uma requisicao por linha (JSON): account_id, amount, ip, user_agent, device_fingerprint
+    with open(path) as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+async def _replay(stream: list[dict], warmup: int) -> dict:
+    timings = {stage: [] for stage in STAGES}
+    queries = []
+    counter = {"n": 0}
+
+    def count_statement(conn, cursor, statement, parameters, context, executemany):
+        counter["n"] += 1
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_statement)
+    try:
+        async with async_session() as db:
+            for index, request in enumerate(stream):
+                counter["n"] = 0
+                t0 = time.perf_counter()
+                features, labels = await FraudEngine.build_features(
+                    db,
+                    request["account_id"],
+                    request["amount"],
+                    request.get("ip", "127.0.0.1"),
+                    request.get("user_agent", ""),
+                    request.get("device_fingerprint"),
+                )
+                t1 = time.perf_counter()
+                FraudEngine._rule_score(features, labels)
+                t2 = time.perf_counter()
+                ml.score_models(features)
+                t3 = time.perf_counter()
+                if index < warmup:
+                    continue
+                timings["build_features"].append(t1 - t0)
+                timings["rule_score"].append(t2 - t1)
+                timings["score_models"].append(t3 - t2)
+                timings["total"].append(t3 - t0)
+                queries.append(counter["n"])
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_statement)
+
+    if not queries:
+        return {"requests": 0}
+    return {
+        "requests": len(queries),
+        "stages": {stage: _summary(samples) for stage, samples in timings.items()},
+        "queries_per_request": {
+            "mean": round(float(np.mean(queries)), 2),
+            "p50": int(np.percentile(queries, 50)),
+            "max": int(max(queries)),
+        },
+    }
+
+
+async def _run(args) -> dict:
+    feature_store.backend = args.store
+    transfer_graph.backend = args.store
+    # init_db imprime progresso: mantem o stdout so com o JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        await init_db()
+    seeded = await _seed(args.accounts, args.transactions, args.days, args.seed) if args.accounts else None
+    stream = _load_stream(args.replay) if args.replay else await _synthetic_stream(args.requests + args.warmup, args.seed)
+    result = await _replay(stream, args.warmup)
+    async with async_session() as db:
+        history = int((await db.execute(select(func.count(ledger_models.Transaction.id)))).scalar())
+    return {
+        "benchmark": "fraud_scoring",
+        "started_at": datetime.utcnow().isoformat(),
+        "database": async_engine.url.get_backend_name(),
+        "store": args.store,
+        "model_version": ml.model_registry.get().version,
+        "history_transactions": history,
+        "seed": seeded,
+        **result,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Mede o custo por etapa do scoring de fraude (build_features, regras, modelos). "
+        "Use DATABASE_URL para apontar para um SQLite/Postgres local descartavel."
+    )
+    parser.add_argument("--accounts", type=int, default=1000, help="contas semeadas (0 = usa o banco como esta)")
+    parser.add_argument("--transactions", type=int, default=20000, help="transferencias semeadas no historico")
+    parser.add_argument("--days", type=int, default=7, help="janela em que o historico semeado e distribuido")
+    parser.add_argument("--requests", type=int, default=500, help="requisicoes sinteticas medidas")
+    parser.add_argument("--warmup", type=int, default=20, help="requisicoes iniciais descartadas")
+    parser.add_argument("--replay", default=None, help="arquivo JSONL com requisicoes gravadas (substitui as sinteticas)")
+    parser.add_argument("--store", choices=["memory", "redis"], default="memory", help="backend do feature store/grafo")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="grava o resultado JSON tambem neste arquivo")
+    args = parser.parse_args()
+
+    result = asyncio.run(_run(args))
+    payload = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
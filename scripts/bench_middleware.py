@@ -0,0 +1,273 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+
+import httpx
+import numpy as np
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from sqlalchemy import select, update
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Sem coletor OTLP o exportador de spans so adiciona ruido (e prende a saida do processo)
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from src.api import middleware as middleware_module  # noqa: E402
+from src.api.middleware import AuditMiddleware, MetricsMiddleware, RateLimitMiddleware, audit_record  # noqa: E402
+from src.core import security  # noqa: E402
+from src.core.config import settings  # noqa: E402
+from src.domain.ledger import models as ledger_models  # noqa: E402
+from src.domain.ledger.audit import HEAD_ID, audit_hash, audit_writer  # noqa: E402
+from src.domain.ledger.models import AuditChainHead, AuditLog  # noqa: E402
+from src.infra.cache import cache  # noqa: E402
+from src.infra.database import SessionLocal, async_session, init_db  # noqa: E402
+from src.infra.metrics import ERRORS, REQUEST_LATENCY  # noqa: E402
+from src.main import app  # noqa: E402
+
+ENDPOINTS = ("/health", "/ledger/accounts/me")
+
+
+async def sliding_window_allow(key: str, limit: int, window_seconds: int) -> bool:
+    """Rate limit da baseline (sorted set por IP, quatro comandos por requisicao)."""
+    try:
+        now_ms = int(time.time() * 1000)
+        pipe = cache.redis.pipeline()
+        pipe.zremrangebyscore(key, 0, now_ms - (window_seconds * 1000))
+        pipe.zadd(key, {str(now_ms): now_ms})
+        pipe.zcard(key)
+        pipe.expire(key, window_seconds)
+        _, _, count, _ = await pipe.execute()
+        return count <= limit
+    except Exception:
+        return not settings.STRICT_SECURITY
+
+
+def _save_audit_log_sync(record: dict):
+    """Insert sincrono da baseline: le o ultimo registro e grava o proximo, um commit por requisicao."""
+    with SessionLocal() as db:
+        last_hash = db.execute(select(AuditLog.record_hash).order_by(AuditLog.id.desc()).limit(1)).scalar()
+        prev_hash = last_hash or ""
+        db.add(AuditLog(**record, prev_hash=prev_hash, record_hash=audit_hash(record, prev_hash)))
+        db.commit()
+
+
+class LegacyLedgerMiddleware(BaseHTTPMiddleware):
+    """LedgerMiddleware anterior (BaseHTTPMiddleware monolitico), mantido so para comparacao.
+
+    Reproduz a baseline: rate limit por janela deslizante e audit log gravado na requisicao.
+    """
+
+    async def dispatch(self, request: Request, call_next):
+        xff = request.headers.get("x-forwarded-for", "")
+        ip = (xff.split(",")[0].strip() if xff else None) or (request.client.host if request.client else "unknown")
+        path = request.url.path
+        method = request.method.upper()
+        if method != "OPTIONS" and path not in middleware_module.EXCLUDED_PATHS:
+            limiter = middleware_module.global_rate_limiter
+            if not await sliding_window_allow(f"global:{ip}", limiter.limit, limiter.window_seconds):
+                return JSONResponse(status_code=429, content={"detail": "Global Rate Limit Exceeded."})
+        start = time.time()
+        try:
+            response = await call_next(request)
+        except Exception:
+            response = JSONResponse(status_code=500, content={"detail": "Erro interno"})
+        process_time = time.time() - start
+        REQUEST_LATENCY.labels(path=path, method=method, status=str(response.status_code)).observe(process_time)
+        if response.status_code >= 400:
+            ERRORS.labels(path=path, method=method, status=str(response.status_code)).inc()
+        if path not in middleware_module.EXCLUDED_PATHS:
+            try:
+                record = audit_record(request.scope, response.status_code, process_time)
+                await run_in_threadpool(_save_audit_log_sync, record)
+            except Exception:
+                pass
+        return response
+
+
+async def _sync_audit_head():
+    # Os inserts sincronos nao avancam o head do AuditWriter: alinha-o ao ultimo registro
+    # para que a variante seguinte continue a mesma cadeia
+    async with async_session() as db:
+        last_hash = (
+            await db.execute(select(AuditLog.record_hash).order_by(AuditLog.id.desc()).limit(1))
+        ).scalar()
+        await db.execute(
+            update(AuditChainHead).where(AuditChainHead.id == HEAD_ID).values(record_hash=last_hash or "")
+        )
+        await db.commit()
+    audit_writer._head = None
+
+
+def _k6_stages(path: str) -> list[tuple[float, int]]:
+    # Le `stages: [{ duration: "10s", target: 200 }, ...]` do perfil k6
+    with open(path) as fh:
+        source = fh.read()
+    return [
+        (float(duration), int(target))
+        for duration, target in re.findall(r'duration:\s*"(\d+(?:\.\d+)?)s"\s*,\s*target:\s*(\d+)', source)
+    ]
+
+
+def _use_middlewares(variant: str):
+    # Remonta a pilha do app (CORS continua por fora, como no main)
+    custom = {LegacyLedgerMiddleware, RateLimitMiddleware, AuditMiddleware, MetricsMiddleware}
+    base = [m for m in app.user_middleware if m.cls not in custom]
+    if variant == "legacy":
+        stack = [Middleware(LegacyLedgerMiddleware)]
+    else:
+        stack = [Middleware(RateLimitMiddleware), Middleware(AuditMiddleware), Middleware(MetricsMiddleware)]
+    app.user_middleware = base + stack
+    app.middleware_stack = None
+
+
+async def _seed_token() -> str:
+    tag = int(time.time() * 1000)
+    async with async_session() as db:
+        user = ledger_models.User(
+            name="Bench Middleware",
+            cpf=f"bench-mw-{tag}",
+            email=f"bench-mw-{tag}@bench.local",
+            hashed_password="x",
+        )
+        db.add(user)
+        await db.flush()
+        account = ledger_models.Account(account_number=f"MW{tag}", balance=Decimal("0"), user_id=user.id)
+        db.add(account)
+        await db.commit()
+        return security.create_access_token(user.id, account_id=account.id)
+
+
+async def _run_profile(client: httpx.AsyncClient, path: str, headers: dict, stages, think_ms: float) -> dict:
+    """Usuarios virtuais sobem/descem linearmente entre os alvos de cada estagio (como o k6)."""
+    latencies = []
+    statuses = {}
+    active: list[asyncio.Task] = []
+    stop_flags: list[dict] = []
+    spawned: list[asyncio.Task] = []
+
+    async def virtual_user(flag: dict):
+        while not flag["stop"]:
+            t0 = time.perf_counter()
+            response = await client.get(path, headers=headers)
+            latencies.append(time.perf_counter() - t0)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            await asyncio.sleep(think_ms / 1000.0)
+
+    started = time.perf_counter()
+    current = 0
+    for duration, target in stages:
+        stage_start = time.perf_counter()
+        begin = current
+        while (elapsed := time.perf_counter() - stage_start) < duration:
+            wanted = round(begin + (target - begin) * (elapsed / duration))
+            while len(active) < wanted:
+                flag = {"stop": False}
+                stop_flags.append(flag)
+                task = asyncio.create_task(virtual_user(flag))
+                active.append(task)
+                spawned.append(task)
+            while len(active) > wanted:
+                stop_flags.pop()["stop"] = True
+                active.pop()
+            await asyncio.sleep(0.05)
+        current = target
+    for flag in stop_flags:
+        flag["stop"] = True
+    # Espera as requisicoes em voo: nada vaza para a medicao seguinte
+    await asyncio.gather(*spawned)
+    total = time.perf_counter() - started
+
+    values = np.array(latencies) * 1000 if latencies else np.zeros(1)
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / total, 1),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+    }
+
+
+async def _run(args) -> dict:
+    stages = [(duration * args.scale, max(1, int(target * args.users_scale))) for duration, target in _k6_stages(args.profile)]
+    if not args.redis:
+        # Sem Redis local: rate limit, blacklist e cache (ping do /health, saldo) respondem na hora nas duas variantes
+        async def allow(identity):
+            return type("Decision", (), {"allowed": True, "remaining": 1, "retry_after": 0})()
+
+        async def not_blacklisted(jti):
+            return False
+
+        async def allow_window(key, limit, window_seconds):
+            return True
+
+        async def no_value(key, *args, **kwargs):
+            return None
+
+        middleware_module.global_rate_limiter.hit = allow
+        global sliding_window_allow
+        sliding_window_allow = allow_window
+        cache.is_jti_blacklisted = not_blacklisted
+        cache.get_value = no_value
+        cache.set_value = no_value
+    with contextlib.redirect_stdout(sys.stderr):
+        await init_db()
+    token = await _seed_token()
+
+    results = {}
+    for variant in args.variants.split(","):
+        _use_middlewares(variant)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            results[variant] = {}
+            for path in ENDPOINTS:
+                headers = {"Authorization": f"Bearer {token}"} if path != "/health" else {}
+                await client.get(path, headers=headers)
+                results[variant][path] = await _run_profile(client, path, headers, stages, args.think_ms)
+        await audit_writer.stop()
+        if variant == "legacy":
+            await _sync_audit_head()
+    return {
+        "benchmark": "api_middleware",
+        "started_at": datetime.utcnow().isoformat(),
+        "profile": args.profile,
+        "stages": stages,
+        "think_ms": args.think_ms,
+        "redis": args.redis,
+        "results": results,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compara o LedgerMiddleware (BaseHTTPMiddleware) com os middlewares ASGI puros em "
+        "/health e /ledger/accounts/me, seguindo os estagios do perfil k6, com o app em processo (httpx ASGI)."
+    )
+    parser.add_argument("--profile", default="loadtests/k6.js", help="perfil k6 de onde saem os estagios")
+    parser.add_argument("--scale", type=float, default=0.25, help="fator aplicado a duracao dos estagios")
+    parser.add_argument("--users-scale", type=float, default=0.1, help="fator aplicado aos usuarios virtuais")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pausa entre requisicoes de cada usuario (k6: 1000)")
+    parser.add_argument("--variants", default="legacy,asgi")
+    parser.add_argument("--redis", action="store_true", help="usa o Redis real no rate limit/blacklist")
+    parser.add_argument("--output", default=None, help="grava o resultado JSON tambem neste arquivo")
+    args = parser.parse_args()
+
+    result = asyncio.run(_run(args))
+    payload = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from datetime import datetime
+
+from src.domain.fraud.graph import TransferGraph
+
+
+def _full_scan_signals(rows: list[tuple[int, int, float]], account_id: int) -> dict:
+    """Algoritmo anterior do FraudEngine: remonta o grafo a partir de todos os postings da janela."""
+    edges = {}
+    tx_map = {}
+    for tx_id, acc_id, amount in rows:
+        tx_map.setdefault(tx_id, []).append((acc_id, amount))
+    for items in tx_map.values():
+        if len(items) < 2:
+            continue
+        from_acc = [acc for acc, amt in items if amt < 0]
+        to_acc = [acc for acc, amt in items if amt > 0]
+        if from_acc and to_acc:
+            edges.setdefault(from_acc[0], set()).add(to_acc[0])
+
+    cycle_found = False
+    for n1 in edges.get(account_id, []):
+        for n2 in edges.get(n1, []):
+            for n3 in edges.get(n2, []):
+                if account_id in edges.get(n3, set()):
+                    cycle_found = True
+                    break
+            if cycle_found:
+                break
+        if cycle_found:
+            break
+    out_degree = len(edges.get(account_id, set()))
+    in_degree = sum(1 for v in edges.values() if account_id in v)
+    return {"cycle": cycle_found, "mule": 1 if out_degree >= 5 and in_degree >= 5 else 0}
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _summary(samples: list[float]) -> dict:
+    return {
+        "p50_ms": round(_percentile(samples, 0.50) * 1000, 4),
+        "p99_ms": round(_percentile(samples, 0.99) * 1000, 4),
+    }
+
+
+async def _run(accounts: int, transfers: int, queries: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    pairs = []
+    for _ in range(transfers):
+        payer = rng.randrange(accounts)
+        payee = rng.randrange(accounts - 1)
+        pairs.append((payer, payee if payee < payer else payee + 1))
+    rows = []
+    for tx_id, (payer, payee) in enumerate(pairs):
+        rows.append((tx_id, payer, -1.0))
+        rows.append((tx_id, payee, 1.0))
+
+    graph = TransferGraph(backend="memory")
+    started = time.perf_counter()
+    await graph.record_many([(payer, payee, now) for payer, payee in pairs])
+    load_seconds = time.perf_counter() - started
+
+    targets = [rng.randrange(accounts) for _ in range(queries)]
+    full_scan = []
+    incremental = []
+    for account_id in targets:
+        started = time.perf_counter()
+        _full_scan_signals(rows, account_id)
+        full_scan.append(time.perf_counter() - started)
+        started = time.perf_counter()
+        await graph.signals(account_id, now=now)
+        incremental.append(time.perf_counter() - started)
+
+    return {
+        "accounts": accounts,
+        "transfers": transfers,
+        "queries": queries,
+        "graph_load_ms": round(load_seconds * 1000, 2),
+        "full_scan": _summary(full_scan),
+        "transfer_graph": _summary(incremental),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compara a varredura completa de postings com o grafo incremental de transferencias")
+    parser.add_argument("--accounts", type=int, default=20000)
+    parser.add_argument("--transfers", type=int, default=100000, help="transferencias na janela de 7 dias")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    result = asyncio.run(_run(args.accounts, args.transfers, args.queries, args.seed))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
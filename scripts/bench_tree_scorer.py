@@ -0,0 +1,113 @@
+import argparse
+import json
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+
+from src.domain.fraud.engine import FEATURE_LABELS
+from src.domain.fraud.trees import export_xgboost
+
+
+def _summary(samples: list[float]) -> dict:
+    values = np.array(samples, dtype=float) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(values, 50)), 2),
+        "p99_us": round(float(np.percentile(values, 99)), 2),
+        "mean_us": round(float(values.mean()), 2),
+    }
+
+
+def _synthetic_model(rows: int, seed: int):
+    from xgboost import XGBClassifier
+
+    # Mesmos hiperparametros de ml.train_models, sobre dados com a largura real das features
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(rows, len(FEATURE_LABELS)))
+    y = ((X[:, 0] + X[:, 1] * X[:, 4]) > 0.5).astype(int)
+    model = XGBClassifier(
+        n_estimators=200,
+        max_depth=4,
+        learning_rate=0.1,
+        subsample=0.9,
+        colsample_bytree=0.9,
+        random_state=42,
+    )
+    return model.fit(X, y), X
+
+
+def _time(fn, X: np.ndarray, batch: int, iterations: int) -> list[float]:
+    samples = []
+    for i in range(iterations):
+        start = (i * batch) % max(1, len(X) - batch)
+        chunk = X[start:start + batch]
+        t0 = time.perf_counter()
+        fn(chunk)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Compara latencia e paridade do XGBClassifier.predict_proba com o scorer nativo em numpy."
+    )
+    parser.add_argument("--model", default=None, help="joblib de um XGBClassifier treinado (padrao: modelo sintetico)")
+    parser.add_argument("--rows", type=int, default=5000, help="linhas do dataset sintetico")
+    parser.add_argument("--batches", default="1,8,64", help="tamanhos de lote medidos")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="grava o resultado JSON tambem neste arquivo")
+    args = parser.parse_args()
+
+    if args.model:
+        import joblib
+
+        model = joblib.load(args.model)
+        X = np.random.default_rng(args.seed).normal(size=(args.rows, model.n_features_in_))
+    else:
+        model, X = _synthetic_model(args.rows, args.seed)
+
+    started = time.perf_counter()
+    trees = export_xgboost(model)
+    export_ms = (time.perf_counter() - started) * 1000
+
+    def xgb_fn(chunk):
+        return model.predict_proba(chunk)
+
+    def native_fn(chunk):
+        return trees.predict_proba(chunk)
+
+    results = {}
+    for batch in [int(value) for value in args.batches.split(",")]:
+        # Aquecimento fora da medicao
+        xgb_fn(X[:batch])
+        native_fn(X[:batch])
+        xgb_summary = _summary(_time(xgb_fn, X, batch, args.iterations))
+        native_summary = _summary(_time(native_fn, X, batch, args.iterations))
+        results[str(batch)] = {
+            "xgboost": xgb_summary,
+            "native": native_summary,
+            "speedup_p50": round(xgb_summary["p50_us"] / native_summary["p50_us"], 2),
+        }
+
+    result = {
+        "benchmark": "fraud_tree_scorer",
+        "started_at": datetime.utcnow().isoformat(),
+        "trees": int(len(trees.roots)),
+        "nodes": int(len(trees.value)),
+        "max_depth": trees.max_depth,
+        "export_ms": round(export_ms, 2),
+        "max_abs_diff": float(np.abs(model.predict_proba(X) - trees.predict_proba(X)).max()),
+        "batches": results,
+    }
+    payload = json.dumps(result, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(payload)
+    print(payload)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,30 @@
+import argparse
+import asyncio
+import json
+import sys
+
+from src.domain.fraud.features import feature_store
+from src.domain.fraud.graph import transfer_graph
+from src.infra.database import async_session
+
+
+async def _rebuild(hours: int, batch_size: int | None) -> dict:
+    async with async_session() as db:
+        features = await feature_store.rebuild(db, hours=hours, batch_size=batch_size)
+        graph = await transfer_graph.rebuild(db, batch_size=batch_size)
+    return {"features": features, "graph": graph}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Repopula o feature store e o grafo de transferencias de fraude a partir do ledger")
+    parser.add_argument("--hours", type=int, default=24, help="janela de lancamentos reprocessados")
+    parser.add_argument("--batch-size", type=int, default=None, help="linhas por lote do cursor")
+    args = parser.parse_args()
+
+    result = asyncio.run(_rebuild(args.hours, args.batch_size))
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
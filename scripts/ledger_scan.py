@@ -0,0 +1,21 @@
+import argparse
+import json
+import sys
+
+from src.domain.ledger.scanner import scan_ledger
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Re-verificacao completa e paralela da cadeia do ledger")
+    parser.add_argument("--workers", type=int, default=None, help="processos do pool (0 = sem pool)")
+    parser.add_argument("--range-size", type=int, default=None, help="transacoes por faixa")
+    parser.add_argument("--batch-size", type=int, default=None, help="linhas por lote do cursor")
+    args = parser.parse_args()
+
+    result = scan_ledger(workers=args.workers, range_size=args.range_size, batch_size=args.batch_size)
+    print(json.dumps(result, indent=2))
+    return 0 if result["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
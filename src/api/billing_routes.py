@@ -11,24 +11,24 @@ router = APIRouter(prefix="/billing", tags=["Billing"])
 @router.post("/boletos", response_model=schemas.BoletoResponse)
 async def create_boleto(
     data: schemas.BoletoCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.create_boleto(db, current_account.owner.id, data)
+    return await services.BillingService.create_boleto(db, current_account.user_id, data)
 
 
 @router.get("/boletos", response_model=list[schemas.BoletoResponse])
 async def list_boletos(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.list_boletos(db, current_account.owner.id)
+    return await services.BillingService.list_boletos(db, current_account.user_id)
 
 
 @router.post("/boletos/pay", response_model=schemas.BoletoResponse)
 async def pay_boleto(
     data: schemas.BoletoPay,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -40,49 +40,49 @@ async def pay_boleto(
 @router.post("/links", response_model=schemas.PaymentLinkResponse)
 async def create_link(
     data: schemas.PaymentLinkCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.create_payment_link(db, current_account.owner.id, data)
+    return await services.BillingService.create_payment_link(db, current_account.user_id, data)
 
 
 @router.get("/links", response_model=list[schemas.PaymentLinkResponse])
 async def list_links(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.list_payment_links(db, current_account.owner.id)
+    return await services.BillingService.list_payment_links(db, current_account.user_id)
 
 
 @router.post("/pos", response_model=schemas.PosSaleResponse)
 async def create_pos_sale(
     data: schemas.PosSaleCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.create_pos_sale(db, current_account.owner.id, data)
+    return await services.BillingService.create_pos_sale(db, current_account.user_id, data)
 
 
 @router.get("/pos", response_model=list[schemas.PosSaleResponse])
 async def list_pos_sales(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.list_pos_sales(db, current_account.owner.id)
+    return await services.BillingService.list_pos_sales(db, current_account.user_id)
 
 
 @router.post("/split", response_model=schemas.SplitRuleResponse)
 async def create_split(
     data: schemas.SplitRuleCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.create_split_rule(db, current_account.owner.id, data)
+    return await services.BillingService.create_split_rule(db, current_account.user_id, data)
 
 
 @router.get("/split", response_model=list[schemas.SplitRuleResponse])
 async def list_splits(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.BillingService.list_split_rules(db, current_account.owner.id)
+    return await services.BillingService.list_split_rules(db, current_account.user_id)
@@ -11,27 +11,27 @@ router = APIRouter(prefix="/cards", tags=["Cards"])
 @router.post("/", response_model=schemas.CardResponse)
 async def create_card(
     data: schemas.CardCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.CardService.create_card(db, current_account.owner.id, data)
+    return await services.CardService.create_card(db, current_account.user_id, data)
 
 
 @router.get("/", response_model=list[schemas.CardResponse])
 async def list_cards(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.CardService.list_cards(db, current_account.owner.id)
+    return await services.CardService.list_cards(db, current_account.user_id)
 
 
 @router.post("/{card_id}/block", response_model=schemas.CardResponse)
 async def block_card(
     card_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    card = await services.CardService.set_card_status(db, card_id, current_account.owner.id, "BLOCKED")
+    card = await services.CardService.set_card_status(db, card_id, current_account.user_id, "BLOCKED")
     if not card:
         raise HTTPException(status_code=404, detail="Cartao nao encontrado")
     return card
@@ -40,10 +40,10 @@ async def block_card(
 @router.post("/{card_id}/unblock", response_model=schemas.CardResponse)
 async def unblock_card(
     card_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    card = await services.CardService.set_card_status(db, card_id, current_account.owner.id, "ACTIVE")
+    card = await services.CardService.set_card_status(db, card_id, current_account.user_id, "ACTIVE")
     if not card:
         raise HTTPException(status_code=404, detail="Cartao nao encontrado")
     return card
@@ -53,10 +53,10 @@ async def unblock_card(
 async def update_controls(
     card_id: int,
     data: schemas.CardControlUpdate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    card = await services.CardService.update_controls(db, card_id, current_account.owner.id, data)
+    card = await services.CardService.update_controls(db, card_id, current_account.user_id, data)
     if not card:
         raise HTTPException(status_code=404, detail="Cartao nao encontrado")
     return card
@@ -65,20 +65,20 @@ async def update_controls(
 @router.get("/{card_id}/transactions", response_model=list[schemas.CardTransactionResponse])
 async def list_transactions(
     card_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.CardService.list_transactions(db, card_id, current_account.owner.id)
+    return await services.CardService.list_transactions(db, card_id, current_account.user_id)
 
 
 @router.post("/transactions", response_model=schemas.CardTransactionResponse)
 async def create_transaction(
     data: schemas.CardTransactionCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     try:
-        tx = await services.CardService.create_transaction(db, current_account.owner.id, data)
+        tx = await services.CardService.create_transaction(db, current_account.user_id, data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     if not tx:
@@ -89,7 +89,7 @@ async def create_transaction(
 @router.get("/{card_id}/invoices", response_model=list[schemas.CardInvoiceResponse])
 async def list_invoices(
     card_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.CardService.list_invoices(db, card_id, current_account.owner.id)
+    return await services.CardService.list_invoices(db, card_id, current_account.user_id)
@@ -1,30 +1,45 @@
+from types import SimpleNamespace
+
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 import jwt
 from jwt import PyJWTError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, select
 from sqlalchemy.orm import selectinload
 
 from src.core import security
 from src.api.dependencies import get_db
 from src.domain.ledger import models
+from src.infra.auth_cache import auth_cache
 from src.infra.cache import cache
+from src.infra.policy_cache import MISSING
 from src.domain.security import models as security_models
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/ledger/auth/login")
 
 
-async def get_current_account(
-    token: str = Depends(oauth2_scheme),
-    db: AsyncSession = Depends(get_db)
-) -> models.Account:
-    credentials_exception = HTTPException(
+class Principal(SimpleNamespace):
+    """Quem esta autenticado: ids e flags resolvidos do token, sem objeto ORM.
+
+    `id` e o id da conta (como em `Account.id`), para as rotas que so comparam ids.
+    """
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Credenciais invalidas",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_db)
+) -> Principal:
+    credentials_exception = _credentials_exception()
+
     try:
         payload = jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
 
@@ -35,33 +50,67 @@ async def get_current_account(
 
         if not user_id or token_type != "access" or not account_id or not jti:
             raise credentials_exception
-
-        try:
-            if await cache.is_jti_blacklisted(str(jti)):
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Token revogado. Faca login novamente."
-                )
-        except Exception:
-            # Se Redis cair, nao trava tudo (dev-friendly). Em prod, pode fail-close em rotas sensiveis.
-            pass
-
+        user_id = int(user_id)
+        account_id = int(account_id)
     except (PyJWTError, ValueError, TypeError):
         raise credentials_exception
 
-    stmt_sess = select(security_models.Session).where(security_models.Session.jti == str(jti))
-    res_sess = await db.execute(stmt_sess)
-    sess = res_sess.scalar_one_or_none()
-    if sess and sess.revoked:
+    # Cache hit: nenhuma consulta; logout/revogacao/mudanca de status descartam a entrada
+    principal = auth_cache.get("jti", jti)
+    if principal is not MISSING:
+        if principal.user_id != user_id or principal.account_id != account_id:
+            raise credentials_exception
+        return principal
+
+    # Falha do Redis ja responde "nao revogado" (dev-friendly); token revogado sempre vira 401
+    if await cache.is_jti_blacklisted(str(jti)):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token revogado. Faca login novamente.",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    stmt = (
+        select(
+            models.Account.status,
+            models.User.mfa_enabled,
+            security_models.Session.revoked,
+        )
+        .join(models.User, models.User.id == models.Account.user_id)
+        .outerjoin(
+            security_models.Session,
+            and_(security_models.Session.jti == str(jti), security_models.Session.user_id == user_id),
+        )
+        .where(models.Account.id == account_id, models.Account.user_id == user_id)
+    )
+    row = (await db.execute(stmt)).first()
+    if row is None or row.revoked:
         raise credentials_exception
 
+    principal = Principal(
+        id=account_id,
+        account_id=account_id,
+        user_id=user_id,
+        status=row.status,
+        mfa_enabled=bool(row.mfa_enabled),
+        jti=str(jti),
+    )
+    auth_cache.put("jti", jti, principal)
+    return principal
+
+
+async def get_current_account(
+    principal: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_db)
+) -> models.Account:
+    """Conta completa (com `owner`) para rotas que precisam do objeto ORM."""
     stmt = select(models.Account).options(selectinload(models.Account.owner)).where(
-        models.Account.id == int(account_id),
-        models.Account.user_id == int(user_id),
+        models.Account.id == principal.account_id,
+        models.Account.user_id == principal.user_id,
     )
     result = await db.execute(stmt)
     account = result.scalars().first()
     if not account:
-        raise credentials_exception
+        raise _credentials_exception()
 
     return account
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/fraud", tags=["Fraud"])
 
 @router.get("/scores", response_model=list[schemas.FraudScoreResponse])
 async def list_scores(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     stmt = select(models.FraudScore).where(models.FraudScore.account_id == current_account.id)
@@ -11,27 +11,27 @@ router = APIRouter(prefix="/insurance", tags=["Insurance"])
 @router.post("/policies", response_model=schemas.InsurancePolicyResponse)
 async def create_policy(
     data: schemas.InsurancePolicyCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.InsuranceService.create_policy(db, current_account.owner.id, data)
+    return await services.InsuranceService.create_policy(db, current_account.user_id, data)
 
 
 @router.get("/policies", response_model=list[schemas.InsurancePolicyResponse])
 async def list_policies(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.InsuranceService.list_policies(db, current_account.owner.id)
+    return await services.InsuranceService.list_policies(db, current_account.user_id)
 
 
 @router.post("/claims", response_model=schemas.InsuranceClaimResponse)
 async def create_claim(
     data: schemas.InsuranceClaimCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    claim = await services.InsuranceService.create_claim(db, current_account.owner.id, data)
+    claim = await services.InsuranceService.create_claim(db, current_account.user_id, data)
     if not claim:
         raise HTTPException(status_code=404, detail="Apolice nao encontrada")
     return claim
@@ -39,7 +39,7 @@ async def create_claim(
 
 @router.get("/claims", response_model=list[schemas.InsuranceClaimResponse])
 async def list_claims(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.InsuranceService.list_claims(db, current_account.owner.id)
+    return await services.InsuranceService.list_claims(db, current_account.user_id)
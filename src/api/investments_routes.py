@@ -24,35 +24,35 @@ async def list_products(db: AsyncSession = Depends(get_db)):
 @router.post("/orders", response_model=schemas.InvestmentOrderResponse)
 async def create_order(
     data: schemas.InvestmentOrderCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.InvestmentService.create_order(db, current_account.owner.id, data)
+    return await services.InvestmentService.create_order(db, current_account.user_id, data)
 
 
 @router.get("/holdings", response_model=list[schemas.InvestmentHoldingResponse])
 async def list_holdings(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.InvestmentService.list_holdings(db, current_account.owner.id)
+    return await services.InvestmentService.list_holdings(db, current_account.user_id)
 
 
 @router.post("/auto", response_model=schemas.AutoInvestResponse)
 async def set_auto_invest(
     data: schemas.AutoInvestCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.InvestmentService.set_auto_invest(db, current_account.owner.id, data)
+    return await services.InvestmentService.set_auto_invest(db, current_account.user_id, data)
 
 
 @router.get("/auto", response_model=schemas.AutoInvestResponse)
 async def get_auto_invest(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    cfg = await services.InvestmentService.get_auto_invest(db, current_account.owner.id)
+    cfg = await services.InvestmentService.get_auto_invest(db, current_account.user_id)
     if not cfg:
         return None
     return cfg
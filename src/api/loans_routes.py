@@ -16,24 +16,24 @@ async def simulate_loan(data: schemas.LoanSimulateRequest):
 @router.post("/", response_model=schemas.LoanResponse)
 async def create_loan(
     data: schemas.LoanCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.LoanService.create_loan(db, current_account.owner.id, data)
+    return await services.LoanService.create_loan(db, current_account.user_id, data)
 
 
 @router.get("/", response_model=list[schemas.LoanResponse])
 async def list_loans(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.LoanService.list_loans(db, current_account.owner.id)
+    return await services.LoanService.list_loans(db, current_account.user_id)
 
 
 @router.get("/{loan_id}/installments", response_model=list[schemas.LoanInstallmentResponse])
 async def list_installments(
     loan_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.LoanService.list_installments(db, loan_id, current_account.owner.id)
+    return await services.LoanService.list_installments(db, loan_id, current_account.user_id)
@@ -1,131 +1,166 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.concurrency import run_in_threadpool
-from fastapi import Request
 from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 import jwt
 
-from src.infra.cache import cache
-from src.infra.database import SessionLocal
-from src.domain.ledger.models import AuditLog
+from src.infra.rate_limit import global_rate_limiter
+from src.domain.ledger.audit import audit_writer
 from src.infra.metrics import REQUEST_LATENCY, ERRORS
+from src.infra.instrumentation import finish_request, start_request
 from src.core.config import settings
 
 import logging
 import time
-import hashlib
 from datetime import datetime
-from sqlalchemy import select
 
 logger = logging.getLogger(__name__)
 
+# Rotas de infraestrutura: sem rate limit e sem audit log
+EXCLUDED_PATHS = frozenset({"/metrics", "/health", "/docs", "/openapi.json"})
 
-class LedgerMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        xff = request.headers.get("x-forwarded-for", "")
-        ip = (xff.split(",")[0].strip() if xff else None) or (request.client.host if request.client else "unknown")
-
-        path = request.url.path
-        method = request.method.upper()
-
-        # ==========================
-        # 1) GLOBAL RATE LIMIT
-        # ==========================
-        exclude_rl = {"/metrics", "/health", "/docs", "/openapi.json"}
-        if method != "OPTIONS" and path not in exclude_rl:
-            try:
-                allow = await cache.check_rate_limit_sliding_window(f"global:{ip}", limit=100, window_seconds=60)
-                if not allow:
-                    logger.warning(f"Rate limit excedido ip={ip} path={path}")
-                    return JSONResponse(
-                        status_code=429,
-                        content={"detail": "Global Rate Limit Exceeded. Acalme-se, hacker."},
-                    )
-            except Exception as e:
-                if settings.STRICT_SECURITY:
-                    return JSONResponse(
-                        status_code=503,
-                        content={"detail": "Rate limit indisponivel. Tente novamente."},
-                    )
-                logger.error(f"Rate limit indisponivel (redis): {e}")
-
-        # ==========================
-        # 2) REQUEST
-        # ==========================
-        start = time.time()
+
+def client_ip(scope: Scope, headers: Headers) -> str:
+    xff = headers.get("x-forwarded-for", "")
+    client = scope.get("client")
+    return (xff.split(",")[0].strip() if xff else None) or (client[0] if client else "unknown")
+
+
+def _user_id_from_token(headers: Headers) -> int | None:
+    auth = headers.get("authorization") or ""
+    if not auth.startswith("Bearer "):
+        return None
+    token = auth.split(" ", 1)[1].strip()
+    try:
+        claims = jwt.decode(
+            token,
+            options={
+                "verify_signature": False,
+                "verify_exp": False,
+                "verify_nbf": False,
+                "verify_aud": False,
+            },
+        )
+    except Exception:
+        return None
+    sub = claims.get("sub")
+    return int(sub) if sub and str(sub).isdigit() else None
+
+
+# Middlewares ASGI puros: receive/send passam direto para a aplicacao, sem a task
+# e o stream extras por requisicao do BaseHTTPMiddleware. Cada um cuida de uma coisa.
+
+
+class RateLimitMiddleware:
+    """Limite global por IP; requisicoes recusadas nao chegam as demais camadas."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        ip = client_ip(scope, Headers(scope=scope))
         try:
-            response = await call_next(request)
+            decision = await global_rate_limiter.hit(ip)
+            if not decision.allowed:
+                logger.warning(f"Rate limit excedido ip={ip} path={scope['path']}")
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Global Rate Limit Exceeded. Acalme-se, hacker."},
+                    headers={"Retry-After": str(decision.retry_after)},
+                )
+                await response(scope, receive, send)
+                return
         except Exception as e:
-            logger.exception(f"Erro nao tratado: {e}")
-            response = JSONResponse(status_code=500, content={"detail": "Erro interno"})
-        process_time = time.time() - start
-        REQUEST_LATENCY.labels(path=path, method=method, status=str(response.status_code)).observe(process_time)
-        if response.status_code >= 400:
-            ERRORS.labels(path=path, method=method, status=str(response.status_code)).inc()
-
-        # ==========================
-        # 3) AUDIT LOG
-        # ==========================
-        exclude_audit = {"/metrics", "/health", "/docs", "/openapi.json"}
-        if path not in exclude_audit:
-            await run_in_threadpool(self._save_audit_log_sync, request, response.status_code, ip, process_time)
-
-        return response
-
-    def _save_audit_log_sync(self, request: Request, status_code: int, ip: str, process_time: float):
-        user_id = None
-        user_agent = request.headers.get("user-agent", "")
-        auth = request.headers.get("Authorization") or ""
-        if auth.startswith("Bearer "):
-            token = auth.split(" ", 1)[1].strip()
-            try:
-                claims = jwt.decode(
-                    token,
-                    options={
-                        "verify_signature": False,
-                        "verify_exp": False,
-                        "verify_nbf": False,
-                        "verify_aud": False,
-                    },
+            if settings.STRICT_SECURITY:
+                response = JSONResponse(
+                    status_code=503,
+                    content={"detail": "Rate limit indisponivel. Tente novamente."},
                 )
-                sub = claims.get("sub")
-                if sub and str(sub).isdigit():
-                    user_id = int(sub)
-            except Exception:
-                user_id = None
+                await response(scope, receive, send)
+                return
+            logger.error(f"Rate limit indisponivel (redis): {e}")
+        await self.app(scope, receive, send)
+
+
+class MetricsMiddleware:
+    """Latencia, erros e perfil por etapa por rota; excecao nao tratada vira 500 (medida e auditada)."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
 
-        details = f"status={status_code} duration_ms={int(process_time * 1000)}"
-        timestamp = datetime.utcnow()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
+        status = {"code": 500, "started": False}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                status["started"] = True
+            await send(message)
+
+        path = scope["path"]
+        method = scope["method"].upper()
+        # Perfil por requisicao: etapas (`stage()`) e consultas SQL de tudo que roda abaixo
+        profile = start_request(method, path) if settings.INSTRUMENTATION_ENABLED else None
+        start = time.perf_counter()
         try:
-            with SessionLocal() as db:
-                stmt = select(AuditLog).order_by(AuditLog.id.desc()).limit(1)
-                last_log = db.execute(stmt).scalar_one_or_none()
-                prev_hash = last_log.record_hash if last_log else ""
-                base = "|".join([
-                    f"HTTP {request.method}",
-                    str(user_id or ""),
-                    ip,
-                    request.method,
-                    request.url.path,
-                    details,
-                    timestamp.isoformat(),
-                    prev_hash or "",
-                ])
-                record_hash = hashlib.sha256(base.encode("utf-8")).hexdigest()
-
-                log = AuditLog(
-                    action=f"HTTP {request.method}",
-                    user_id=user_id,
-                    ip_address=ip,
-                    method=request.method,
-                    path=request.url.path,
-                    details=details,
-                    user_agent=user_agent,
-                    prev_hash=prev_hash,
-                    record_hash=record_hash,
-                    timestamp=timestamp,
-                )
-                db.add(log)
-                db.commit()
+            await self.app(scope, receive, send_wrapper)
         except Exception as e:
-            logger.error(f"Falha ao salvar Audit Log: {e}")
+            logger.exception(f"Erro nao tratado: {e}")
+            if status["started"]:
+                raise
+            await JSONResponse(status_code=500, content={"detail": "Erro interno"})(scope, receive, send_wrapper)
+        finally:
+            if profile is not None:
+                finish_request(*profile, status["code"])
+        process_time = time.perf_counter() - start
+
+        REQUEST_LATENCY.labels(path=path, method=method, status=str(status["code"])).observe(process_time)
+        if status["code"] >= 400:
+            ERRORS.labels(path=path, method=method, status=str(status["code"])).inc()
+
+
+class AuditMiddleware:
+    """Enfileira um registro por requisicao; hash encadeado e insert em lote ficam com o audit_writer."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or scope["path"] in EXCLUDED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message: Message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await audit_writer.enqueue(audit_record(scope, status["code"], time.perf_counter() - start))
+
+
+def audit_record(scope: Scope, status_code: int, process_time: float) -> dict:
+    headers = Headers(scope=scope)
+    method = scope["method"]
+    return {
+        "action": f"HTTP {method}",
+        "user_id": _user_id_from_token(headers),
+        "ip_address": client_ip(scope, headers),
+        "method": method,
+        "path": scope["path"],
+        "details": f"status={status_code} duration_ms={int(process_time * 1000)}",
+        "user_agent": headers.get("user-agent", ""),
+        "timestamp": datetime.utcnow(),
+    }
@@ -11,18 +11,18 @@ router = APIRouter(prefix="/ml", tags=["ML"])
 
 @router.post("/churn", response_model=schemas.ChurnPredictionResponse)
 async def predict_churn(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.MlService.predict_churn(db, current_account.owner.id)
+    return await services.MlService.predict_churn(db, current_account.user_id)
 
 
 @router.post("/recommendations", response_model=list[schemas.RecommendationResponse])
 async def generate_recommendations(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    await services.MlService.generate_recommendations(db, current_account.owner.id)
-    stmt = select(models.Recommendation).where(models.Recommendation.user_id == current_account.owner.id)
+    await services.MlService.generate_recommendations(db, current_account.user_id)
+    stmt = select(models.Recommendation).where(models.Recommendation.user_id == current_account.user_id)
     res = await db.execute(stmt)
     return res.scalars().all()
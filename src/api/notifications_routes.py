@@ -11,15 +11,15 @@ router = APIRouter(prefix="/notifications", tags=["Notifications"])
 @router.post("/", response_model=schemas.NotificationResponse)
 async def send_notification(
     data: schemas.NotificationCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.NotificationService.send(db, current_account.owner.id, data)
+    return await services.NotificationService.send(db, current_account.user_id, data)
 
 
 @router.get("/", response_model=list[schemas.NotificationResponse])
 async def list_notifications(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.NotificationService.list_user(db, current_account.owner.id)
+    return await services.NotificationService.list_user(db, current_account.user_id)
@@ -11,7 +11,7 @@ router = APIRouter(prefix="/pix", tags=["Pix"])
 @router.post("/charges", response_model=schemas.PixChargeResponse)
 async def create_charge(
     data: schemas.PixChargeCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     return await services.PixService.create_charge(db, current_account.id, data)
@@ -19,7 +19,7 @@ async def create_charge(
 
 @router.get("/charges", response_model=list[schemas.PixChargeResponse])
 async def list_charges(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     return await services.PixService.list_charges(db, current_account.id)
@@ -28,7 +28,7 @@ async def list_charges(
 @router.post("/refunds", response_model=schemas.PixRefundResponse)
 async def create_refund(
     data: schemas.PixRefundCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -40,7 +40,7 @@ async def create_refund(
 @router.post("/charges/pay", response_model=schemas.PixChargeResponse)
 async def pay_charge(
     data: schemas.PixChargePay,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -51,7 +51,7 @@ async def pay_charge(
 
 @router.get("/limits", response_model=schemas.PixLimitResponse)
 async def get_limits(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     return await services.PixService.get_limits(db, current_account.id)
@@ -60,7 +60,7 @@ async def get_limits(
 @router.post("/limits", response_model=schemas.PixLimitResponse)
 async def update_limits(
     data: schemas.PixLimitUpdate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     return await services.PixService.update_limits(db, current_account.id, data)
@@ -69,7 +69,7 @@ async def update_limits(
 @router.post("/schedules", response_model=schemas.PixScheduleResponse)
 async def create_schedule(
     data: schemas.PixScheduleCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     try:
@@ -80,7 +80,7 @@ async def create_schedule(
 
 @router.get("/schedules", response_model=list[schemas.PixScheduleResponse])
 async def list_schedules(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     return await services.PixService.list_schedules(db, current_account.id)
@@ -11,18 +11,18 @@ router = APIRouter(prefix="/pj", tags=["PJ"])
 @router.post("/businesses", response_model=schemas.BusinessResponse)
 async def create_business(
     data: schemas.BusinessCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.PjService.create_business(db, current_account.owner.id, data)
+    return await services.PjService.create_business(db, current_account.user_id, data)
 
 
 @router.get("/businesses", response_model=list[schemas.BusinessResponse])
 async def list_businesses(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.PjService.list_businesses(db, current_account.owner.id)
+    return await services.PjService.list_businesses(db, current_account.user_id)
 
 
 @router.post("/batch-payments", response_model=schemas.BatchPaymentResponse)
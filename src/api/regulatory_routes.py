@@ -11,18 +11,18 @@ router = APIRouter(prefix="/regulatory", tags=["Regulatory"])
 @router.post("/kyc", response_model=schemas.KycResponse)
 async def submit_kyc(
     data: schemas.KycCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.RegulatoryService.create_kyc(db, current_account.owner.id, data)
+    return await services.RegulatoryService.create_kyc(db, current_account.user_id, data)
 
 
 @router.get("/aml/alerts", response_model=list[schemas.AmlAlertResponse])
 async def list_aml_alerts(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.RegulatoryService.list_aml_alerts(db, current_account.owner.id)
+    return await services.RegulatoryService.list_aml_alerts(db, current_account.user_id)
 
 
 @router.get("/scr", response_model=schemas.ReportResponse)
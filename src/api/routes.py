@@ -1,5 +1,6 @@
 from datetime import timedelta, datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Request, Query, Response
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
@@ -12,12 +13,15 @@ import qrcode
 
 from src.api.dependencies import get_db
 from src.domain.ledger import schemas, services, models
+from src.domain.ledger.integrity import run_integrity_check
 from src.core import security
 from src.api import deps
 from src.domain.security import services as security_services
 from src.domain.security import models as security_models
 import secrets
+from src.infra.auth_cache import auth_cache
 from src.infra.cache import cache
+from src.infra.rate_limit import login_rate_limiter
 from src.core.config import settings
 
 router = APIRouter()
@@ -38,12 +42,17 @@ async def login_access_token(
     user_agent = request.headers.get("user-agent", "")
     accept_language = request.headers.get("accept-language", "")
     try:
-        allow = await cache.check_rate_limit_sliding_window(f"rl_login:{ip}", limit=5, window_seconds=60)
-        if not allow:
-            raise HTTPException(status_code=429, detail="Muitas tentativas. Aguarde 1 minuto.")
+        decision = await login_rate_limiter.hit(ip)
     except Exception:
         if settings.STRICT_SECURITY:
             raise HTTPException(status_code=503, detail="Rate limit indisponivel. Tente novamente.")
+        decision = None
+    if decision is not None and not decision.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Muitas tentativas. Aguarde 1 minuto.",
+            headers={"Retry-After": str(decision.retry_after)},
+        )
 
     account = await services.LedgerService.authenticate_account(db, form_data.username, form_data.password)
     if not account:
@@ -128,7 +137,7 @@ async def mfa_qrcode(current_account: models.Account = Depends(deps.get_current_
 @router.post("/auth/mfa/enable")
 async def mfa_enable(
     code: str = Query(...),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     backup_codes = await services.LedgerService.enable_mfa(db, current_account.id, code)
@@ -232,6 +241,8 @@ async def logout(
                 exp_dt = datetime.fromtimestamp(int(exp), tz=timezone.utc)
                 ttl_seconds = max(0, int((exp_dt - datetime.now(timezone.utc)).total_seconds()))
                 await cache.add_jti_to_blacklist(str(jti), expire_in_seconds=ttl_seconds)
+                # O principal pode estar em cache em qualquer processo: descarta agora
+                await auth_cache.invalidate("jti", str(jti))
         except Exception:
             pass
 
@@ -257,7 +268,7 @@ async def logout(
 
 @router.get("/accounts/me", response_model=schemas.AccountResponse)
 async def read_users_me(
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     stmt = select(models.Account).options(
@@ -314,10 +325,10 @@ async def create_account(data: schemas.AccountCreate, db: AsyncSession = Depends
 
 @router.get("/accounts", response_model=list[schemas.AccountResponse])
 async def list_accounts(
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    accounts = await services.LedgerService.list_accounts(db, current_account.owner.id)
+    accounts = await services.LedgerService.list_accounts(db, current_account.user_id)
     response = []
     for acc in accounts:
         cpf_last4 = acc.owner.cpf_last4 or ""
@@ -343,10 +354,10 @@ async def list_accounts(
 
 @router.get("/accounts/consolidated")
 async def consolidated_balance(
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    accounts = await services.LedgerService.list_accounts(db, current_account.owner.id)
+    accounts = await services.LedgerService.list_accounts(db, current_account.user_id)
     balances = [await services.LedgerService.get_balance(db, acc.id) for acc in accounts]
     total = sum(balances)
     return {"total_balance": total, "accounts": len(accounts)}
@@ -361,7 +372,7 @@ async def consolidated_balance(
 async def get_balance(
     account_id: int,
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
 ):
     if account_id != current_account.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
@@ -373,13 +384,15 @@ async def get_balance(
 async def get_statement(
     account_id: int,
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     start_date: str | None = None,
     end_date: str | None = None,
     tx_type: str | None = None,
     min_amount: float | None = None,
     max_amount: float | None = None,
     search: str | None = None,
+    limit: int = Query(None, ge=1, le=settings.LEDGER_STATEMENT_MAX_PAGE_SIZE),
+    cursor: str | None = None,
 ):
     if account_id != current_account.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
@@ -392,23 +405,38 @@ async def get_statement(
         min_amount=min_amount,
         max_amount=max_amount,
         search=search,
+        limit=limit,
+        cursor=cursor,
     )
 
 
 @router.get("/accounts/{account_id}/statement/export")
 async def export_statement(
     account_id: int,
-    db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
+    start_date: str | None = None,
+    end_date: str | None = None,
+    tx_type: str | None = None,
+    min_amount: float | None = None,
+    max_amount: float | None = None,
+    search: str | None = None,
 ):
     if account_id != current_account.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
-    data = await services.LedgerService.get_statement(db, account_id)
-    rows = ["date,amount,type,description"]
-    for tx in data["transactions"]:
-        rows.append(f"{tx['date']},{tx['amount']},{tx['type']},{tx['description']}")
-    csv = "\n".join(rows)
-    return Response(content=csv, media_type="text/csv")
+    rows = services.LedgerService.stream_statement_csv(
+        account_id,
+        start_date=start_date,
+        end_date=end_date,
+        tx_type=tx_type,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        search=search,
+    )
+    return StreamingResponse(
+        rows,
+        media_type="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="statement-{account_id}.csv"'},
+    )
 
 
 @router.post("/transactions", status_code=201, response_model=schemas.TransactionResponse)
@@ -418,7 +446,7 @@ async def create_transaction(
     response: Response,
     otp: str = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
 ):
     if data.account_id != current_account.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
@@ -441,11 +469,37 @@ async def create_transaction(
     return tx
 
 
+@router.post("/transactions/batch", response_model=schemas.LedgerBatchResponse)
+async def create_transactions_batch(
+    request: Request,
+    data: schemas.LedgerBatchCreate,
+    otp: str = Query(None),
+    db: AsyncSession = Depends(get_db),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
+):
+    ip = request.client.host if request.client else "unknown"
+    user_agent = request.headers.get("user-agent", "")
+    accept_language = request.headers.get("accept-language", "")
+    fingerprint = security_services.SecurityService.compute_device_fingerprint(
+        user_agent=user_agent,
+        accept_language=accept_language,
+        client_ip=ip,
+    )
+    fraud_context = {
+        "ip": ip,
+        "user_agent": user_agent,
+        "device_fingerprint": fingerprint,
+    }
+    return await services.LedgerService.ingest_batch(
+        db, data.items, owner_user_id=current_account.user_id, otp=otp, fraud_context=fraud_context
+    )
+
+
 @router.get("/transactions/{transaction_id}/receipt")
 async def transaction_receipt(
     transaction_id: int,
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
 ):
     tx = await services.LedgerService.get_transaction_by_id(db, transaction_id)
     if not tx or tx.account_id != current_account.id:
@@ -467,7 +521,7 @@ async def create_transfer(
     response: Response,
     otp: str = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
 ):
     if data.from_account_id != current_account.id:
         raise HTTPException(status_code=403, detail="Acesso negado")
@@ -492,10 +546,17 @@ async def create_transfer(
 
 @router.get("/ledger/integrity")
 async def ledger_integrity(
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    return await services.LedgerService.verify_integrity(db)
+    checkpoint = await services.LedgerService.get_latest_integrity_checkpoint(db)
+    if checkpoint is None:
+        # Primeira consulta antes de qualquer execucao do loop: verifica e persiste o checkpoint
+        await run_integrity_check()
+        checkpoint = await services.LedgerService.get_latest_integrity_checkpoint(db)
+    if checkpoint is None:
+        return {"ok": False, "reason": "INTEGRITY_ERROR"}
+    return services.LedgerService.integrity_checkpoint_to_dict(checkpoint)
 
 
 # ==========================================
@@ -507,7 +568,7 @@ async def ledger_integrity(
 async def create_pix_key(
     data: schemas.PixKeyCreate,
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
 ):
     return await services.LedgerService.create_pix_key(db, current_account.id, data)
 
@@ -519,7 +580,7 @@ async def pix_transfer(
     response: Response,
     otp: str = Query(None),
     db: AsyncSession = Depends(get_db),
-    current_account: models.Account = Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
 ):
     ip = request.client.host if request.client else "unknown"
     user_agent = request.headers.get("user-agent", "")
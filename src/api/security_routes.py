@@ -27,10 +27,10 @@ async def confirm_password_reset(data: schemas.PasswordResetConfirm, db: AsyncSe
 
 @router.get("/devices", response_model=list[schemas.DeviceResponse])
 async def list_devices(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(security_models.Device).where(security_models.Device.user_id == current_account.owner.id)
+    stmt = select(security_models.Device).where(security_models.Device.user_id == current_account.user_id)
     res = await db.execute(stmt)
     return res.scalars().all()
 
@@ -38,19 +38,19 @@ async def list_devices(
 @router.post("/devices/{device_id}/revoke")
 async def revoke_device(
     device_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    await services.SecurityService.revoke_device(db, device_id, current_account.owner.id)
+    await services.SecurityService.revoke_device(db, device_id, current_account.user_id)
     return {"status": "ok"}
 
 
 @router.get("/sessions", response_model=list[schemas.SessionResponse])
 async def list_sessions(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(security_models.Session).where(security_models.Session.user_id == current_account.owner.id)
+    stmt = select(security_models.Session).where(security_models.Session.user_id == current_account.user_id)
     res = await db.execute(stmt)
     return res.scalars().all()
 
@@ -58,31 +58,31 @@ async def list_sessions(
 @router.post("/sessions/{session_id}/revoke")
 async def revoke_session(
     session_id: int,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    await services.SecurityService.revoke_session(db, session_id, current_account.owner.id)
+    await services.SecurityService.revoke_session(db, session_id, current_account.user_id)
     return {"status": "ok"}
 
 
 @router.get("/alerts", response_model=list[schemas.SecurityAlertResponse])
 async def list_alerts(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    stmt = select(security_models.SecurityAlert).where(security_models.SecurityAlert.user_id == current_account.owner.id)
+    stmt = select(security_models.SecurityAlert).where(security_models.SecurityAlert.user_id == current_account.user_id)
     res = await db.execute(stmt)
     return res.scalars().all()
 
 
 @router.get("/audit", response_model=list[schemas.AuditLogResponse])
 async def list_audit_logs(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     stmt = (
         select(ledger_models.AuditLog)
-        .where(ledger_models.AuditLog.user_id == current_account.owner.id)
+        .where(ledger_models.AuditLog.user_id == current_account.user_id)
         .order_by(ledger_models.AuditLog.id.desc())
         .limit(200)
     )
@@ -93,20 +93,20 @@ async def list_audit_logs(
 @router.post("/otp/request")
 async def request_otp(
     data: schemas.OtpRequest,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    code = await services.SecurityService.request_otp(db, current_account.owner.id, data.channel)
+    code = await services.SecurityService.request_otp(db, current_account.user_id, data.channel)
     return {"status": "ok", "code": code}
 
 
 @router.post("/otp/verify")
 async def verify_otp(
     data: schemas.OtpVerify,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    ok = await services.SecurityService.verify_otp(db, current_account.owner.id, data.channel, data.code)
+    ok = await services.SecurityService.verify_otp(db, current_account.user_id, data.channel, data.code)
     if not ok:
         raise HTTPException(status_code=400, detail="OTP invalido")
     return {"status": "ok"}
@@ -115,20 +115,20 @@ async def verify_otp(
 @router.post("/questions")
 async def add_question(
     data: schemas.SecurityQuestionCreate,
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
-    await services.SecurityService.add_security_question(db, current_account.owner.id, data.question, data.answer)
+    await services.SecurityService.add_security_question(db, current_account.user_id, data.question, data.answer)
     return {"status": "ok"}
 
 
 @router.get("/questions", response_model=list[schemas.SecurityQuestionResponse])
 async def list_questions(
-    current_account=Depends(deps.get_current_account),
+    current_account: deps.Principal = Depends(deps.get_current_principal),
     db: AsyncSession = Depends(get_db),
 ):
     stmt = select(security_models.SecurityQuestion).where(
-        security_models.SecurityQuestion.user_id == current_account.owner.id
+        security_models.SecurityQuestion.user_id == current_account.user_id
     )
     res = await db.execute(stmt)
     return res.scalars().all()
@@ -15,6 +15,13 @@ class Settings:
 
     STRICT_SECURITY = os.getenv("STRICT_SECURITY", "false").lower() in {"1", "true", "yes"}
 
+    # Rate limit (token bucket): LIMIT requisicoes por WINDOW_SECONDS, com rajada de ate LIMIT
+    RATE_LIMIT_GLOBAL_LIMIT = max(1, int(os.getenv("RATE_LIMIT_GLOBAL_LIMIT", "100")))
+    RATE_LIMIT_GLOBAL_WINDOW_SECONDS = max(1, int(os.getenv("RATE_LIMIT_GLOBAL_WINDOW_SECONDS", "60")))
+    RATE_LIMIT_LOGIN_LIMIT = max(1, int(os.getenv("RATE_LIMIT_LOGIN_LIMIT", "5")))
+    RATE_LIMIT_LOGIN_WINDOW_SECONDS = max(1, int(os.getenv("RATE_LIMIT_LOGIN_WINDOW_SECONDS", "60")))
+    RATE_LIMIT_LOCAL_MAX_KEYS = max(1, int(os.getenv("RATE_LIMIT_LOCAL_MAX_KEYS", "100000")))
+
     SECRET_KEY = os.getenv("SECRET_KEY")
     ALGORITHM = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
@@ -31,9 +38,17 @@ class Settings:
     AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "2555"))  # ~7 anos
     AUDIT_ARCHIVE_S3_BUCKET = os.getenv("AUDIT_ARCHIVE_S3_BUCKET", "ledger-audit-archive")
     AUDIT_ARCHIVE_S3_ENDPOINT = os.getenv("AUDIT_ARCHIVE_S3_ENDPOINT", "http://minio:9000")
+    # Writer de auditoria: fila limitada por processo, lotes inseridos de uma vez
+    AUDIT_QUEUE_MAX = max(1, int(os.getenv("AUDIT_QUEUE_MAX", "10000")))
+    AUDIT_BATCH_MAX = max(1, int(os.getenv("AUDIT_BATCH_MAX", "500")))
+    AUDIT_FLUSH_WINDOW_MS = float(os.getenv("AUDIT_FLUSH_WINDOW_MS", "50"))
+    AUDIT_ENQUEUE_TIMEOUT_MS = float(os.getenv("AUDIT_ENQUEUE_TIMEOUT_MS", "500"))
+    AUDIT_FLUSH_RETRIES = max(0, int(os.getenv("AUDIT_FLUSH_RETRIES", "3")))
 
     SYSTEM_USER_EMAIL = os.getenv("SYSTEM_USER_EMAIL", "system@ledger.local")
     SYSTEM_ACCOUNT_NUMBER = os.getenv("SYSTEM_ACCOUNT_NUMBER", "0000-0")
+    # Pool de sub-contas de sistema (stripe 0 = SYSTEM_ACCOUNT_NUMBER, demais = "<numero>.<n>")
+    SYSTEM_ACCOUNT_STRIPES = max(1, int(os.getenv("SYSTEM_ACCOUNT_STRIPES", "1")))
 
     SAVINGS_INTEREST_MONTHLY = float(os.getenv("SAVINGS_INTEREST_MONTHLY", "0.005"))
     IOF_RATE_FIXED = float(os.getenv("IOF_RATE_FIXED", "0.0038"))
@@ -53,6 +68,66 @@ class Settings:
     PAGERDUTY_WEBHOOK_URL = os.getenv("PAGERDUTY_WEBHOOK_URL", "http://pagerduty_mock:6005/pagerduty")
     ALERT_ROUTER_URL = os.getenv("ALERT_ROUTER_URL", "http://alert_router:5001/alert")
     LEDGER_INTEGRITY_INTERVAL_SECONDS = int(os.getenv("LEDGER_INTEGRITY_INTERVAL_SECONDS", "300"))
+    # 1 = cadeia unica (legado). N > 1 = N cadeias independentes escolhidas por hash da conta.
+    LEDGER_CHAIN_SHARDS = max(1, int(os.getenv("LEDGER_CHAIN_SHARDS", "1")))
+    # Group commit: agrupa escritas concorrentes em uma unica transacao de banco (opt-in)
+    LEDGER_GROUP_COMMIT_ENABLED = os.getenv("LEDGER_GROUP_COMMIT_ENABLED", "false").lower() in {"1", "true", "yes"}
+    LEDGER_GROUP_COMMIT_WINDOW_MS = float(os.getenv("LEDGER_GROUP_COMMIT_WINDOW_MS", "2"))
+    LEDGER_GROUP_COMMIT_MAX_BATCH = int(os.getenv("LEDGER_GROUP_COMMIT_MAX_BATCH", "256"))
+    # Ingestao em lote: itens por requisicao de POST /ledger/transactions/batch
+    LEDGER_BATCH_MAX_ITEMS = max(1, int(os.getenv("LEDGER_BATCH_MAX_ITEMS", "10000")))
+    # Scanner paralelo da cadeia completa (0 workers = executa no proprio processo)
+    LEDGER_SCAN_RANGE_SIZE = max(1, int(os.getenv("LEDGER_SCAN_RANGE_SIZE", "50000")))
+    LEDGER_SCAN_BATCH_SIZE = max(1, int(os.getenv("LEDGER_SCAN_BATCH_SIZE", "2000")))
+    LEDGER_SCAN_WORKERS = int(os.getenv("LEDGER_SCAN_WORKERS", str(os.cpu_count() or 1)))
+    # Snapshots de saldo: compacta contas com pelo menos N postings apos o ultimo snapshot
+    LEDGER_SNAPSHOT_MIN_POSTINGS = max(1, int(os.getenv("LEDGER_SNAPSHOT_MIN_POSTINGS", "500")))
+    LEDGER_SNAPSHOT_BATCH_ACCOUNTS = max(1, int(os.getenv("LEDGER_SNAPSHOT_BATCH_ACCOUNTS", "200")))
+    # Extrato: tamanho de pagina (keyset) e de pedaco lido por cursor na exportacao CSV
+    LEDGER_STATEMENT_PAGE_SIZE = max(1, int(os.getenv("LEDGER_STATEMENT_PAGE_SIZE", "50")))
+    LEDGER_STATEMENT_MAX_PAGE_SIZE = max(1, int(os.getenv("LEDGER_STATEMENT_MAX_PAGE_SIZE", "500")))
+    LEDGER_EXPORT_CHUNK_SIZE = max(1, int(os.getenv("LEDGER_EXPORT_CHUNK_SIZE", "1000")))
+    # Feature store de fraude: "redis" (com fallback em memoria) ou "memory" (so no processo)
+    FRAUD_FEATURE_STORE = os.getenv("FRAUD_FEATURE_STORE", "redis")
+    FRAUD_FEATURES_TTL_SECONDS = int(os.getenv("FRAUD_FEATURES_TTL_SECONDS", str(30 * 86400)))
+    FRAUD_FEATURES_LOCAL_MAX_ACCOUNTS = max(1, int(os.getenv("FRAUD_FEATURES_LOCAL_MAX_ACCOUNTS", "100000")))
+    # Grafo de transferencias (ciclos/mulas): "redis" (compartilhado, com fallback em memoria) ou "memory"
+    FRAUD_GRAPH_STORE = os.getenv("FRAUD_GRAPH_STORE", "redis")
+    FRAUD_GRAPH_WINDOW_DAYS = max(1, int(os.getenv("FRAUD_GRAPH_WINDOW_DAYS", "7")))
+    FRAUD_GRAPH_MAX_CYCLE = max(2, int(os.getenv("FRAUD_GRAPH_MAX_CYCLE", "4")))
+    FRAUD_GRAPH_MAX_FANOUT = max(1, int(os.getenv("FRAUD_GRAPH_MAX_FANOUT", "200")))
+    # Registry de modelos de fraude: intervalo entre checagens de artefatos novos em disco
+    FRAUD_MODEL_RELOAD_SECONDS = float(os.getenv("FRAUD_MODEL_RELOAD_SECONDS", "30"))
+    # Inferencia em micro-lotes: espera maxima e linhas por lote
+    FRAUD_INFERENCE_WINDOW_MS = float(os.getenv("FRAUD_INFERENCE_WINDOW_MS", "2"))
+    FRAUD_INFERENCE_MAX_BATCH = max(1, int(os.getenv("FRAUD_INFERENCE_MAX_BATCH", "64")))
+    # Cache em disco (.npy, lido por memmap) do dataset de treino de fraude
+    FRAUD_DATASET_CACHE_DIR = os.getenv(
+        "FRAUD_DATASET_CACHE_DIR", os.path.join(os.getenv("FRAUD_MODEL_DIR", "/app/models"), "datasets")
+    )
+    # Feed de reputacao de IP (CSV prefixo,lista,categoria); vazio = faixas de documentacao embutidas
+    FRAUD_IP_REPUTATION_FILE = os.getenv("FRAUD_IP_REPUTATION_FILE", "")
+    FRAUD_IP_REPUTATION_RELOAD_SECONDS = float(os.getenv("FRAUD_IP_REPUTATION_RELOAD_SECONDS", "60"))
+    # Regras de fraude declarativas (YAML/JSON); vazio = regras embutidas
+    FRAUD_RULES_FILE = os.getenv("FRAUD_RULES_FILE", "")
+    FRAUD_RULES_RELOAD_SECONDS = float(os.getenv("FRAUD_RULES_RELOAD_SECONDS", "30"))
+    # Outbox de efeitos de fraude (alertas/notificacao): polling, lote, lease e retries
+    FRAUD_OUTBOX_POLL_SECONDS = float(os.getenv("FRAUD_OUTBOX_POLL_SECONDS", "2"))
+    FRAUD_OUTBOX_BATCH_SIZE = max(1, int(os.getenv("FRAUD_OUTBOX_BATCH_SIZE", "100")))
+    FRAUD_OUTBOX_LEASE_SECONDS = int(os.getenv("FRAUD_OUTBOX_LEASE_SECONDS", "60"))
+    FRAUD_OUTBOX_RETRY_SECONDS = int(os.getenv("FRAUD_OUTBOX_RETRY_SECONDS", "10"))
+    FRAUD_OUTBOX_MAX_ATTEMPTS = max(1, int(os.getenv("FRAUD_OUTBOX_MAX_ATTEMPTS", "8")))
+    # Cache por processo de limites/KYC (0 desliga); invalidado via pub/sub do Redis
+    POLICY_CACHE_TTL_SECONDS = float(os.getenv("POLICY_CACHE_TTL_SECONDS", "300"))
+    POLICY_CACHE_MAX_ENTRIES = int(os.getenv("POLICY_CACHE_MAX_ENTRIES", "50000"))
+    # Contexto de autenticacao por jti (0 desliga); logout/revogacao invalidam via pub/sub
+    AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+    AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "100000"))
+    # Tempo por etapa do hot path (histogramas) e consultas SQL por requisicao; spans OTel opcionais
+    INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "true").lower() in {"1", "true", "yes"}
+    INSTRUMENTATION_OTEL_SPANS = os.getenv("INSTRUMENTATION_OTEL_SPANS", "false").lower() in {"1", "true", "yes"}
+    SLOW_REQUEST_THRESHOLD_MS = float(os.getenv("SLOW_REQUEST_THRESHOLD_MS", "500"))
+    SLOW_REQUEST_SAMPLE_RATE = float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "0.1"))
 
     _INVALID_PLACEHOLDERS = {"CHANGEME_SECRET_KEY", "CHANGEME_ENCRYPTION_KEY", "", None}
 
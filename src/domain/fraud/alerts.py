@@ -4,12 +4,15 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 class FraudAlertService:
     @staticmethod
-    async def alert_team(db: AsyncSession, account_id: int, message: str, severity: str = "HIGH"):
+    async def alert_team(
+        db: AsyncSession, account_id: int, message: str, severity: str = "HIGH", commit: bool = True
+    ):
         alert = models.FraudTeamAlert(
             account_id=account_id,
             severity=severity,
             message=message,
         )
         db.add(alert)
-        await db.commit()
+        if commit:
+            await db.commit()
         return alert
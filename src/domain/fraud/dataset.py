@@ -0,0 +1,341 @@
+import glob
+import os
+from datetime import datetime, time as dt_time, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.fraud.engine import FEATURE_LABELS
+from src.domain.fraud.features import epoch_seconds
+from src.domain.fraud.graph import TransferGraph
+from src.domain.fraud.ip_reputation import category_code, ip_reputation
+from src.domain.fraud.rules import fraud_rules
+from src.domain.ledger import models as ledger_models
+from src.domain.security import models as security_models
+
+# Incrementar quando o layout ou o calculo das features mudar (invalida o cache .npy)
+FEATURE_VERSION = 2
+WINDOW_SECONDS = (("tx_1m", 60), ("tx_10m", 600), ("tx_1h", 3600), ("tx_24h", 86400))
+# O dataset historico nao tem IP/UA/device da requisicao: mesmos valores que o treino sempre usou
+TRAINING_IP = "127.0.0.1"
+# Chave composta (grupo << 32 | valor): um searchsorted global responde janelas por conta/usuario
+_SHIFT = np.int64(1 << 32)
+
+
+def _float_seconds(moment: datetime) -> float:
+    return moment.replace(tzinfo=timezone.utc).timestamp()
+
+
+def _previous_same(groups: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Para cada posicao, indice da ocorrencia anterior do mesmo (grupo, valor), ou -1.
+
+    Conta distintos em uma fatia [lo, hi) como `count(prev[lo:hi] < lo)`.
+    """
+    prev = np.full(len(values), -1, dtype=np.int64)
+    if not len(values):
+        return prev
+    order = np.lexsort((np.arange(len(values)), values, groups))
+    same = (groups[order][1:] == groups[order][:-1]) & (values[order][1:] == values[order][:-1])
+    prev[order[1:][same]] = order[:-1][same]
+    return prev
+
+
+class FraudDataset:
+    """Dataset de treino de fraude montado por conjunto, com features no ponto no tempo.
+
+    Poucas consultas em lote (transacoes com favorecido, saldos de abertura, postings,
+    usuarios e sessoes) e janelas calculadas com arrays ordenados e searchsorted. Cada linha
+    reproduz o que `FraudEngine.build_features` teria visto imediatamente antes da
+    transacao, no mesmo layout (`FEATURE_LABELS`). O resultado fica em `.npy` e e lido por
+    memmap nas execucoes seguintes enquanto o ledger da janela nao mudar.
+    """
+
+    @staticmethod
+    def _since(days: int) -> datetime:
+        # Inicio alinhado ao dia: execucoes no mesmo dia reaproveitam o cache
+        return datetime.combine((datetime.utcnow() - timedelta(days=days)).date(), dt_time.min)
+
+    @staticmethod
+    async def _cache_key(db: AsyncSession, since: datetime) -> str | None:
+        tx = ledger_models.Transaction
+        stmt = select(func.max(tx.id), func.count(tx.id)).where(tx.timestamp >= since, tx.account_id.is_not(None))
+        max_id, count = (await db.execute(stmt)).one()
+        if not count:
+            return None
+        return f"fraud_dataset_v{FEATURE_VERSION}_{since:%Y%m%d}_{max_id}_{count}"
+
+    @staticmethod
+    async def _load_events(db: AsyncSession, history_since: datetime) -> dict:
+        tx = ledger_models.Transaction
+        credit = ledger_models.Posting
+        stmt = (
+            select(tx.id, tx.account_id, tx.timestamp, tx.amount, credit.account_id)
+            .outerjoin(
+                credit,
+                and_(
+                    credit.transaction_id == tx.id,
+                    credit.amount > 0,
+                    tx.operation_type.in_(["TRANSFER", "PIX"]),
+                ),
+            )
+            .where(tx.timestamp >= history_since, tx.account_id.is_not(None))
+            .order_by(tx.timestamp.asc(), tx.id.asc())
+            .execution_options(yield_per=settings.LEDGER_EXPORT_CHUNK_SIZE)
+        )
+        ids, accounts, timestamps, amounts, payees = [], [], [], [], []
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            for tx_id, account_id, timestamp, amount, payee_id in rows:
+                ids.append(tx_id)
+                accounts.append(account_id)
+                timestamps.append(timestamp)
+                amounts.append(float(amount))
+                payees.append(-1 if payee_id is None else payee_id)
+        return {
+            "id": np.array(ids, dtype=np.int64),
+            "account": np.array(accounts, dtype=np.int64),
+            "datetime": timestamps,
+            "ts": np.array([epoch_seconds(moment) for moment in timestamps], dtype=np.int64),
+            "ts_float": np.array([_float_seconds(moment) for moment in timestamps], dtype=np.float64),
+            "amount": np.array(amounts, dtype=np.float64),
+            "payee": np.array(payees, dtype=np.int64),
+        }
+
+    @staticmethod
+    async def _balances_before(db: AsyncSession, events: dict, rows: np.ndarray) -> np.ndarray:
+        """Saldo de cada conta imediatamente antes da transacao da linha (soma de postings)."""
+        posting = ledger_models.Posting
+        first_id = int(events["id"].min())
+        accounts = np.unique(events["account"][rows])
+        account_list = [int(a) for a in accounts]
+
+        stmt_open = (
+            select(posting.account_id, func.coalesce(func.sum(posting.amount), 0))
+            .where(posting.account_id.in_(account_list), posting.transaction_id < first_id)
+            .group_by(posting.account_id)
+        )
+        opening = {account_id: float(total) for account_id, total in (await db.execute(stmt_open)).all()}
+
+        stmt_postings = (
+            select(posting.account_id, posting.transaction_id, posting.amount)
+            .where(posting.account_id.in_(account_list), posting.transaction_id >= first_id)
+            .order_by(posting.account_id.asc(), posting.transaction_id.asc(), posting.id.asc())
+        )
+        postings = (await db.execute(stmt_postings)).all()
+        p_account = np.array([row[0] for row in postings], dtype=np.int64)
+        p_tx = np.array([row[1] for row in postings], dtype=np.int64)
+        p_amount = np.array([float(row[2]) for row in postings], dtype=np.float64)
+        p_key = p_account * _SHIFT + p_tx
+        cumulative = np.concatenate(([0.0], np.cumsum(p_amount)))
+
+        row_accounts = events["account"][rows]
+        # Postings da conta com transaction_id menor que o da linha: [inicio do grupo, posicao)
+        group_start = np.searchsorted(p_key, row_accounts * _SHIFT, side="left")
+        position = np.searchsorted(p_key, row_accounts * _SHIFT + events["id"][rows], side="left")
+        opening_arr = np.array([opening.get(int(a), 0.0) for a in row_accounts], dtype=np.float64)
+        return opening_arr + cumulative[position] - cumulative[group_start]
+
+    @staticmethod
+    async def _users(db: AsyncSession, accounts: np.ndarray) -> dict:
+        stmt = (
+            select(ledger_models.Account.id, ledger_models.Account.user_id, ledger_models.User.created_at)
+            .outerjoin(ledger_models.User, ledger_models.User.id == ledger_models.Account.user_id)
+            .where(ledger_models.Account.id.in_([int(a) for a in accounts]))
+        )
+        return {account_id: (user_id, created_at) for account_id, user_id, created_at in (await db.execute(stmt)).all()}
+
+    @staticmethod
+    async def _distinct_ips(db: AsyncSession, user_ids: np.ndarray, row_ts: np.ndarray, since: datetime) -> np.ndarray:
+        session = security_models.Session
+        known = sorted({int(u) for u in user_ids if u >= 0})
+        result = np.zeros(len(row_ts), dtype=np.int64)
+        if not known:
+            return result
+        stmt = (
+            select(session.user_id, session.created_at, session.ip_address)
+            .where(session.user_id.in_(known), session.created_at >= since, session.ip_address.is_not(None))
+            .order_by(session.user_id.asc(), session.created_at.asc())
+        )
+        sessions = (await db.execute(stmt)).all()
+        if not sessions:
+            return result
+        s_user = np.array([row[0] for row in sessions], dtype=np.int64)
+        s_ts = np.array([epoch_seconds(row[1]) for row in sessions], dtype=np.int64)
+        _, s_ip = np.unique(np.array([row[2] for row in sessions]), return_inverse=True)
+        s_key = s_user * _SHIFT + s_ts
+        prev = _previous_same(s_user, s_ip.astype(np.int64))
+
+        lo = np.searchsorted(s_key, user_ids * _SHIFT + (row_ts - 86400), side="left")
+        hi = np.searchsorted(s_key, user_ids * _SHIFT + row_ts, side="right")
+        for i in np.nonzero((hi > lo) & (user_ids >= 0))[0]:
+            result[i] = np.count_nonzero(prev[lo[i]:hi[i]] < lo[i])
+        return result
+
+    @staticmethod
+    async def _network(events: dict, rows_mask: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Reproduz o grafo de transferencias em ordem e consulta ciclo/mula antes de cada linha."""
+        graph = TransferGraph(backend="memory")
+        cycle = np.zeros(int(rows_mask.sum()), dtype=np.float64)
+        mule = np.zeros(len(cycle), dtype=np.float64)
+        pending = []
+        row = 0
+        for i in range(len(events["id"])):
+            moment = events["datetime"][i]
+            if rows_mask[i]:
+                if pending:
+                    await graph.record_many(pending, now=moment)
+                    pending = []
+                net = await graph.signals(int(events["account"][i]), now=moment)
+                cycle[row] = 1 if net["cycle"] else 0
+                mule[row] = net["mule"]
+                row += 1
+            payee = int(events["payee"][i])
+            if payee >= 0:
+                pending.append((int(events["account"][i]), payee, moment))
+        return cycle, mule
+
+    @staticmethod
+    async def compute(db: AsyncSession, since: datetime) -> np.ndarray:
+        """Matriz de features (linhas em ordem de timestamp, id) das transacoes desde `since`."""
+        history_since = since - timedelta(days=max(1, settings.FRAUD_GRAPH_WINDOW_DAYS))
+        events = await FraudDataset._load_events(db, history_since)
+        if not len(events["id"]):
+            return np.zeros((0, len(FEATURE_LABELS)), dtype=np.float64)
+        rows_mask = events["ts_float"] >= _float_seconds(since)
+        rows = np.nonzero(rows_mask)[0]
+
+        # Eventos por (conta, timestamp, id): janelas da conta sao fatias contiguas
+        order = np.lexsort((events["id"], events["ts"], events["account"]))
+        position_of = np.empty(len(order), dtype=np.int64)
+        position_of[order] = np.arange(len(order))
+        s_account = events["account"][order]
+        s_key = s_account * _SHIFT + events["ts"][order]
+        s_amount = events["amount"][order]
+        s_payee = events["payee"][order]
+        cum_amount = np.concatenate(([0.0], np.cumsum(s_amount)))
+        cum_square = np.concatenate(([0.0], np.cumsum(s_amount * s_amount)))
+
+        row_account = events["account"][rows]
+        row_ts = events["ts"][rows]
+        row_amount = events["amount"][rows]
+        # Posicao da propria transacao: a janela cobre so o que veio antes dela
+        hi = position_of[rows]
+        group_start = np.searchsorted(s_key, row_account * _SHIFT, side="left")
+
+        columns = {}
+        lo_by_window = {}
+        for name, seconds in WINDOW_SECONDS:
+            lo = np.maximum(np.searchsorted(s_key, row_account * _SHIFT + (row_ts - seconds), side="left"), group_start)
+            lo_by_window[name] = lo
+            columns[name] = (hi - lo).astype(np.float64)
+
+        lo_day = lo_by_window["tx_24h"]
+        count_day = columns["tx_24h"]
+        safe_count = np.where(count_day > 0, count_day, 1.0)
+        avg = np.where(count_day > 0, (cum_amount[hi] - cum_amount[lo_day]) / safe_count, 0.0)
+        variance = np.where(count_day > 0, (cum_square[hi] - cum_square[lo_day]) / safe_count - avg * avg, 0.0)
+        std = np.sqrt(np.clip(variance, 0.0, None))
+        columns["avg_24h"] = avg
+        columns["std_24h"] = std
+        columns["amount"] = row_amount
+        columns["zscore"] = np.abs((row_amount - avg) / np.where(std > 0, std, 1.0))
+
+        prev_payee = _previous_same(s_account, s_payee)
+        distinct_payees = np.zeros(len(rows), dtype=np.float64)
+        for i in np.nonzero(hi > lo_day)[0]:
+            window = slice(lo_day[i], hi[i])
+            distinct_payees[i] = np.count_nonzero((s_payee[window] >= 0) & (prev_payee[window] < lo_day[i]))
+        columns["distinct_payees_24h"] = distinct_payees
+
+        # Ultimo lancamento da conta: evento anterior no grupo ou, sem ele, busca indexada
+        has_previous = hi > group_start
+        last_ts = np.where(has_previous, events["ts"][order][np.maximum(hi - 1, 0)], 0)
+        missing = np.nonzero(~has_previous)[0]
+        if len(missing):
+            tx = ledger_models.Transaction
+            stmt = (
+                select(tx.account_id, func.max(tx.timestamp))
+                .where(tx.account_id.in_({int(a) for a in row_account[missing]}), tx.timestamp < history_since)
+                .group_by(tx.account_id)
+            )
+            earlier = {account_id: epoch_seconds(moment) for account_id, moment in (await db.execute(stmt)).all()}
+            last_ts[missing] = [earlier.get(int(a), 0) for a in row_account[missing]]
+        columns["last_tx_delta"] = np.where(last_ts > 0, np.maximum(0, row_ts - last_ts), 0).astype(np.float64)
+
+        balance = await FraudDataset._balances_before(db, events, rows)
+        columns["balance"] = balance
+
+        users = await FraudDataset._users(db, np.unique(row_account))
+        user_ids = np.array([users.get(int(a), (None, None))[0] or -1 for a in row_account], dtype=np.int64)
+        created = np.array(
+            [
+                _float_seconds(users[int(a)][1]) if users.get(int(a), (None, None))[1] else np.nan
+                for a in row_account
+            ],
+            dtype=np.float64,
+        )
+        age = np.floor((events["ts_float"][rows] - created) / 86400)
+        columns["account_age_days"] = np.where(np.isnan(age), 0, age)
+        columns["distinct_ips_24h"] = (
+            await FraudDataset._distinct_ips(db, user_ids, row_ts, since - timedelta(days=1))
+        ).astype(np.float64)
+
+        columns["hour"] = ((row_ts // 3600) % 24).astype(np.float64)
+        # 1970-01-01 foi quinta-feira (weekday 3)
+        columns["weekday"] = (((row_ts // 86400) + 3) % 7).astype(np.float64)
+        columns["is_night"] = (columns["hour"] < 6).astype(np.float64)
+        columns["device_known"] = np.zeros(len(rows))
+        reputation = ip_reputation.lookup(TRAINING_IP)
+        columns["ip_suspicious"] = np.full(len(rows), 0.0 if reputation is None else 1.0)
+        columns["ip_rep_category"] = np.full(len(rows), float(category_code(reputation)))
+        columns["ua_len"] = np.zeros(len(rows))
+        columns["net_cycle"], columns["net_mule"] = await FraudDataset._network(events, rows_mask)
+
+        three_sigma = np.where(std > 0, 3 * std, 0.0)
+        columns["over_3sigma"] = (row_amount > avg + three_sigma).astype(np.float64)
+        columns["over_balance"] = (row_amount > balance).astype(np.float64)
+        columns["new_account"] = (columns["account_age_days"] < 7).astype(np.float64)
+        columns["tx_10m_spike"] = (columns["tx_10m"] >= 10).astype(np.float64)
+        columns["tx_1h_spike"] = (columns["tx_1h"] >= 20).astype(np.float64)
+        columns["high_value_10k"] = (row_amount > 10000).astype(np.float64)
+        columns["balance_zero"] = (balance <= 0).astype(np.float64)
+        columns["dust_tx"] = (row_amount < 1).astype(np.float64)
+        return np.column_stack([columns[label] for label in FEATURE_LABELS])
+
+    @staticmethod
+    def labels(X: np.ndarray) -> np.ndarray:
+        scores, _ = fraud_rules.evaluate_matrix(X, FEATURE_LABELS)
+        return (scores >= 60).astype(np.int64)
+
+    @staticmethod
+    async def build(
+        db: AsyncSession,
+        days: int = 30,
+        cache_dir: str | None = None,
+        use_cache: bool = True,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Devolve (X, y) das transacoes dos ultimos `days` dias, reaproveitando o cache em disco."""
+        since = FraudDataset._since(days)
+        key = await FraudDataset._cache_key(db, since)
+        if key is None:
+            return np.zeros((0, len(FEATURE_LABELS)), dtype=np.float64), np.zeros(0, dtype=np.int64)
+
+        cache_dir = cache_dir or settings.FRAUD_DATASET_CACHE_DIR
+        x_path = os.path.join(cache_dir, f"{key}_X.npy")
+        y_path = os.path.join(cache_dir, f"{key}_y.npy")
+        if use_cache and os.path.exists(x_path) and os.path.exists(y_path):
+            return np.load(x_path, mmap_mode="r"), np.load(y_path, mmap_mode="r")
+
+        X = await FraudDataset.compute(db, since)
+        y = FraudDataset.labels(X)
+        if use_cache:
+            os.makedirs(cache_dir, exist_ok=True)
+            for stale in glob.glob(os.path.join(cache_dir, "fraud_dataset_*.npy")):
+                os.remove(stale)
+            for path, array in ((x_path, X), (y_path, y)):
+                tmp_path = f"{path[:-4]}.tmp.npy"
+                np.save(tmp_path, array)
+                os.replace(tmp_path, path)
+        return X, y
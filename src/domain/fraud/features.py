@@ -0,0 +1,353 @@
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import models as ledger_models
+from src.infra.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Aneis de buckets por conta: (prefixo, largura em segundos, quantidade de slots).
+# Cada slot guarda o inicio do bucket; slot com inicio antigo e sobrescrito (ring buffer).
+RING_10S = ("s", 10, 60)     # 1m e 10m
+RING_1M = ("m", 60, 60)      # 1h
+RING_1H = ("h", 3600, 24)    # 24h, com media/variancia (Welford) por bucket
+RINGS = (RING_10S, RING_1M, RING_1H)
+
+# Janela -> (anel, numero de buckets). A janela cobre o bucket corrente e os anteriores,
+# entao fica entre (n - 1) e n larguras de bucket.
+WINDOWS = {
+    "tx_1m": (RING_10S, 6),
+    "tx_10m": (RING_10S, 60),
+    "tx_1h": (RING_1M, 60),
+    "tx_24h": (RING_1H, 24),
+}
+
+PAYEE_TTL_SECONDS = 25 * 3600
+
+# Mesma atualizacao de FeatureState.apply, atomica no Redis (um EVALSHA por lancamento)
+_RECORD_LUA = """
+local ts = tonumber(ARGV[1])
+local amount = tonumber(ARGV[2])
+local rings = {{'s', 10, 60}, {'m', 60, 60}, {'h', 3600, 24}}
+for _, ring in ipairs(rings) do
+  local width = ring[2]
+  local start = ts - (ts % width)
+  local field = ring[1] .. ':' .. ((start / width) % ring[3])
+  local cur = redis.call('HGET', KEYS[1], field)
+  local cur_start, count, mean, m2 = -1, 0, 0, 0
+  if cur then
+    local parts = {}
+    for part in string.gmatch(cur, '[^|]+') do table.insert(parts, part) end
+    cur_start = tonumber(parts[1])
+    if cur_start == start then
+      count = tonumber(parts[2])
+      if ring[1] == 'h' then
+        mean = tonumber(parts[3])
+        m2 = tonumber(parts[4])
+      end
+    end
+  end
+  if cur_start <= start then
+    count = count + 1
+    if ring[1] == 'h' then
+      local delta = amount - mean
+      mean = mean + delta / count
+      m2 = m2 + delta * (amount - mean)
+      redis.call('HSET', KEYS[1], field, string.format('%d|%d|%.17g|%.17g', start, count, mean, m2))
+    else
+      redis.call('HSET', KEYS[1], field, string.format('%d|%d', start, count))
+    end
+  end
+end
+local last = tonumber(redis.call('HGET', KEYS[1], 'last') or '0')
+if ts > last then
+  redis.call('HSET', KEYS[1], 'last', string.format('%d', ts))
+end
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+if ARGV[3] ~= '' then
+  redis.call('PFADD', KEYS[2], ARGV[3])
+  redis.call('EXPIRE', KEYS[2], tonumber(ARGV[5]))
+end
+return 1
+"""
+
+
+def epoch_seconds(moment: datetime) -> int:
+    # Timestamps do ledger sao UTC sem tzinfo
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _state_key(account_id: int) -> str:
+    # Hash tag {account_id}: estado e sketches da conta no mesmo slot do Redis Cluster
+    return f"fraud:features:{{{account_id}}}"
+
+
+def _payee_key(account_id: int, hour_start: int) -> str:
+    return f"fraud:features:{{{account_id}}}:payees:{hour_start}"
+
+
+def _hour_starts(now: int) -> list[int]:
+    current = now - (now % 3600)
+    return [current - (i * 3600) for i in range(RING_1H[2])]
+
+
+class FeatureState:
+    """Operacoes sobre o estado serializado de uma conta (mesmo formato do hash no Redis)."""
+
+    @staticmethod
+    def apply(fields: dict, ts: int, amount: float) -> None:
+        for prefix, width, slots in RINGS:
+            start = ts - (ts % width)
+            field = f"{prefix}:{(start // width) % slots}"
+            cur_start, count, mean, m2 = -1, 0, 0.0, 0.0
+            current = fields.get(field)
+            if current:
+                parts = current.split("|")
+                cur_start = int(parts[0])
+                if cur_start == start:
+                    count = int(parts[1])
+                    if prefix == "h":
+                        mean, m2 = float(parts[2]), float(parts[3])
+            if cur_start > start:
+                # Lancamento mais antigo que o bucket que ocupa o slot: fora de todas as janelas
+                continue
+            count += 1
+            if prefix == "h":
+                delta = amount - mean
+                mean += delta / count
+                m2 += delta * (amount - mean)
+                fields[field] = f"{start}|{count}|{mean!r}|{m2!r}"
+            else:
+                fields[field] = f"{start}|{count}"
+        if ts > int(fields.get("last", 0)):
+            fields["last"] = str(ts)
+
+    @staticmethod
+    def read(fields: dict, now: int) -> dict:
+        result = {}
+        for name, ((prefix, width, slots), buckets) in WINDOWS.items():
+            oldest = (now - (now % width)) - (buckets - 1) * width
+            total = 0
+            for slot in range(slots):
+                current = fields.get(f"{prefix}:{slot}")
+                if not current:
+                    continue
+                parts = current.split("|")
+                if oldest <= int(parts[0]) <= now:
+                    total += int(parts[1])
+            result[name] = total
+
+        # Combinacao paralela de Welford (Chan et al.) dos buckets horarios da janela
+        oldest = (now - (now % 3600)) - 23 * 3600
+        count, mean, m2 = 0, 0.0, 0.0
+        for slot in range(RING_1H[2]):
+            current = fields.get(f"h:{slot}")
+            if not current:
+                continue
+            start, b_count, b_mean, b_m2 = current.split("|")
+            if not (oldest <= int(start) <= now):
+                continue
+            b_count, b_mean, b_m2 = int(b_count), float(b_mean), float(b_m2)
+            total = count + b_count
+            delta = b_mean - mean
+            mean += delta * b_count / total
+            m2 += b_m2 + delta * delta * count * b_count / total
+            count = total
+        variance = (m2 / count) if count else 0.0
+        result["avg_24h"] = mean if count else 0.0
+        result["std_24h"] = max(variance, 0.0) ** 0.5
+        last = fields.get("last")
+        result["last_tx_ts"] = int(last) if last else None
+        return result
+
+
+class LocalFeatureStore:
+    """Fallback em memoria do processo (LRU por conta) quando o Redis nao responde."""
+
+    def __init__(self, max_accounts: int | None = None):
+        self.max_accounts = settings.FRAUD_FEATURES_LOCAL_MAX_ACCOUNTS if max_accounts is None else max_accounts
+        self._states: OrderedDict = OrderedDict()
+        self._payees: dict = {}
+
+    def record(self, account_id: int, ts: int, amount: float, payee_id: int | None = None):
+        fields = self._states.pop(account_id, None) or {}
+        FeatureState.apply(fields, ts, amount)
+        self._states[account_id] = fields
+        if payee_id is not None:
+            hour = ts - (ts % 3600)
+            self._payees.setdefault(account_id, {}).setdefault(hour, set()).add(payee_id)
+        while len(self._states) > self.max_accounts:
+            evicted, _ = self._states.popitem(last=False)
+            self._payees.pop(evicted, None)
+
+    def read(self, account_id: int, now: int) -> dict:
+        features = FeatureState.read(self._states.get(account_id, {}), now)
+        hours = self._payees.get(account_id, {})
+        valid = set(_hour_starts(now))
+        for hour in [h for h in hours if h not in valid]:
+            hours.pop(hour, None)
+        payees = set()
+        for members in hours.values():
+            payees |= members
+        features["distinct_payees_24h"] = len(payees)
+        return features
+
+    def clear(self):
+        self._states.clear()
+        self._payees.clear()
+
+
+class FeatureStore:
+    """Features de janela movel por conta, atualizadas a cada commit do ledger.
+
+    Contagens 1m/10m/1h/24h, media e desvio (Welford) dos valores em 24h, hora do ultimo
+    lancamento e um HyperLogLog de favorecidos distintos por hora. Vive no Redis; se o
+    Redis falhar, le e escreve no fallback em memoria do processo.
+    """
+
+    def __init__(self, backend: str | None = None):
+        self.backend = (backend or settings.FRAUD_FEATURE_STORE).lower()
+        self.local = LocalFeatureStore()
+        self._script_sha: str | None = None
+
+    @staticmethod
+    def _record_call(account_id: int, ts: int, amount: float, payee_id: int | None) -> tuple[list, list]:
+        keys = [_state_key(account_id), _payee_key(account_id, ts - (ts % 3600))]
+        args = [
+            ts,
+            repr(float(amount)),
+            "" if payee_id is None else str(payee_id),
+            settings.FRAUD_FEATURES_TTL_SECONDS,
+            PAYEE_TTL_SECONDS,
+        ]
+        return keys, args
+
+    async def _script(self, redis, reload: bool = False) -> str:
+        if self._script_sha is None or reload:
+            self._script_sha = await redis.script_load(_RECORD_LUA)
+        return self._script_sha
+
+    async def _eval_record(self, redis, calls: list[tuple[list, list]]):
+        sha = await self._script(redis)
+        for attempt in range(2):
+            pipe = redis.pipeline(transaction=False)
+            for keys, args in calls:
+                pipe.evalsha(sha, len(keys), *keys, *args)
+            try:
+                await pipe.execute()
+                return
+            except Exception as exc:
+                # Redis reiniciado perde o cache de scripts: recarrega uma vez
+                if attempt or "NOSCRIPT" not in str(exc):
+                    raise
+                sha = await self._script(redis, reload=True)
+
+    async def record(self, account_id: int, amount, timestamp: datetime | None = None, payee_id: int | None = None):
+        ts = epoch_seconds(timestamp) if timestamp else int(time.time())
+        await self._record_many([(account_id, ts, float(amount), payee_id)])
+
+    async def record_many(self, items: list[tuple]):
+        """Varios lancamentos (account_id, amount, timestamp, payee_id) em um unico pipeline."""
+        await self._record_many([
+            (account_id, epoch_seconds(timestamp), float(amount), payee_id)
+            for account_id, amount, timestamp, payee_id in items
+        ])
+
+    async def _record_many(self, events: list[tuple]):
+        if self.backend == "redis":
+            try:
+                await self._eval_record(get_redis(), [self._record_call(*event) for event in events])
+                return
+            except Exception as exc:
+                logger.warning(f"Feature store Redis indisponivel, usando fallback local: {exc}")
+        for account_id, ts, amount, payee_id in events:
+            self.local.record(account_id, ts, amount, payee_id)
+
+    async def read(self, account_id: int, now: datetime | None = None) -> dict:
+        now_ts = epoch_seconds(now) if now else int(time.time())
+        if self.backend == "redis":
+            try:
+                redis = get_redis()
+                pipe = redis.pipeline(transaction=False)
+                pipe.hgetall(_state_key(account_id))
+                pipe.pfcount(*[_payee_key(account_id, hour) for hour in _hour_starts(now_ts)])
+                fields, payees = await pipe.execute()
+                features = FeatureState.read(fields or {}, now_ts)
+                features["distinct_payees_24h"] = int(payees or 0)
+                return features
+            except Exception as exc:
+                logger.warning(f"Feature store Redis indisponivel, usando fallback local: {exc}")
+        return self.local.read(account_id, now_ts)
+
+    async def reset(self):
+        self.local.clear()
+        if self.backend != "redis":
+            return
+        redis = get_redis()
+        batch = []
+        async for key in redis.scan_iter(match="fraud:features:*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await redis.delete(*batch)
+                batch = []
+        if batch:
+            await redis.delete(*batch)
+
+    async def rebuild(self, db: AsyncSession, hours: int = 24, batch_size: int | None = None) -> dict:
+        """Repopula o store a partir do ledger (lancamentos das ultimas `hours` horas)."""
+        batch_size = batch_size or settings.LEDGER_EXPORT_CHUNK_SIZE
+        started = time.perf_counter()
+        await self.reset()
+        since = datetime.utcnow() - timedelta(hours=hours)
+        tx = ledger_models.Transaction
+        posting = ledger_models.Posting
+        # Favorecido = posting de credito das transferencias; demais operacoes nao tem
+        stmt = (
+            select(tx.account_id, tx.timestamp, tx.amount, posting.account_id)
+            .outerjoin(
+                posting,
+                and_(
+                    posting.transaction_id == tx.id,
+                    posting.amount > 0,
+                    tx.operation_type.in_(["TRANSFER", "PIX"]),
+                ),
+            )
+            .where(tx.timestamp >= since, tx.account_id.is_not(None))
+            .order_by(tx.timestamp.asc(), tx.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        count = 0
+        accounts = set()
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            events = [
+                (account_id, epoch_seconds(timestamp), float(amount), payee_id)
+                for account_id, timestamp, amount, payee_id in rows
+            ]
+            await self._record_many(events)
+            accounts.update(event[0] for event in events)
+            count += len(events)
+        return {
+            "transactions": count,
+            "accounts": len(accounts),
+            "duration_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    @staticmethod
+    async def last_transaction_ts(db: AsyncSession, account_id: int) -> int | None:
+        # Conta sem lancamentos recentes no store: uma busca indexada (account_id, timestamp)
+        stmt = select(func.max(ledger_models.Transaction.timestamp)).where(
+            ledger_models.Transaction.account_id == account_id
+        )
+        res = await db.execute(stmt)
+        last = res.scalar()
+        return epoch_seconds(last) if last else None
+
+
+feature_store = FeatureStore()
@@ -0,0 +1,234 @@
+import logging
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from src.core.config import settings
+from src.domain.fraud.features import epoch_seconds
+from src.domain.ledger import models as ledger_models
+from src.infra.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+OUT = "out"
+IN = "in"
+
+
+def _edge_key(direction: str, account_id: int) -> str:
+    return f"fraud:graph:{direction}:{account_id}"
+
+
+class MemoryGraphBackend:
+    """Adjacencia em memoria do processo: {conta: {vizinho: ultimo timestamp}} por direcao."""
+
+    SWEEP_EVERY = 10000
+
+    def __init__(self):
+        self._edges = {OUT: {}, IN: {}}
+        self._writes = 0
+
+    async def add_edges(self, edges: list[tuple[int, int, int]], since: int):
+        for payer, payee, ts in edges:
+            out_edges = self._edges[OUT].setdefault(payer, {})
+            out_edges[payee] = max(ts, out_edges.get(payee, 0))
+            in_edges = self._edges[IN].setdefault(payee, {})
+            in_edges[payer] = max(ts, in_edges.get(payer, 0))
+        self._writes += len(edges)
+        if self._writes >= self.SWEEP_EVERY:
+            # Expiracao preguicosa: arestas velhas somem na leitura e, de tempos em tempos, numa varredura
+            self._writes = 0
+            for adjacency in self._edges.values():
+                for node in list(adjacency):
+                    self._prune(adjacency, node, since)
+
+    @staticmethod
+    def _prune(adjacency: dict, node: int, since: int) -> dict:
+        neighbors = adjacency.get(node)
+        if not neighbors:
+            return {}
+        stale = [other for other, ts in neighbors.items() if ts < since]
+        for other in stale:
+            neighbors.pop(other)
+        if not neighbors:
+            adjacency.pop(node, None)
+        return neighbors
+
+    async def neighbors(self, direction: str, nodes: list[int], since: int, limit: int) -> dict[int, list[int]]:
+        adjacency = self._edges[direction]
+        result = {}
+        for node in nodes:
+            edges = self._prune(adjacency, node, since)
+            if len(edges) > limit:
+                result[node] = sorted(edges, key=edges.get, reverse=True)[:limit]
+            else:
+                result[node] = list(edges)
+        return result
+
+    async def degrees(self, account_id: int, since: int) -> tuple[int, int]:
+        return (
+            len(self._prune(self._edges[OUT], account_id, since)),
+            len(self._prune(self._edges[IN], account_id, since)),
+        )
+
+    def clear(self):
+        self._edges = {OUT: {}, IN: {}}
+        self._writes = 0
+
+    async def reset(self):
+        self.clear()
+
+
+class RedisGraphBackend:
+    """Adjacencia em sorted sets (membro = vizinho, score = ultimo timestamp), compartilhada entre workers."""
+
+    async def add_edges(self, edges: list[tuple[int, int, int]], since: int):
+        ttl = settings.FRAUD_GRAPH_WINDOW_DAYS * 86400
+        pipe = get_redis().pipeline(transaction=False)
+        for payer, payee, ts in edges:
+            for key, member in ((_edge_key(OUT, payer), payee), (_edge_key(IN, payee), payer)):
+                pipe.zadd(key, {str(member): ts}, gt=True)
+                pipe.zremrangebyscore(key, "-inf", f"({since}")
+                pipe.expire(key, ttl)
+        await pipe.execute()
+
+    async def neighbors(self, direction: str, nodes: list[int], since: int, limit: int) -> dict[int, list[int]]:
+        pipe = get_redis().pipeline(transaction=False)
+        for node in nodes:
+            pipe.zrevrangebyscore(_edge_key(direction, node), "+inf", since, start=0, num=limit)
+        rows = await pipe.execute()
+        return {node: [int(member) for member in members] for node, members in zip(nodes, rows)}
+
+    async def degrees(self, account_id: int, since: int) -> tuple[int, int]:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zcount(_edge_key(OUT, account_id), since, "+inf")
+        pipe.zcount(_edge_key(IN, account_id), since, "+inf")
+        out_degree, in_degree = await pipe.execute()
+        return int(out_degree), int(in_degree)
+
+    async def reset(self):
+        redis = get_redis()
+        batch = []
+        async for key in redis.scan_iter(match="fraud:graph:*", count=1000):
+            batch.append(key)
+            if len(batch) >= 1000:
+                await redis.delete(*batch)
+                batch = []
+        if batch:
+            await redis.delete(*batch)
+
+
+class TransferGraph:
+    """Grafo de transferencias com janela deslizante, atualizado a cada transferencia commitada.
+
+    Responde ciclo de ate `max_cycle` arestas passando pela conta (busca bidirecional:
+    metade do caminho pelas arestas de saida, metade pelas de entrada) e graus de
+    entrada/saida distintos, com custo proporcional a vizinhanca local.
+    """
+
+    def __init__(self, backend: str | None = None):
+        self.backend = (backend or settings.FRAUD_GRAPH_STORE).lower()
+        self.memory = MemoryGraphBackend()
+        self.redis = RedisGraphBackend()
+
+    def _since(self, now_ts: int) -> int:
+        return now_ts - settings.FRAUD_GRAPH_WINDOW_DAYS * 86400
+
+    async def _call(self, method: str, *args):
+        if self.backend == "redis":
+            try:
+                return await getattr(self.redis, method)(*args)
+            except Exception as exc:
+                logger.warning(f"Grafo de transferencias no Redis indisponivel, usando memoria local: {exc}")
+        return await getattr(self.memory, method)(*args)
+
+    async def record(self, payer_id: int, payee_id: int, timestamp: datetime | None = None):
+        await self.record_many([(payer_id, payee_id, timestamp)])
+
+    async def record_many(self, transfers: list[tuple], now: datetime | None = None):
+        """Registra transferencias (payer_id, payee_id, timestamp) commitadas.
+
+        `now` so e informado no replay historico (dataset de treino), para a janela
+        de expiracao acompanhar o tempo reproduzido e nao o relogio.
+        """
+        now_ts = epoch_seconds(now) if now else int(time.time())
+        edges = [
+            (payer, payee, epoch_seconds(timestamp) if timestamp else now_ts)
+            for payer, payee, timestamp in transfers
+            if payer != payee
+        ]
+        if edges:
+            await self._call("add_edges", edges, self._since(now_ts))
+
+    async def _expand(self, direction: str, frontier: set, since: int, depth: int, reached: dict):
+        fanout = settings.FRAUD_GRAPH_MAX_FANOUT
+        rows = await self._call("neighbors", direction, sorted(frontier), since, fanout)
+        next_frontier = set()
+        for members in rows.values():
+            for member in members:
+                if member not in reached:
+                    reached[member] = depth
+                    next_frontier.add(member)
+        return next_frontier
+
+    async def has_cycle(self, account_id: int, max_length: int | None = None, now: datetime | None = None) -> bool:
+        max_length = max_length or settings.FRAUD_GRAPH_MAX_CYCLE
+        since = self._since(epoch_seconds(now) if now else int(time.time()))
+        forward_depth = (max_length + 1) // 2
+        backward_depth = max_length // 2
+        forward = {}
+        backward = {}
+        f_frontier = {account_id}
+        b_frontier = {account_id}
+        for depth in range(1, max(forward_depth, backward_depth) + 1):
+            if depth <= forward_depth and f_frontier:
+                f_frontier = await self._expand(OUT, f_frontier, since, depth, forward)
+            if depth <= backward_depth and b_frontier:
+                b_frontier = await self._expand(IN, b_frontier, since, depth, backward)
+            # Voltar a propria conta (ou encontrar um no alcancado nas duas direcoes) fecha o ciclo
+            if account_id in forward or account_id in backward:
+                return True
+            if forward.keys() & backward.keys():
+                return True
+        return False
+
+    async def degrees(self, account_id: int, now: datetime | None = None) -> tuple[int, int]:
+        since = self._since(epoch_seconds(now) if now else int(time.time()))
+        return await self._call("degrees", account_id, since)
+
+    async def signals(self, account_id: int, now: datetime | None = None) -> dict:
+        out_degree, in_degree = await self.degrees(account_id, now=now)
+        mule = 1 if out_degree >= 5 and in_degree >= 5 else 0
+        # Sem arestas de saida ou de entrada nao ha ciclo possivel
+        cycle = bool(out_degree and in_degree) and await self.has_cycle(account_id, now=now)
+        return {"cycle": cycle, "mule": mule, "out_degree": out_degree, "in_degree": in_degree}
+
+    async def rebuild(self, db: AsyncSession, batch_size: int | None = None) -> dict:
+        """Repopula o grafo com as transferencias da janela a partir dos postings do ledger."""
+        batch_size = batch_size or settings.LEDGER_EXPORT_CHUNK_SIZE
+        if self.backend == "redis":
+            await self.redis.reset()
+        await self.memory.reset()
+        since = datetime.utcnow() - timedelta(days=settings.FRAUD_GRAPH_WINDOW_DAYS)
+        tx = ledger_models.Transaction
+        debit = aliased(ledger_models.Posting)
+        credit = aliased(ledger_models.Posting)
+        stmt = (
+            select(debit.account_id, credit.account_id, tx.timestamp)
+            .join(debit, and_(debit.transaction_id == tx.id, debit.amount < 0))
+            .join(credit, and_(credit.transaction_id == tx.id, credit.amount > 0))
+            .where(tx.timestamp >= since, tx.operation_type.in_(["TRANSFER", "PIX"]))
+            .order_by(tx.timestamp.asc(), tx.id.asc())
+            .execution_options(yield_per=batch_size)
+        )
+        count = 0
+        result = await db.stream(stmt)
+        async for rows in result.partitions():
+            await self.record_many([tuple(row) for row in rows])
+            count += len(rows)
+        return {"transfers": count}
+
+
+transfer_graph = TransferGraph()
@@ -0,0 +1,169 @@
+import csv
+import ipaddress
+import logging
+import os
+import threading
+import time
+from bisect import bisect_right
+from types import SimpleNamespace
+
+from src.core.config import settings
+from src.infra.metrics import FRAUD_IP_REPUTATION_PREFIXES
+
+logger = logging.getLogger(__name__)
+
+# Vocabulario fixo: o codigo da categoria vira feature numerica estavel entre recargas
+CATEGORIES = ("none", "other", "suspicious", "proxy", "vpn", "tor", "botnet", "scanner", "hosting", "spam", "invalid")
+CATEGORY_CODES = {name: code for code, name in enumerate(CATEGORIES)}
+
+# Faixas de documentacao (RFC 5737) usadas quando nenhum feed e configurado
+BUILTIN_PREFIXES = (
+    ("203.0.113.0/24", "builtin", "suspicious"),
+    ("198.51.100.0/24", "builtin", "suspicious"),
+    ("192.0.2.0/24", "builtin", "suspicious"),
+)
+
+INVALID = SimpleNamespace(list="invalid", category="invalid", prefix=None)
+
+
+def category_code(match: SimpleNamespace | None) -> int:
+    if match is None:
+        return CATEGORY_CODES["none"]
+    return CATEGORY_CODES.get(match.category, CATEGORY_CODES["other"])
+
+
+class IpReputationIndex:
+    """Prefixos IPv4/IPv6 achatados em intervalos disjuntos ordenados, um por familia.
+
+    Prefixos aninhados sao resolvidos na carga (o mais especifico vence no trecho que
+    cobre), entao o longest-prefix match vira um unico bisect sobre os inicios.
+    """
+
+    def __init__(self, prefixes=()):
+        self.size = 0
+        self._families = {}
+        by_family = {4: [], 6: []}
+        self._entries = []
+        for prefix, list_name, category in prefixes:
+            network = ipaddress.ip_network(prefix, strict=False)
+            self._entries.append(SimpleNamespace(list=list_name, category=category, prefix=str(network)))
+            by_family[network.version].append(
+                (int(network.network_address), int(network.broadcast_address), len(self._entries) - 1)
+            )
+        for version, ranges in by_family.items():
+            # Inicio crescente e, no mesmo inicio, o prefixo mais largo primeiro
+            ranges.sort(key=lambda item: (item[0], -item[1], item[2]))
+            self._families[version] = self._flatten(ranges)
+            self.size += len(ranges)
+
+    @staticmethod
+    def _flatten(ranges: list) -> tuple[list, list, list]:
+        starts, ends, owners = [], [], []
+
+        def emit(start, end, owner):
+            if start <= end:
+                starts.append(start)
+                ends.append(end)
+                owners.append(owner)
+
+        stack = []
+        cursor = 0
+        for start, end, owner in ranges:
+            while stack and stack[-1][1] < start:
+                _, top_end, top_owner = stack.pop()
+                emit(cursor, top_end, top_owner)
+                cursor = top_end + 1
+            if stack:
+                emit(cursor, start - 1, stack[-1][2])
+            stack.append((start, end, owner))
+            cursor = start
+        while stack:
+            _, top_end, top_owner = stack.pop()
+            emit(cursor, top_end, top_owner)
+            cursor = top_end + 1
+        return starts, ends, owners
+
+    def lookup(self, ip: str) -> SimpleNamespace | None:
+        """Prefixo mais especifico que contem `ip` (None se nenhum; INVALID se nao e um IP)."""
+        try:
+            address = ipaddress.ip_address(ip)
+        except (TypeError, ValueError):
+            return INVALID
+        starts, ends, owners = self._families[address.version]
+        value = int(address)
+        position = bisect_right(starts, value) - 1
+        if position >= 0 and value <= ends[position]:
+            return self._entries[owners[position]]
+        return None
+
+
+def load_prefixes(path: str) -> list[tuple[str, str, str]]:
+    """Le um feed CSV `prefixo[,lista[,categoria]]`; linhas vazias e `#` sao ignoradas."""
+    default_list = os.path.splitext(os.path.basename(path))[0]
+    prefixes = []
+    with open(path, newline="") as fh:
+        for row in csv.reader(fh):
+            if not row or not row[0].strip() or row[0].lstrip().startswith("#") or row[0].strip() == "prefix":
+                continue
+            prefix = row[0].strip()
+            list_name = row[1].strip() if len(row) > 1 and row[1].strip() else default_list
+            category = row[2].strip().lower() if len(row) > 2 and row[2].strip() else "suspicious"
+            prefixes.append((prefix, list_name, category))
+    return prefixes
+
+
+class IpReputation:
+    """Indice de reputacao do processo, recarregado a quente quando o arquivo muda.
+
+    Mesmo esquema do registry de modelos: `lookup()` nao faz I/O; a cada
+    `FRAUD_IP_REPUTATION_RELOAD_SECONDS` uma thread confere o mtime e troca o indice
+    inteiro. Feed com erro mantem o indice anterior.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = settings.FRAUD_IP_REPUTATION_FILE if path is None else path
+        self.index = IpReputationIndex(BUILTIN_PREFIXES)
+        self._mtime = None
+        self._checked_at = 0.0
+        self._loaded_once = False
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        if not self.path or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._loaded_once = True
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return False
+            if mtime == self._mtime:
+                return False
+            try:
+                index = IpReputationIndex(load_prefixes(self.path))
+            except Exception as exc:
+                logger.warning(f"Falha ao carregar feed de reputacao de IP {self.path}, mantendo o anterior: {exc}")
+                return False
+            self.index = index
+            self._mtime = mtime
+            FRAUD_IP_REPUTATION_PREFIXES.set(index.size)
+            logger.info(f"Feed de reputacao de IP carregado: {index.size} prefixos")
+            return True
+        finally:
+            self._lock.release()
+
+    def lookup(self, ip: str) -> SimpleNamespace | None:
+        if self.path:
+            if not self._loaded_once:
+                self.refresh()
+            elif (
+                time.monotonic() - self._checked_at >= settings.FRAUD_IP_REPUTATION_RELOAD_SECONDS
+                and not self._lock.locked()
+            ):
+                self._checked_at = time.monotonic()
+                threading.Thread(target=self.refresh, name="ip-reputation-reload", daemon=True).start()
+        return self.index.lookup(ip)
+
+
+ip_reputation = IpReputation()
@@ -1,20 +1,47 @@
+import asyncio
 import os
 import json
+import logging
+import threading
+import time
+from datetime import datetime
+from types import SimpleNamespace
 from typing import List
 
 
+from src.core.config import settings
 from src.domain.fraud import models
+from src.infra.batching import MicroBatcher
+from src.infra.instrumentation import attribute_to, stage
+from src.infra.metrics import (
+    FRAUD_INFERENCE_BATCH_SIZE,
+    FRAUD_INFERENCE_WAIT,
+    FRAUD_MODEL_LOAD_SECONDS,
+    FRAUD_MODEL_RELOADS,
+    FRAUD_MODEL_VERSION,
+)
 
+logger = logging.getLogger(__name__)
 
 MODEL_DIR = os.getenv("FRAUD_MODEL_DIR", "/app/models")
 IF_PATH = os.path.join(MODEL_DIR, "fraud_iforest.joblib")
 XGB_PATH = os.path.join(MODEL_DIR, "fraud_xgb.joblib")
+TREES_PATH = os.path.join(MODEL_DIR, "fraud_xgb.npz")
+VERSION_PATH = os.path.join(MODEL_DIR, "fraud_model_version.json")
 
 
 def _ensure_dir():
     os.makedirs(MODEL_DIR, exist_ok=True)
 
 
+def _dump_atomic(obj, path: str):
+    # Escreve ao lado e troca com rename: o registry nunca le um artefato pela metade
+    import joblib
+    tmp_path = f"{path}.tmp"
+    joblib.dump(obj, tmp_path)
+    os.replace(tmp_path, path)
+
+
 def train_models(features: List[List[float]], labels: List[int]) -> dict:
     try:
         import numpy as np
@@ -29,7 +56,6 @@ def train_models(features: List[List[float]], labels: List[int]) -> dict:
 
     iforest = IsolationForest(n_estimators=200, random_state=42, contamination=0.05)
     iforest.fit(X)
-    joblib.dump(iforest, IF_PATH)
 
     xgb = XGBClassifier(
         n_estimators=200,
@@ -40,34 +66,221 @@ def train_models(features: List[List[float]], labels: List[int]) -> dict:
         random_state=42,
     )
     xgb.fit(X, y)
-    joblib.dump(xgb, XGB_PATH)
+
+    version = datetime.utcnow().strftime("%Y%m%d%H%M%S")
+    # Artefatos versionados nunca sao sobrescritos: um processo carregando a versao anterior
+    # nao le um par misturado; o manifesto diz qual trio esta em servico
+    artifacts = {
+        "iforest": f"fraud_iforest-{version}.joblib",
+        "xgb": f"fraud_xgb-{version}.joblib",
+        "trees": f"fraud_xgb-{version}.npz",
+    }
+    previous = _read_manifest(VERSION_PATH) or {}
+    _dump_atomic(iforest, os.path.join(MODEL_DIR, artifacts["iforest"]))
+    _dump_atomic(xgb, os.path.join(MODEL_DIR, artifacts["xgb"]))
+    # Arvores em arrays planos: os workers da API pontuam sem importar o xgboost
+    from src.domain.fraud.trees import export_xgboost
+    export_xgboost(xgb).save(os.path.join(MODEL_DIR, artifacts["trees"]))
+    # O manifesto e gravado por ultimo: sinaliza aos processos que o trio novo esta completo
+    tmp_path = f"{VERSION_PATH}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump({"version": version, "samples": len(X), **artifacts}, fh)
+    os.replace(tmp_path, VERSION_PATH)
+    _prune_artifacts(set(artifacts.values()) | {previous.get(key) for key in artifacts})
 
     return {
-        "iforest_path": IF_PATH,
-        "xgb_path": XGB_PATH,
+        "iforest_path": os.path.join(MODEL_DIR, artifacts["iforest"]),
+        "xgb_path": os.path.join(MODEL_DIR, artifacts["xgb"]),
+        "trees_path": os.path.join(MODEL_DIR, artifacts["trees"]),
         "samples": len(X),
+        "version": version,
     }
 
 
-def load_models():
-    if not os.path.exists(IF_PATH) or not os.path.exists(XGB_PATH):
-        return None, None
+def _read_manifest(path: str) -> dict | None:
     try:
+        with open(path) as fh:
+            manifest = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) and manifest.get("version") else None
+
+
+def _prune_artifacts(keep: set):
+    """Remove artefatos versionados antigos; mantem a versao nova e a anterior (ainda em carga em algum processo)."""
+    for name in os.listdir(MODEL_DIR):
+        if name.startswith(("fraud_iforest-", "fraud_xgb-")) and name not in keep:
+            try:
+                os.remove(os.path.join(MODEL_DIR, name))
+            except OSError:
+                pass
+
+
+class ModelRegistry:
+    """Modelos de fraude carregados uma vez por processo e trocados a quente.
+
+    `get()` devolve o snapshot atual sem I/O. A cada `FRAUD_MODEL_RELOAD_SECONDS` uma
+    thread le o manifesto (`fraud_model_version.json`) e, so se a versao mudou, carrega
+    os artefatos que ele nomeia e troca a referencia de uma vez; se a carga falhar a
+    versao anterior continua em servico. Mudanca de mtime dos artefatos nao dispara recarga.
+    """
+
+    EMPTY = SimpleNamespace(iforest=None, xgb=None, version=None)
+
+    def __init__(self, if_path: str | None = None, xgb_path: str | None = None, version_path: str | None = None):
+        self.if_path = if_path or IF_PATH
+        self.xgb_path = xgb_path or XGB_PATH
+        # Exportacao nativa do XGBoost fica ao lado do joblib (fraud_xgb.joblib -> fraud_xgb.npz)
+        self.trees_path = f"{os.path.splitext(self.xgb_path)[0]}.npz"
+        self.version_path = version_path or VERSION_PATH
+        self.current = self.EMPTY
+        self._checked_at = 0.0
+        self._loaded_once = False
+        self._lock = threading.Lock()
+
+    def _artifact_paths(self, manifest: dict | None) -> tuple[str, str, str]:
+        """(iforest, xgb joblib, arvores .npz) nomeados pelo manifesto, relativos a pasta dele.
+
+        Manifestos antigos (so com a versao) e artefatos sem manifesto usam os caminhos fixos.
+        """
+        base = os.path.dirname(self.version_path)
+        manifest = manifest or {}
+        iforest = os.path.join(base, manifest["iforest"]) if manifest.get("iforest") else self.if_path
+        xgb = os.path.join(base, manifest["xgb"]) if manifest.get("xgb") else self.xgb_path
+        trees = os.path.join(base, manifest["trees"]) if manifest.get("trees") else self.trees_path
+        return iforest, xgb, trees
+
+    def _load_xgb(self, xgb_path: str, trees_path: str):
+        from src.domain.fraud.trees import TreeEnsemble, export_xgboost
+        if os.path.exists(trees_path):
+            return TreeEnsemble.load(trees_path)
+        # Artefatos anteriores ao export nativo: carrega o joblib e converte em memoria
         import joblib
-        return joblib.load(IF_PATH), joblib.load(XGB_PATH)
-    except Exception:
-        return None, None
+        model = joblib.load(xgb_path)
+        if hasattr(model, "get_booster"):
+            return export_xgboost(model)
+        return model
 
+    def refresh(self) -> bool:
+        """Recarrega os modelos se a versao do manifesto mudou. Devolve True se trocou de versao."""
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._loaded_once = True
+            self._checked_at = time.monotonic()
+            manifest = _read_manifest(self.version_path)
+            if manifest is not None:
+                version = str(manifest["version"])
+            elif self.current.version is None and os.path.exists(self.if_path) and os.path.exists(self.xgb_path):
+                # Artefatos treinados antes do manifesto: carregados uma vez, versao derivada do mtime
+                version = f"mtime-{os.stat(self.if_path).st_mtime_ns // 1_000_000_000}"
+            else:
+                return False
+            if version == self.current.version:
+                return False
+            if_path, xgb_path, trees_path = self._artifact_paths(manifest)
+            started = time.perf_counter()
+            try:
+                import joblib
+                iforest = joblib.load(if_path)
+                xgb = self._load_xgb(xgb_path, trees_path)
+            except Exception as exc:
+                FRAUD_MODEL_RELOADS.labels(result="failure").inc()
+                logger.warning(
+                    f"Falha ao carregar modelos de fraude {version}, mantendo versao {self.current.version}: {exc}"
+                )
+                return False
+            FRAUD_MODEL_LOAD_SECONDS.observe(time.perf_counter() - started)
+            previous = self.current.version
+            self.current = SimpleNamespace(iforest=iforest, xgb=xgb, version=version)
+            if previous is not None:
+                FRAUD_MODEL_VERSION.remove(previous)
+            FRAUD_MODEL_VERSION.labels(version=version).set(1)
+            FRAUD_MODEL_RELOADS.labels(result="success").inc()
+            logger.info(f"Modelos de fraude carregados: versao {version}")
+            return True
+        finally:
+            self._lock.release()
 
-def score_models(features: List[float]) -> dict:
-    iforest, xgb = load_models()
+    def get(self) -> SimpleNamespace:
+        if not self._loaded_once:
+            # Primeira chamada do processo: nao ha versao anterior para servir, carrega na hora
+            self.refresh()
+        elif time.monotonic() - self._checked_at >= settings.FRAUD_MODEL_RELOAD_SECONDS and not self._lock.locked():
+            self._checked_at = time.monotonic()
+            threading.Thread(target=self.refresh, name="fraud-model-reload", daemon=True).start()
+        return self.current
+
+
+model_registry = ModelRegistry()
+
+
+def _empty_scores(count: int) -> list[dict]:
+    return [{"iforest": 0.0, "xgb": 0.0, "version": None} for _ in range(count)]
+
+
+def score_batch(rows: List[List[float]], loaded: SimpleNamespace | None = None) -> list[dict]:
+    """Pontua varias linhas de features com uma unica chamada a cada modelo."""
+    loaded = loaded or model_registry.get()
+    iforest, xgb = loaded.iforest, loaded.xgb
     if not iforest or not xgb:
-        return {"iforest": 0.0, "xgb": 0.0}
+        return _empty_scores(len(rows))
     try:
         import numpy as np
     except Exception:
-        return {"iforest": 0.0, "xgb": 0.0}
-    X = np.array([features], dtype=float)
-    if_score = float(-iforest.score_samples(X)[0])  # higher = more anomalous
-    xgb_score = float(xgb.predict_proba(X)[0][1])
-    return {"iforest": if_score, "xgb": xgb_score}
+        return _empty_scores(len(rows))
+    X = np.array(rows, dtype=float)
+    expected = getattr(xgb, "n_features_in_", X.shape[1])
+    if expected != X.shape[1]:
+        # Modelo treinado com outro layout de features: so regras ate o proximo treino
+        logger.warning(f"Modelo {loaded.version} espera {expected} features, recebeu {X.shape[1]}; ignorando modelos")
+        return _empty_scores(len(rows))
+    if_scores = -iforest.score_samples(X)  # higher = more anomalous
+    xgb_scores = xgb.predict_proba(X)[:, 1]
+    return [
+        {"iforest": float(if_score), "xgb": float(xgb_score), "version": loaded.version}
+        for if_score, xgb_score in zip(if_scores, xgb_scores)
+    ]
+
+
+def score_models(features: List[float]) -> dict:
+    return score_batch([features])[0]
+
+
+class InferenceBatcher(MicroBatcher):
+    """Agrupa pontuacoes concorrentes em uma matriz e pontua o lote numa thread.
+
+    Uma chamada espera no maximo `window_ms` (ou ate o lote atingir `max_batch`);
+    cada chamador recebe as proprias pontuacoes ou a propria excecao.
+    """
+
+    def __init__(self, window_ms: float | None = None, max_batch: int | None = None):
+        super().__init__(
+            settings.FRAUD_INFERENCE_WINDOW_MS if window_ms is None else window_ms,
+            settings.FRAUD_INFERENCE_MAX_BATCH if max_batch is None else max_batch,
+        )
+
+    async def score(self, features: List[float]) -> dict:
+        # Sem modelo carregado nao ha o que agrupar: evita esperar a janela a toa
+        if model_registry.get().iforest is None:
+            return _empty_scores(1)[0]
+        return await self.submit(features)
+
+    async def _flush(self, batch: list):
+        started = time.perf_counter()
+        FRAUD_INFERENCE_BATCH_SIZE.observe(len(batch))
+        for _, _, enqueued_at, _ in batch:
+            FRAUD_INFERENCE_WAIT.observe(started - enqueued_at)
+
+        try:
+            # Um snapshot por lote: todas as linhas sao pontuadas pela mesma versao
+            with attribute_to(profile for _, _, _, profile in batch), stage("fraud.inference_batch"):
+                results = await asyncio.to_thread(score_batch, [row for row, _, _, _ in batch], model_registry.get())
+        except Exception as exc:
+            logger.error(f"Inferencia de fraude falhou para lote de {len(batch)} linhas: {exc}")
+            self._fail(batch, exc)
+            return
+        self._resolve(batch, results)
+
+
+inference_batcher = InferenceBatcher()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Text, Index
 from datetime import datetime
 
 from src.infra.database import Base
@@ -36,3 +36,23 @@ class FraudTeamAlert(Base):
     severity = Column(String, default="HIGH")
     message = Column(Text, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class FraudOutboxEvent(Base):
+    __tablename__ = "fraud_outbox"
+    __table_args__ = (
+        # Fila de pendentes: status + proxima tentativa
+        Index("ix_fraud_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String, nullable=False)  # FRAUD_DECISION
+    payload = Column(Text, nullable=False)
+    status = Column(String, default="PENDING")  # PENDING, DONE, FAILED
+    # Efeitos ja aplicados (JSON): um retry nao repete alerta ja criado
+    steps_done = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    processed_at = Column(DateTime, nullable=True)
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.fraud import models
+from src.infra.database import async_session
+from src.infra.metrics import FRAUD_OUTBOX_EVENTS, FRAUD_OUTBOX_LAG
+
+logger = logging.getLogger(__name__)
+
+FRAUD_DECISION = "FRAUD_DECISION"
+
+
+def decision_event(account_id: int, user_id: int, action: str, score: float, rules: list[str]) -> models.FraudOutboxEvent:
+    """Evento gravado na mesma transacao do FraudScore quando a decisao e VERIFY ou BLOCK."""
+    payload = {"account_id": account_id, "user_id": user_id, "action": action, "score": score, "rules": rules}
+    return models.FraudOutboxEvent(event_type=FRAUD_DECISION, payload=json.dumps(payload))
+
+
+async def _security_alert(db: AsyncSession, payload: dict, details: str):
+    from src.domain.security.services import SecurityService
+    await SecurityService.create_alert(db, payload["user_id"], f"FRAUD_{payload['action']}", details=details, commit=False)
+
+
+async def _team_alert(db: AsyncSession, payload: dict, details: str):
+    from src.domain.fraud.alerts import FraudAlertService
+    await FraudAlertService.alert_team(
+        db,
+        account_id=payload["account_id"],
+        message=f"FRAUD_{payload['action']} {details}",
+        severity="HIGH" if payload["action"] == "BLOCK" else "MEDIUM",
+        commit=False,
+    )
+
+
+async def _notification(db: AsyncSession, payload: dict, details: str):
+    from src.domain.notifications.services import NotificationService
+    from src.domain.notifications.schemas import NotificationCreate
+    # Uma falha de envio e desfeita pelo rollback: a nova tentativa nao deixa linha FAILED duplicada
+    notif = await NotificationService.send(
+        db,
+        payload["user_id"],
+        NotificationCreate(
+            channel="EMAIL",
+            subject="Alerta de fraude",
+            message=f"Detectamos atividade suspeita. Score={payload['score']:.2f}",
+        ),
+        commit=False,
+    )
+    if notif.status == "FAILED":
+        raise RuntimeError("envio da notificacao de fraude falhou")
+
+
+async def _aml_alert(db: AsyncSession, payload: dict, details: str):
+    from src.domain.regulatory.services import RegulatoryService
+    await RegulatoryService.create_aml_alert(db, payload["user_id"], rule=f"FRAUD_{payload['action']}", details=details, commit=False)
+
+
+class FraudOutboxDispatcher:
+    """Aplica os efeitos colaterais das decisoes de fraude fora do caminho da transferencia.
+
+    Eventos pendentes sao reservados por um lease (`next_attempt_at` empurrado para frente),
+    renovado evento a evento antes de processar, entao varios dispatchers (API e Celery) nao
+    processam o mesmo evento ao mesmo tempo e um worker que morre no meio so atrasa o evento
+    ate o lease vencer. Cada efeito e gravado no mesmo commit que o marca em `steps_done`;
+    falhas voltam para a fila com backoff exponencial. Os alertas internos vem antes do
+    e-mail, que e o unico passo que depende de servico externo.
+    """
+
+    STEPS = (
+        ("security_alert", _security_alert),
+        ("team_alert", _team_alert),
+        ("aml_alert", _aml_alert),
+        ("notification", _notification),
+    )
+
+    def __init__(self):
+        self._wake: asyncio.Event | None = None
+        self._worker: asyncio.Task | None = None
+
+    async def _claim(self, batch_size: int) -> tuple[list[int], datetime]:
+        now = datetime.utcnow()
+        lease_until = now + timedelta(seconds=settings.FRAUD_OUTBOX_LEASE_SECONDS)
+        async with async_session() as db:
+            stmt = (
+                select(models.FraudOutboxEvent.id)
+                .where(
+                    models.FraudOutboxEvent.status == "PENDING",
+                    models.FraudOutboxEvent.next_attempt_at <= now,
+                )
+                .order_by(models.FraudOutboxEvent.id.asc())
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            ids = list((await db.execute(stmt)).scalars().all())
+            if ids:
+                await db.execute(
+                    update(models.FraudOutboxEvent)
+                    .where(models.FraudOutboxEvent.id.in_(ids))
+                    .values(next_attempt_at=lease_until)
+                )
+            await db.commit()
+        return ids, lease_until
+
+    async def _renew_lease(self, db: AsyncSession, event_id: int, lease_until: datetime) -> bool:
+        """Renova o lease so se ainda for o nosso; falso quando outro dispatcher ja reservou o evento."""
+        result = await db.execute(
+            update(models.FraudOutboxEvent)
+            .where(
+                models.FraudOutboxEvent.id == event_id,
+                models.FraudOutboxEvent.status == "PENDING",
+                models.FraudOutboxEvent.next_attempt_at == lease_until,
+            )
+            .values(next_attempt_at=datetime.utcnow() + timedelta(seconds=settings.FRAUD_OUTBOX_LEASE_SECONDS))
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+    async def _apply(self, db: AsyncSession, event: models.FraudOutboxEvent):
+        payload = json.loads(event.payload)
+        details = f"score={payload['score']:.2f} rules={','.join(payload['rules'])}"
+        done = set(json.loads(event.steps_done or "[]"))
+        for name, handler in self.STEPS:
+            if name in done:
+                continue
+            # Handlers nao commitam: a linha do efeito e o passo em `steps_done` saem no mesmo commit
+            await handler(db, payload, details)
+            done.add(name)
+            event.steps_done = json.dumps(sorted(done))
+            await db.commit()
+
+    async def _process(self, event_id: int, lease_until: datetime) -> str | None:
+        async with async_session() as db:
+            if not await self._renew_lease(db, event_id, lease_until):
+                return None
+            event = await db.get(models.FraudOutboxEvent, event_id)
+            if event is None or event.status != "PENDING":
+                return None
+            try:
+                await self._apply(db, event)
+            except Exception as exc:
+                await db.rollback()
+                event = await db.get(models.FraudOutboxEvent, event_id)
+                event.attempts = (event.attempts or 0) + 1
+                event.last_error = str(exc)[:500]
+                if event.attempts >= settings.FRAUD_OUTBOX_MAX_ATTEMPTS:
+                    event.status = "FAILED"
+                    logger.error(f"Evento de fraude {event_id} falhou {event.attempts} vezes, desistindo: {exc}")
+                else:
+                    delay = min(settings.FRAUD_OUTBOX_RETRY_SECONDS * (2 ** (event.attempts - 1)), 3600)
+                    event.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+                    logger.warning(f"Evento de fraude {event_id} falhou (tentativa {event.attempts}): {exc}")
+                await db.commit()
+                return "failed" if event.status == "FAILED" else "retried"
+            event.status = "DONE"
+            event.processed_at = datetime.utcnow()
+            await db.commit()
+            FRAUD_OUTBOX_LAG.observe((event.processed_at - event.created_at).total_seconds())
+            return "dispatched"
+
+    async def dispatch_pending(self, batch_size: int | None = None) -> dict:
+        batch_size = batch_size or settings.FRAUD_OUTBOX_BATCH_SIZE
+        summary = {"claimed": 0, "dispatched": 0, "retried": 0, "failed": 0}
+        ids, lease_until = await self._claim(batch_size)
+        summary["claimed"] = len(ids)
+        for event_id in ids:
+            result = await self._process(event_id, lease_until)
+            if result:
+                summary[result] += 1
+                FRAUD_OUTBOX_EVENTS.labels(result=result).inc()
+        return summary
+
+    def notify(self):
+        """Acorda o dispatcher deste processo logo apos o commit de um evento novo."""
+        if self._wake is not None:
+            self._wake.set()
+
+    async def _run(self):
+        while True:
+            try:
+                summary = await self.dispatch_pending()
+                if summary["claimed"] >= settings.FRAUD_OUTBOX_BATCH_SIZE:
+                    continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning(f"Dispatcher do outbox de fraude falhou: {exc}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), settings.FRAUD_OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        if self._worker is None or self._worker.done():
+            self._wake = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+        self._wake = None
+
+
+fraud_outbox = FraudOutboxDispatcher()
@@ -0,0 +1,209 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import yaml
+
+from src.core.config import settings
+from src.infra.metrics import FRAUD_RULES_RELOADS
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {
+    "==": np.equal,
+    "!=": np.not_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "<": np.less,
+    "<=": np.less_equal,
+}
+
+# Mesmas regras do encadeamento de ifs original: 12 pontos por regra + 3 x zscore, teto 100
+DEFAULT_RULES = {
+    "version": "builtin",
+    "max_score": 100.0,
+    "rules": [
+        {"code": "VALUE_OVER_3SIGMA", "feature": "over_3sigma", "op": "==", "value": 1, "weight": 12},
+        {"code": "HIGH_FREQUENCY", "feature": "tx_1m", "op": ">=", "value": 3, "weight": 12},
+        {"code": "UNKNOWN_DEVICE", "feature": "device_known", "op": "==", "value": 0, "weight": 12},
+        {"code": "SUSPICIOUS_IP", "feature": "ip_suspicious", "op": "==", "value": 1, "weight": 12},
+        {"code": "UNUSUAL_HOUR", "feature": "is_night", "op": "==", "value": 1, "weight": 12},
+        {"code": "SUSPECTED_CYCLE", "feature": "net_cycle", "op": "==", "value": 1, "weight": 12},
+        {"code": "MULE_PATTERN", "feature": "net_mule", "op": "==", "value": 1, "weight": 12},
+        {"code": "NEW_ACCOUNT", "feature": "new_account", "op": "==", "value": 1, "weight": 12},
+        {"code": "SPIKE_10M", "feature": "tx_10m_spike", "op": "==", "value": 1, "weight": 12},
+        {"code": "SPIKE_1H", "feature": "tx_1h_spike", "op": "==", "value": 1, "weight": 12},
+        {"code": "HIGH_VALUE", "feature": "high_value_10k", "op": "==", "value": 1, "weight": 12},
+        {"code": "LOW_BALANCE", "feature": "balance_zero", "op": "==", "value": 1, "weight": 12},
+        {"code": "DUST_TX", "feature": "dust_tx", "op": "==", "value": 1, "weight": 12},
+    ],
+    "linear": [{"feature": "zscore", "weight": 3.0}],
+}
+
+
+def parse_rule_set(data: dict) -> dict:
+    """Valida a definicao (dict vindo de YAML/JSON) e normaliza tipos."""
+    if not isinstance(data, dict) or not isinstance(data.get("rules"), list):
+        raise ValueError("rule set precisa de uma lista 'rules'")
+    rules = []
+    seen = set()
+    for item in data["rules"]:
+        code = str(item["code"])
+        if code in seen:
+            raise ValueError(f"regra duplicada: {code}")
+        if item["op"] not in OPERATORS:
+            raise ValueError(f"operador invalido em {code}: {item['op']}")
+        seen.add(code)
+        rules.append({
+            "code": code,
+            "feature": str(item["feature"]),
+            "op": item["op"],
+            "value": float(item["value"]),
+            "weight": float(item.get("weight", 12.0)),
+        })
+    linear = [
+        {"feature": str(term["feature"]), "weight": float(term["weight"])}
+        for term in data.get("linear") or []
+    ]
+    return {
+        "version": str(data.get("version", "")),
+        "max_score": float(data.get("max_score", 100.0)),
+        "rules": rules,
+        "linear": linear,
+    }
+
+
+def load_rule_set(path: str) -> dict:
+    with open(path) as fh:
+        if path.endswith(".json"):
+            return parse_rule_set(json.load(fh))
+        return parse_rule_set(yaml.safe_load(fh))
+
+
+class CompiledRuleSet:
+    """Regras compiladas para um layout de features: um ufunc por operador sobre colunas.
+
+    A mesma estrutura pontua um vetor (requisicao online) ou uma matriz inteira
+    (backtest/rotulagem do dataset). Feature ausente no layout vale 0, como o
+    `mapping.get(..., 0)` das regras escritas a mao.
+    """
+
+    def __init__(self, rule_set: dict, labels: tuple[str, ...]):
+        self.version = rule_set["version"]
+        self.max_score = rule_set["max_score"]
+        self.codes = [rule["code"] for rule in rule_set["rules"]]
+        self.weights = np.array([rule["weight"] for rule in rule_set["rules"]], dtype=np.float64)
+        position = {label: i for i, label in enumerate(labels)}
+        # Coluna extra de zeros no fim para features que o layout nao tem
+        missing = len(labels)
+        self._groups = []
+        by_op = {}
+        for i, rule in enumerate(rule_set["rules"]):
+            by_op.setdefault(rule["op"], []).append(i)
+        for op, indices in by_op.items():
+            self._groups.append((
+                OPERATORS[op],
+                np.array(indices, dtype=np.intp),
+                np.array([position.get(rule_set["rules"][i]["feature"], missing) for i in indices], dtype=np.intp),
+                np.array([rule_set["rules"][i]["value"] for i in indices], dtype=np.float64),
+            ))
+        self._linear_columns = np.array(
+            [position.get(term["feature"], missing) for term in rule_set["linear"]], dtype=np.intp
+        )
+        self._linear_weights = np.array([term["weight"] for term in rule_set["linear"]], dtype=np.float64)
+
+    def evaluate_matrix(self, X: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Scores (n,) e matriz booleana (n, regras) de regras disparadas."""
+        X = np.asarray(X, dtype=np.float64)
+        padded = np.concatenate([X, np.zeros((X.shape[0], 1))], axis=1)
+        fired = np.zeros((X.shape[0], len(self.codes)), dtype=bool)
+        for ufunc, indices, columns, thresholds in self._groups:
+            fired[:, indices] = ufunc(padded[:, columns], thresholds)
+        scores = fired @ self.weights
+        if len(self._linear_columns):
+            scores = scores + padded[:, self._linear_columns] @ self._linear_weights
+        return np.minimum(scores, self.max_score), fired
+
+    def evaluate(self, features: list[float]) -> tuple[float, list[str]]:
+        # Mesmas expressoes da matriz em 1-D: evita o custo de montar matriz para uma linha
+        padded = np.asarray([*features, 0.0], dtype=np.float64)
+        fired = np.zeros(len(self.codes), dtype=bool)
+        for ufunc, indices, columns, thresholds in self._groups:
+            fired[indices] = ufunc(padded[columns], thresholds)
+        score = float(fired @ self.weights)
+        if len(self._linear_columns):
+            score += float(padded[self._linear_columns] @ self._linear_weights)
+        return min(score, self.max_score), [self.codes[i] for i in np.flatnonzero(fired)]
+
+
+class FraudRules:
+    """Rule set do processo, recarregado a quente quando o arquivo muda.
+
+    Sem `FRAUD_RULES_FILE` vale `DEFAULT_RULES`. A compilacao e feita uma vez por
+    layout de features e descartada na troca; arquivo invalido mantem o anterior.
+    """
+
+    def __init__(self, path: str | None = None):
+        self.path = settings.FRAUD_RULES_FILE if path is None else path
+        self.rule_set = parse_rule_set(DEFAULT_RULES)
+        self._compiled = {}
+        self._mtime = None
+        self._checked_at = 0.0
+        self._loaded_once = False
+        self._lock = threading.Lock()
+
+    def refresh(self) -> bool:
+        if not self.path or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._loaded_once = True
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                return False
+            if mtime == self._mtime:
+                return False
+            try:
+                rule_set = load_rule_set(self.path)
+            except Exception as exc:
+                FRAUD_RULES_RELOADS.labels(result="failure").inc()
+                logger.warning(f"Falha ao carregar regras de fraude {self.path}, mantendo as anteriores: {exc}")
+                return False
+            self.rule_set = rule_set
+            self._compiled = {}
+            self._mtime = mtime
+            FRAUD_RULES_RELOADS.labels(result="success").inc()
+            logger.info(f"Regras de fraude carregadas: versao {rule_set['version']}, {len(rule_set['rules'])} regras")
+            return True
+        finally:
+            self._lock.release()
+
+    def compiled(self, labels) -> CompiledRuleSet:
+        if self.path:
+            if not self._loaded_once:
+                self.refresh()
+            elif (
+                time.monotonic() - self._checked_at >= settings.FRAUD_RULES_RELOAD_SECONDS
+                and not self._lock.locked()
+            ):
+                self._checked_at = time.monotonic()
+                threading.Thread(target=self.refresh, name="fraud-rules-reload", daemon=True).start()
+        key = tuple(labels)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = CompiledRuleSet(self.rule_set, key)
+            self._compiled[key] = compiled
+        return compiled
+
+    def evaluate(self, features: list[float], labels) -> tuple[float, list[str]]:
+        return self.compiled(labels).evaluate(features)
+
+    def evaluate_matrix(self, X: np.ndarray, labels) -> tuple[np.ndarray, np.ndarray]:
+        return self.compiled(labels).evaluate_matrix(X)
+
+
+fraud_rules = FraudRules()
@@ -0,0 +1,153 @@
+import json
+import math
+import os
+
+import numpy as np
+
+# Versao do layout do .npz: muda se os arrays exportados mudarem
+FORMAT_VERSION = 1
+
+
+class TreeEnsemble:
+    """Ensemble de arvores do XGBoost em arrays planos do numpy (um no por posicao).
+
+    Todas as arvores sao concatenadas: `roots[t]` e o primeiro no da arvore `t` e
+    `left` ja aponta para a posicao global; o filho direito e sempre `left + 1` (o
+    XGBoost aloca os filhos em pares), entao descer um nivel e `left[no] + (x >= limiar)`.
+    Folhas apontam para si mesmas com limiar +inf, e a avaliacao desce `max_depth`
+    passos para todas as linhas/arvores de uma vez sem ramificar em Python.
+    Comparacoes em float32, como o XGBoost; NaN segue `default_left`.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        default_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        base_margin: float,
+        max_depth: int,
+        n_features: int,
+    ):
+        self.feature = feature.astype(np.intp)
+        self.threshold = threshold.astype(np.float32)
+        self.left = left.astype(np.intp)
+        self.default_left = default_left.astype(bool)
+        self.value = value.astype(np.float32)
+        self.roots = roots.astype(np.intp)
+        self.base_margin = float(base_margin)
+        self.max_depth = int(max_depth)
+        # Mesmo nome do sklearn/XGBClassifier: o score_batch confere a largura das features
+        self.n_features_in_ = int(n_features)
+
+    def margin(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        flat = X.ravel()
+        offsets = (np.arange(X.shape[0]) * X.shape[1])[:, None]
+        has_nan = bool(np.isnan(flat).any())
+        nodes = np.broadcast_to(self.roots, (X.shape[0], len(self.roots)))
+        for _ in range(self.max_depth):
+            values = flat[offsets + self.feature[nodes]]
+            step = values >= self.threshold[nodes]
+            if has_nan:
+                step = np.where(np.isnan(values), ~self.default_left[nodes], step)
+            nodes = self.left[nodes] + step
+        return self.value[nodes].sum(axis=1, dtype=np.float32) + np.float32(self.base_margin)
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        positive = 1.0 / (1.0 + np.exp(-self.margin(X).astype(np.float64)))
+        return np.column_stack([1.0 - positive, positive]).astype(np.float32)
+
+    def save(self, path: str):
+        # Escreve ao lado e troca com rename, como os demais artefatos de modelo
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as fh:
+            np.savez(
+                fh,
+                format_version=np.array(FORMAT_VERSION),
+                feature=self.feature,
+                threshold=self.threshold,
+                left=self.left,
+                default_left=self.default_left,
+                value=self.value,
+                roots=self.roots,
+                base_margin=np.array(self.base_margin),
+                max_depth=np.array(self.max_depth),
+                n_features=np.array(self.n_features_in_),
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TreeEnsemble":
+        with np.load(path) as data:
+            if int(data["format_version"]) != FORMAT_VERSION:
+                raise ValueError(f"formato de arvores {int(data['format_version'])} nao suportado")
+            return cls(
+                feature=data["feature"],
+                threshold=data["threshold"],
+                left=data["left"],
+                default_left=data["default_left"],
+                value=data["value"],
+                roots=data["roots"],
+                base_margin=float(data["base_margin"]),
+                max_depth=int(data["max_depth"]),
+                n_features=int(data["n_features"]),
+            )
+
+
+def _tree_depth(left: list[int], right: list[int]) -> int:
+    depth = 0
+    frontier = [0]
+    while frontier:
+        frontier = [child for node in frontier for child in (left[node], right[node]) if child != -1]
+        if frontier:
+            depth += 1
+    return depth
+
+
+def export_xgboost(model) -> TreeEnsemble:
+    """Converte um XGBClassifier binario (binary:logistic) em `TreeEnsemble`."""
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    config = json.loads(booster.save_config())
+    objective = config["learner"]["objective"]["name"]
+    if objective != "binary:logistic":
+        raise ValueError(f"objetivo {objective} nao suportado pelo scorer nativo")
+    learner = json.loads(booster.save_raw("json"))["learner"]
+    trees = learner["gradient_booster"]["model"]["trees"]
+    base_score = float(learner["learner_model_param"]["base_score"])
+    n_features = int(learner["learner_model_param"]["num_feature"])
+
+    feature, threshold, left, default_left, value, roots = [], [], [], [], [], []
+    max_depth = 0
+    for tree in trees:
+        if any(tree.get("split_type") or []):
+            raise ValueError("splits categoricos nao suportados pelo scorer nativo")
+        offset = len(feature)
+        roots.append(offset)
+        tree_left, tree_right = tree["left_children"], tree["right_children"]
+        max_depth = max(max_depth, _tree_depth(tree_left, tree_right))
+        for node, (lc, rc) in enumerate(zip(tree_left, tree_right)):
+            leaf = lc == -1
+            if not leaf and rc != lc + 1:
+                raise ValueError(f"arvore {len(roots) - 1}: filhos do no {node} nao sao adjacentes")
+            feature.append(0 if leaf else tree["split_indices"][node])
+            # Em folhas o XGBoost guarda o valor da folha em split_conditions
+            threshold.append(np.inf if leaf else tree["split_conditions"][node])
+            left.append(offset + node if leaf else offset + lc)
+            # Em folha NaN tambem precisa ficar parado: default "esquerda" = passo 0
+            default_left.append(True if leaf else bool(tree["default_left"][node]))
+            value.append(tree["split_conditions"][node] if leaf else 0.0)
+
+    return TreeEnsemble(
+        feature=np.array(feature),
+        threshold=np.array(threshold, dtype=np.float32),
+        left=np.array(left),
+        default_left=np.array(default_left),
+        value=np.array(value, dtype=np.float32),
+        roots=np.array(roots),
+        base_margin=math.log(base_score / (1.0 - base_score)),
+        max_depth=max_depth,
+        n_features=n_features,
+    )
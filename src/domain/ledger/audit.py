@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import logging
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from src.core.config import settings
+from src.domain.ledger.models import AuditChainHead, AuditLog
+from src.infra.batching import MicroBatcher
+from src.infra.database import async_session
+from src.infra.metrics import AUDIT_BATCH_SIZE, AUDIT_CHAIN_CONFLICTS, AUDIT_QUEUE_DEPTH, AUDIT_RECORDS
+
+logger = logging.getLogger(__name__)
+
+HEAD_ID = 1
+
+
+def audit_hash(record: dict, prev_hash: str) -> str:
+    # Mesmo formato do registro sincrono anterior: a cadeia existente continua verificavel
+    base = "|".join([
+        record["action"],
+        str(record.get("user_id") or ""),
+        record.get("ip_address") or "",
+        record.get("method") or "",
+        record.get("path") or "",
+        record.get("details") or "",
+        record["timestamp"].isoformat(),
+        prev_hash or "",
+    ])
+    return hashlib.sha256(base.encode("utf-8")).hexdigest()
+
+
+class AuditWriter(MicroBatcher):
+    """Grava o audit log em lotes a partir de uma fila limitada por processo.
+
+    O middleware so enfileira; um worker encadeia os hashes em ordem a partir do
+    head em memoria e insere o lote inteiro de uma vez. O head tambem fica em
+    `audit_chain_heads`, avancado por um UPDATE condicional no mesmo commit: se
+    outro processo avancou a cadeia, o lote e re-encadeado a partir do head atual,
+    e um restart continua de onde a cadeia parou.
+    """
+
+    def __init__(
+        self,
+        queue_max: int | None = None,
+        window_ms: float | None = None,
+        max_batch: int | None = None,
+        enqueue_timeout_ms: float | None = None,
+        retries: int | None = None,
+    ):
+        super().__init__(
+            settings.AUDIT_FLUSH_WINDOW_MS if window_ms is None else window_ms,
+            settings.AUDIT_BATCH_MAX if max_batch is None else max_batch,
+            settings.AUDIT_QUEUE_MAX if queue_max is None else queue_max,
+        )
+        self.enqueue_timeout_ms = settings.AUDIT_ENQUEUE_TIMEOUT_MS if enqueue_timeout_ms is None else enqueue_timeout_ms
+        self.retries = settings.AUDIT_FLUSH_RETRIES if retries is None else retries
+        self._head: str | None = None
+
+    async def enqueue(self, record: dict) -> bool:
+        """Enfileira um registro; com a fila cheia espera ate `enqueue_timeout_ms` e depois descarta."""
+        self._ensure_worker()
+        # Sem future nem perfil: quem enfileira nao espera pela gravacao
+        entry = (record, None, time.perf_counter(), None)
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(entry), self.enqueue_timeout_ms / 1000.0)
+            except asyncio.TimeoutError:
+                AUDIT_RECORDS.labels(result="dropped").inc()
+                logger.error(f"Fila de auditoria cheia ({self.queue_max}); registro descartado: {record.get('path')}")
+                return False
+        AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+        return True
+
+    @staticmethod
+    async def _load_head(db) -> str:
+        head = (await db.execute(select(AuditChainHead.record_hash).where(AuditChainHead.id == HEAD_ID))).scalar()
+        if head is not None:
+            return head
+        # Primeira execucao com o writer: o head parte do ultimo registro ja gravado
+        last = (
+            await db.execute(select(AuditLog.record_hash).order_by(AuditLog.id.desc()).limit(1))
+        ).scalar()
+        db.add(AuditChainHead(id=HEAD_ID, record_hash=last or ""))
+        try:
+            await db.commit()
+        except IntegrityError:
+            # Outro processo criou o head ao mesmo tempo: vale o dele
+            await db.rollback()
+            return (await db.execute(select(AuditChainHead.record_hash).where(AuditChainHead.id == HEAD_ID))).scalar()
+        return last or ""
+
+    @staticmethod
+    def _chain(records: list[dict], prev_hash: str) -> tuple[list[dict], str]:
+        rows = []
+        for record in records:
+            record_hash = audit_hash(record, prev_hash)
+            rows.append({**record, "prev_hash": prev_hash, "record_hash": record_hash})
+            prev_hash = record_hash
+        return rows, prev_hash
+
+    async def _flush(self, batch: list) -> bool:
+        AUDIT_BATCH_SIZE.observe(len(batch))
+        AUDIT_QUEUE_DEPTH.set(self._queue.qsize())
+        records = [record for record, _, _, _ in batch]
+        attempt = 0
+        while True:
+            try:
+                async with async_session() as db:
+                    if self._head is None:
+                        self._head = await self._load_head(db)
+                    rows, head = self._chain(records, self._head)
+                    # O UPDATE vem antes do INSERT: os ids do lote sao alocados com o head travado
+                    moved = await db.execute(
+                        update(AuditChainHead)
+                        .where(AuditChainHead.id == HEAD_ID, AuditChainHead.record_hash == self._head)
+                        .values(record_hash=head, updated_at=datetime.utcnow())
+                    )
+                    if moved.rowcount != 1:
+                        await db.rollback()
+                        AUDIT_CHAIN_CONFLICTS.inc()
+                        self._head = None
+                        continue
+                    await db.execute(insert(AuditLog), rows)
+                    await db.commit()
+                self._head = head
+                AUDIT_RECORDS.labels(result="written").inc(len(batch))
+                return True
+            except Exception as exc:
+                self._head = None
+                if attempt >= self.retries:
+                    AUDIT_RECORDS.labels(result="dropped").inc(len(batch))
+                    logger.error(f"Falha ao gravar lote de {len(batch)} registros de auditoria: {exc}")
+                    return False
+                attempt += 1
+                await asyncio.sleep(min(2.0, 0.05 * (2 ** attempt)))
+
+
+audit_writer = AuditWriter()
@@ -0,0 +1,65 @@
+import logging
+import time
+
+from sqlalchemy.exc import IntegrityError
+
+from src.core.config import settings
+from src.domain.ledger.services import LedgerService
+from src.infra.batching import MicroBatcher
+from src.infra.database import async_session
+from src.infra.instrumentation import attribute_to
+from src.infra.metrics import LEDGER_GROUP_COMMIT_BATCH_SIZE, LEDGER_GROUP_COMMIT_WAIT
+
+logger = logging.getLogger(__name__)
+
+
+class GroupCommitWriter(MicroBatcher):
+    """Agrupa escritas concorrentes do ledger e grava cada lote com um unico commit.
+
+    Uma escrita espera no maximo `window_ms` (ou ate o lote atingir `max_batch`);
+    cada chamador recebe a propria Transaction ou a propria excecao.
+    """
+
+    def __init__(self, window_ms: float | None = None, max_batch: int | None = None):
+        super().__init__(
+            settings.LEDGER_GROUP_COMMIT_WINDOW_MS if window_ms is None else window_ms,
+            settings.LEDGER_GROUP_COMMIT_MAX_BATCH if max_batch is None else max_batch,
+        )
+
+    async def _flush(self, batch: list):
+        started = time.perf_counter()
+        LEDGER_GROUP_COMMIT_BATCH_SIZE.observe(len(batch))
+        for _, _, enqueued_at, _ in batch:
+            LEDGER_GROUP_COMMIT_WAIT.observe(started - enqueued_at)
+
+        items = [item for item, _, _, _ in batch]
+        try:
+            with attribute_to(profile for _, _, _, profile in batch):
+                try:
+                    async with async_session() as db:
+                        results = await LedgerService._write_batch(db, items)
+                except IntegrityError as exc:
+                    # Uma chave de idempotencia gravada por fora do lote derruba o commit inteiro:
+                    # regrava item a item para que so o chamador em conflito receba o erro
+                    logger.warning(
+                        f"Group commit com conflito de idempotencia, regravando {len(batch)} escritas uma a uma: {exc}"
+                    )
+                    results = await self._write_each(items)
+        except Exception as exc:
+            logger.error(f"Group commit falhou para lote de {len(batch)} escritas: {exc}")
+            self._fail(batch, exc)
+            return
+        self._resolve(batch, results)
+
+    async def _write_each(self, items: list) -> list:
+        results = []
+        for item in items:
+            try:
+                async with async_session() as db:
+                    results.extend(await LedgerService._write_batch(db, [item]))
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+
+group_commit_writer = GroupCommitWriter()
@@ -5,23 +5,71 @@ from src.infra.redis_client import get_redis
 class IdempotencyHandler:
     # Tempo que a resposta fica salva no cache (24 horas = 86400 segundos)
     TTL_SECONDS = 86400
+    # Reserva em andamento expira sozinha se o processo morrer no meio da operacao
+    PENDING_TTL_SECONDS = 60
+    PENDING = "__pending__"
+
+    # Resultado de reserve()
+    RESERVED = "RESERVED"
+    IN_PROGRESS = "IN_PROGRESS"
+    REPLAY = "REPLAY"
+    UNAVAILABLE = "UNAVAILABLE"
+
+    @staticmethod
+    def _cache_key(idempotency_key: str, namespace: str | None = None) -> str:
+        if namespace:
+            return f"idempotency:{namespace}:{idempotency_key}"
+        return f"idempotency:{idempotency_key}"
+
+    @staticmethod
+    async def reserve(idempotency_key: str, namespace: str | None = None) -> tuple[str, dict | None]:
+        """Reserva a chave atomicamente (SET NX GET, um round trip).
+
+        Devolve (RESERVED, None) para quem ganhou a reserva, (IN_PROGRESS, None) se outra
+        requisicao ainda esta processando, (REPLAY, resposta) se a operacao ja terminou e
+        (UNAVAILABLE, None) se o Redis falhou - nesse caso o chamador recorre ao banco.
+        """
+        cache_key = IdempotencyHandler._cache_key(idempotency_key, namespace)
+        try:
+            previous = await get_redis().set(
+                cache_key,
+                IdempotencyHandler.PENDING,
+                nx=True,
+                ex=IdempotencyHandler.PENDING_TTL_SECONDS,
+                get=True,
+            )
+        except Exception:
+            return IdempotencyHandler.UNAVAILABLE, None
+        if previous is None:
+            return IdempotencyHandler.RESERVED, None
+        if previous == IdempotencyHandler.PENDING:
+            return IdempotencyHandler.IN_PROGRESS, None
+        return IdempotencyHandler.REPLAY, json.loads(previous)
+
+    @staticmethod
+    async def release(idempotency_key: str, namespace: str | None = None):
+        """Libera a reserva de uma operacao que falhou para que o cliente possa tentar de novo."""
+        try:
+            await get_redis().delete(IdempotencyHandler._cache_key(idempotency_key, namespace))
+        except Exception:
+            return None
 
     @staticmethod
-    async def get_cached_response(idempotency_key: str):
+    async def get_cached_response(idempotency_key: str, namespace: str | None = None):
         """Busca se ja existe uma resposta salva para essa chave."""
         r = get_redis()
-        cache_key = f"idempotency:{idempotency_key}"
+        cache_key = IdempotencyHandler._cache_key(idempotency_key, namespace)
 
         cached_data = await r.get(cache_key)
-        if cached_data:
+        if cached_data and cached_data != IdempotencyHandler.PENDING:
             return json.loads(cached_data)
         return None
 
     @staticmethod
-    async def save_response(idempotency_key: str, response_data: dict):
-        """Salva a resposta de sucesso no Redis."""
+    async def save_response(idempotency_key: str, response_data: dict, namespace: str | None = None):
+        """Salva a resposta de sucesso no Redis (substitui a reserva)."""
         r = get_redis()
-        cache_key = f"idempotency:{idempotency_key}"
+        cache_key = IdempotencyHandler._cache_key(idempotency_key, namespace)
 
         await r.setex(
             name=cache_key,
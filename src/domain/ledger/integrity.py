@@ -1,22 +1,40 @@
 import time
 from src.infra.database import async_session
-from src.infra.metrics import LEDGER_INTEGRITY_OK, LEDGER_INTEGRITY_LAST_RUN, LEDGER_INTEGRITY_FAILURES
+from src.infra.metrics import (
+    LEDGER_INTEGRITY_OK,
+    LEDGER_INTEGRITY_LAST_RUN,
+    LEDGER_INTEGRITY_FAILURES,
+    LEDGER_INTEGRITY_SCAN_THROUGHPUT,
+)
 from src.infra.alerting import send_alert
 from src.domain.ledger import services as ledger_services
 
 
-async def run_integrity_check() -> dict:
+async def run_integrity_check(full: bool = False) -> dict:
+    """Verifica a cadeia a partir do ultimo checkpoint (ou inteira, se `full`) e persiste o resultado."""
     try:
+        started = time.perf_counter()
         async with async_session() as db:
-            result = await ledger_services.LedgerService.verify_integrity(db)
+            if full:
+                result = await ledger_services.LedgerService.verify_integrity_full(db)
+            else:
+                result = await ledger_services.LedgerService.verify_integrity_incremental(db)
+            await ledger_services.LedgerService.save_integrity_checkpoint(
+                db, result, duration_ms=int((time.perf_counter() - started) * 1000)
+            )
         LEDGER_INTEGRITY_LAST_RUN.set(time.time())
+        if "tx_per_second" in result:
+            LEDGER_INTEGRITY_SCAN_THROUGHPUT.set(result["tx_per_second"])
         if not result.get("ok"):
             LEDGER_INTEGRITY_OK.set(0)
             LEDGER_INTEGRITY_FAILURES.inc()
             await send_alert(
                 event="LEDGER_INTEGRITY_FAILURE",
                 severity="critical",
-                details=f"tx_id={result.get('tx_id')} reason={result.get('reason')}",
+                details=(
+                    f"mode={result.get('mode')} tx_id={result.get('tx_id')} shard={result.get('shard')} "
+                    f"anchor_id={result.get('anchor_id')} reason={result.get('reason')}"
+                ),
             )
             return result
         LEDGER_INTEGRITY_OK.set(1)
@@ -31,3 +49,4 @@ async def run_integrity_check() -> dict:
             details=str(exc),
         )
         return {"ok": False, "reason": "INTEGRITY_ERROR"}
+
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, UniqueConstraint, event
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, DateTime, Text, UniqueConstraint, Index, DDL, event
 from sqlalchemy.orm import relationship
 from src.infra.database import Base
 from datetime import datetime
@@ -68,7 +68,9 @@ class Transaction(Base):
     __tablename__ = "transactions"
     __table_args__ = (
         UniqueConstraint("account_id", "idempotency_key", name="uq_transactions_account_idempotency_key"),
-        UniqueConstraint("sequence", name="uq_transactions_sequence"),
+        UniqueConstraint("chain_shard", "sequence", name="uq_transactions_shard_sequence"),
+        # Extrato paginado por keyset (timestamp, id) dentro da conta
+        Index("ix_transactions_account_ts_id", "account_id", "timestamp", "id"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -78,6 +80,7 @@ class Transaction(Base):
     description = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     sequence = Column(Integer, index=True, nullable=True)
+    chain_shard = Column(Integer, default=0, server_default="0", nullable=False, index=True)
     prev_hash = Column(String, nullable=True)
     record_hash = Column(String, nullable=True, index=True)
 
@@ -89,6 +92,10 @@ class Transaction(Base):
 
 class Posting(Base):
     __tablename__ = "postings"
+    __table_args__ = (
+        # Leitura de saldo por delta: postings da conta apos o id coberto pelo snapshot
+        Index("ix_postings_account_id_id", "account_id", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     transaction_id = Column(Integer, ForeignKey("transactions.id"))
@@ -100,6 +107,18 @@ class Posting(Base):
     account = relationship("Account", back_populates="postings")
 
 
+class AccountBalanceSnapshot(Base):
+    __tablename__ = "account_balance_snapshots"
+
+    # Saldo de postings da conta ate last_posting_id (inclusive); avancado pelo compactador
+    id = Column(Integer, primary_key=True, index=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), unique=True, index=True, nullable=False)
+    last_posting_id = Column(Integer, nullable=False, default=0)
+    balance = Column(Money, nullable=False, default=0)
+    posting_count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 # --- PIX ---
 class PixKey(Base):
     __tablename__ = "pix_keys"
@@ -132,13 +151,73 @@ class AuditLog(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
 
 
+class AuditChainHead(Base):
+    __tablename__ = "audit_chain_heads"
+
+    # Linha unica (id=1): ultimo record_hash da cadeia de auditoria, avancado a cada lote
+    id = Column(Integer, primary_key=True)
+    record_hash = Column(String, nullable=False, default="")
+    updated_at = Column(DateTime, default=datetime.utcnow)
+
+
 class LedgerSequence(Base):
     __tablename__ = "ledger_sequence"
 
+    # Uma linha por shard da cadeia: id = shard + 1 (id=1 e a cadeia legada/shard 0)
     id = Column(Integer, primary_key=True)
     value = Column(Integer, default=0, nullable=False)
 
 
+class LedgerChainAnchor(Base):
+    __tablename__ = "ledger_chain_anchors"
+
+    id = Column(Integer, primary_key=True, index=True)
+    shard_heads = Column(Text, nullable=False)  # JSON {shard: [sequence, record_hash]}
+    # Unico: cada ancora tem um unico sucessor, execucoes concorrentes nao bifurcam a cadeia
+    prev_hash = Column(String, nullable=True, unique=True)
+    anchor_hash = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LedgerIntegrityCheckpoint(Base):
+    __tablename__ = "ledger_integrity_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    mode = Column(String, nullable=False)  # INCREMENTAL, FULL
+    ok = Column(Boolean, default=True, nullable=False, index=True)
+    reason = Column(String, nullable=True)
+    tx_id = Column(Integer, nullable=True)
+    shard = Column(Integer, nullable=True)
+    # JSON {shard: [sequence, record_hash, posting_digest]} do ultimo ponto verificado
+    chain_heads = Column(Text, nullable=False)
+    anchor_id = Column(Integer, nullable=True)
+    anchor_hash = Column(String, nullable=True)
+    verified_count = Column(Integer, default=0)
+    total_count = Column(Integer, default=0)
+    duration_ms = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# Visao logica do pool de contas de sistema (sub-contas TREASURY somadas em um unico saldo)
+_SYSTEM_BALANCE_SELECT = (
+    "SELECT COUNT(a.id) AS sub_accounts, "
+    "COALESCE(SUM(a.balance), 0) AS balance, "
+    "COALESCE((SELECT SUM(p.amount) FROM postings p JOIN accounts s ON s.id = p.account_id "
+    "WHERE s.account_type = 'TREASURY'), 0) AS postings_balance "
+    "FROM accounts a WHERE a.account_type = 'TREASURY'"
+)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(f"CREATE OR REPLACE VIEW system_account_balance AS {_SYSTEM_BALANCE_SELECT}").execute_if(dialect="postgresql"),
+)
+event.listen(
+    Base.metadata,
+    "after_create",
+    DDL(f"CREATE VIEW IF NOT EXISTS system_account_balance AS {_SYSTEM_BALANCE_SELECT}").execute_if(dialect="sqlite"),
+)
+
+
 def _prevent_update_delete(mapper, connection, target):
     raise RuntimeError("Ledger is append-only: updates/deletes are not allowed")
 
@@ -147,3 +226,5 @@ event.listen(Transaction, "before_update", _prevent_update_delete)
 event.listen(Transaction, "before_delete", _prevent_update_delete)
 event.listen(Posting, "before_update", _prevent_update_delete)
 event.listen(Posting, "before_delete", _prevent_update_delete)
+event.listen(LedgerChainAnchor, "before_update", _prevent_update_delete)
+event.listen(LedgerChainAnchor, "before_delete", _prevent_update_delete)
@@ -0,0 +1,260 @@
+import json
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.pool import NullPool
+
+from src.core.config import settings
+from src.core.money import to_decimal
+from src.domain.ledger import models
+from src.domain.ledger.services import LedgerService
+from src.infra import database
+
+logger = logging.getLogger(__name__)
+
+
+def _worker_engine():
+    # Conexoes nao podem ser herdadas pelo fork: cada processo do pool abre a sua
+    return create_engine(
+        database.SYNC_DATABASE_URL,
+        connect_args=database._sync_connect_args,
+        poolclass=NullPool,
+    )
+
+
+def plan_ranges(conn, range_size: int | None) -> list[tuple[int, int, int]]:
+    """Divide o espaco de sequencias de cada shard em faixas (shard, inicio, fim); `None` = uma faixa por shard."""
+    stmt = select(
+        models.Transaction.chain_shard,
+        func.min(models.Transaction.sequence),
+        func.max(models.Transaction.sequence),
+    ).group_by(models.Transaction.chain_shard)
+    ranges = []
+    for shard, low, high in conn.execute(stmt).all():
+        if low is None:
+            continue
+        step = range_size or (high - low + 1)
+        for start in range(low, high + 1, step):
+            ranges.append((shard, start, min(start + step - 1, high)))
+    return sorted(ranges)
+
+
+def _range_stmt(shard: int, start: int, end: int):
+    tx = models.Transaction
+    in_range = (tx.chain_shard == shard) & tx.sequence.between(start, end)
+    posting_sums = (
+        select(
+            models.Posting.transaction_id.label("transaction_id"),
+            func.count(models.Posting.id).label("count"),
+            func.coalesce(func.sum(models.Posting.amount), 0.0).label("total"),
+            func.coalesce(func.sum(func.abs(models.Posting.amount)), 0.0).label("volume"),
+            func.coalesce(func.sum(models.Posting.account_id), 0).label("acc_sum"),
+        )
+        .where(models.Posting.transaction_id.in_(select(tx.id).where(in_range)))
+        .group_by(models.Posting.transaction_id)
+        .subquery()
+    )
+    return (
+        select(
+            tx.id,
+            tx.sequence,
+            tx.chain_shard,
+            tx.account_id,
+            tx.amount,
+            tx.operation_type,
+            tx.description,
+            tx.timestamp,
+            tx.prev_hash,
+            tx.record_hash,
+            posting_sums.c.count,
+            posting_sums.c.total,
+            posting_sums.c.volume,
+            posting_sums.c.acc_sum,
+        )
+        .outerjoin(posting_sums, posting_sums.c.transaction_id == tx.id)
+        .where(in_range)
+        .order_by(tx.sequence.asc())
+    )
+
+
+def scan_range(
+    shard: int, start: int, end: int, batch_size: int, engine=None, expected_digests: dict | None = None
+) -> dict:
+    """Verifica uma faixa lendo-a por cursor no servidor; memoria limitada a `batch_size` linhas.
+
+    Com `expected_digests` ({sequence: digest} do ultimo checkpoint) a faixa deve comecar no
+    inicio do shard: o digest de postings e encadeado e conferido nas sequencias do checkpoint.
+    """
+    own_engine = engine is None
+    engine = engine or _worker_engine()
+    result = {
+        "shard": shard,
+        "start": start,
+        "end": end,
+        "count": 0,
+        "first_tx_id": None,
+        "first_prev_hash": None,
+        "last_record_hash": None,
+        "last_sequence": None,
+        "last_digest": None,
+        "failure": None,
+    }
+    try:
+        with engine.connect() as conn:
+            rows = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+                _range_stmt(shard, start, end)
+            )
+            prev_hash = None
+            digest = ""
+            for row in rows:
+                if result["count"] == 0:
+                    result["first_tx_id"] = row.id
+                    result["first_prev_hash"] = row.prev_hash or ""
+                    prev_hash = row.prev_hash or ""
+                result["count"] += 1
+                stats = (
+                    int(row.count or 0), to_decimal(row.total or 0), to_decimal(row.volume or 0), int(row.acc_sum or 0)
+                )
+                if stats[1] != to_decimal("0.00"):
+                    result["failure"] = {"ok": False, "tx_id": row.id, "shard": shard, "reason": "POSTINGS_IMBALANCE"}
+                    break
+                expected = LedgerService._tx_record_hash(row, row.sequence, prev_hash)
+                if row.record_hash != expected or (row.prev_hash or "") != prev_hash:
+                    result["failure"] = {"ok": False, "tx_id": row.id, "shard": shard, "reason": "HASH_MISMATCH"}
+                    break
+                if expected_digests is not None:
+                    digest = LedgerService._posting_digest(digest, row, stats)
+                    checkpoint_digest = expected_digests.get(row.sequence)
+                    if checkpoint_digest is not None and checkpoint_digest != digest:
+                        result["failure"] = {
+                            "ok": False, "tx_id": row.id, "shard": shard, "reason": "POSTINGS_DIGEST_MISMATCH"
+                        }
+                        break
+                prev_hash = row.record_hash
+                result["last_sequence"] = row.sequence
+            result["last_record_hash"] = prev_hash
+            if expected_digests is not None:
+                result["last_digest"] = digest
+    finally:
+        if own_engine:
+            engine.dispose()
+    return result
+
+
+def check_boundaries(results: list[dict]) -> dict | None:
+    """Confere que cada faixa comeca no record_hash em que a faixa anterior do mesmo shard terminou."""
+    expected: dict[int, str] = {}
+    for item in sorted(results, key=lambda r: (r["shard"], r["start"])):
+        if item["count"] == 0:
+            continue
+        shard = item["shard"]
+        if item["first_prev_hash"] != expected.get(shard, ""):
+            return {"ok": False, "tx_id": item["first_tx_id"], "shard": shard, "reason": "RANGE_BOUNDARY_MISMATCH"}
+        expected[shard] = item["last_record_hash"]
+    return None
+
+
+def _check_anchors(conn, batch_size: int) -> tuple[int, dict | None, object]:
+    stmt = select(models.LedgerChainAnchor.__table__).order_by(models.LedgerChainAnchor.id.asc())
+    rows = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+    prev_anchor = ""
+    count = 0
+    last = None
+    for anchor in rows:
+        count += 1
+        expected = LedgerService._anchor_hash(anchor.shard_heads, prev_anchor)
+        if anchor.anchor_hash != expected or (anchor.prev_hash or "") != prev_anchor:
+            return count, {"ok": False, "anchor_id": anchor.id, "reason": "ANCHOR_MISMATCH"}, last
+        for shard, (seq, record_hash) in json.loads(anchor.shard_heads).items():
+            head_stmt = select(models.Transaction.record_hash).where(
+                models.Transaction.chain_shard == int(shard),
+                models.Transaction.sequence == seq,
+            )
+            if conn.execute(head_stmt).scalar_one_or_none() != record_hash:
+                return count, {"ok": False, "anchor_id": anchor.id, "shard": int(shard), "reason": "ANCHOR_HEAD_MISMATCH"}, last
+        prev_anchor = anchor.anchor_hash
+        last = anchor
+    return count, None, last
+
+
+def _shard_digests(expected_digests: dict | None, shard: int) -> dict | None:
+    if expected_digests is None:
+        return None
+    return {seq: digest for (digest_shard, seq), digest in expected_digests.items() if digest_shard == str(shard)}
+
+
+def scan_ledger(
+    workers: int | None = None,
+    range_size: int | None = None,
+    batch_size: int | None = None,
+    expected_digests: dict | None = None,
+) -> dict:
+    """Re-verificacao completa da cadeia em faixas paralelas, com memoria constante.
+
+    Com `expected_digests` ({(shard, sequence): digest}, vindo do ultimo checkpoint) cada shard
+    vira uma faixa so, o digest de postings e conferido e o relatorio traz as cabecas
+    (`heads`) e a ultima ancora para gravar um novo checkpoint: e o modo FULL do check.
+    """
+    workers = settings.LEDGER_SCAN_WORKERS if workers is None else workers
+    with_digests = expected_digests is not None
+    range_size = None if with_digests else (range_size or settings.LEDGER_SCAN_RANGE_SIZE)
+    batch_size = batch_size or settings.LEDGER_SCAN_BATCH_SIZE
+    if workers > 1 and multiprocessing.current_process().daemon:
+        # Workers prefork do Celery sao daemon e nao podem criar processos filhos
+        logger.warning("Scanner do ledger em processo daemon: executando sem pool de processos")
+        workers = 0
+
+    started = time.perf_counter()
+    with database.sync_engine.connect() as conn:
+        ranges = plan_ranges(conn, range_size)
+
+    if workers > 1 and len(ranges) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+            futures = [
+                pool.submit(scan_range, shard, start, end, batch_size, None, _shard_digests(expected_digests, shard))
+                for shard, start, end in ranges
+            ]
+            results = [future.result() for future in futures]
+    else:
+        results = [
+            scan_range(
+                shard, start, end, batch_size, engine=database.sync_engine,
+                expected_digests=_shard_digests(expected_digests, shard),
+            )
+            for shard, start, end in ranges
+        ]
+
+    count = sum(item["count"] for item in results)
+    failures = [item["failure"] for item in results if item["failure"]]
+    failure = failures[0] if failures else check_boundaries(results)
+    anchors, last_anchor = 0, None
+    if failure is None:
+        with database.sync_engine.connect() as conn:
+            anchors, failure, last_anchor = _check_anchors(conn, batch_size)
+
+    elapsed = time.perf_counter() - started
+    report = {
+        "ok": failure is None,
+        "mode": "SCAN",
+        "count": count,
+        "shards": len({item["shard"] for item in results}),
+        "ranges": len(results),
+        "anchors": anchors,
+        "workers": workers,
+        "duration_ms": int(elapsed * 1000),
+        "tx_per_second": round(count / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+    if with_digests:
+        report["heads"] = {
+            str(item["shard"]): [item["last_sequence"], item["last_record_hash"], item["last_digest"]]
+            for item in results
+            if item["count"]
+        }
+        report["anchor_id"] = last_anchor.id if last_anchor is not None else None
+        report["anchor_hash"] = last_anchor.anchor_hash if last_anchor is not None else None
+    if failure:
+        report.update(failure)
+    return report
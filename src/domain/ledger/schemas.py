@@ -1,7 +1,9 @@
-from pydantic import BaseModel, EmailStr, field_validator, model_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from typing import Optional, List
 from datetime import datetime
 
+from src.core.config import settings
+
 # --- AUTH & TOKENS ---
 class Token(BaseModel):
     access_token: str
@@ -118,6 +120,67 @@ class TransferCreate(BaseModel):
         return self
 
 
+# --- LOTE (folha, liquidacao de cartao, juros) ---
+class LedgerBatchItem(BaseModel):
+    type: str  # "DEPOSIT", "WITHDRAW", "TRANSFER"
+    account_id: int  # Conta debitada em saques/transferencias
+    to_account_id: Optional[int] = None
+    amount: float
+    idempotency_key: str
+    description: Optional[str] = None
+
+    @field_validator("amount")
+    @classmethod
+    def validate_amount(cls, value: float) -> float:
+        if value <= 0:
+            raise ValueError("Valor deve ser positivo.")
+        return value
+
+    @field_validator("type")
+    @classmethod
+    def validate_type(cls, value: str) -> str:
+        allowed = {"DEPOSIT", "WITHDRAW", "TRANSFER"}
+        normalized = value.strip().upper()
+        if normalized not in allowed:
+            raise ValueError("Tipo de transacao invalido.")
+        return normalized
+
+    @field_validator("idempotency_key")
+    @classmethod
+    def validate_idempotency_key(cls, value: str) -> str:
+        if not value or not value.strip():
+            raise ValueError("Chave de idempotencia invalida.")
+        return value.strip()
+
+    @model_validator(mode="after")
+    def validate_accounts(self):
+        if self.type == "TRANSFER":
+            if self.to_account_id is None:
+                raise ValueError("Conta de destino obrigatoria.")
+            if self.to_account_id == self.account_id:
+                raise ValueError("Conta de origem e destino iguais.")
+        return self
+
+
+class LedgerBatchCreate(BaseModel):
+    items: List[LedgerBatchItem] = Field(min_length=1, max_length=settings.LEDGER_BATCH_MAX_ITEMS)
+
+
+class LedgerBatchItemResult(BaseModel):
+    index: int
+    status: str  # CREATED, DUPLICATE, ERROR
+    transaction_id: Optional[int] = None
+    status_code: int
+    detail: Optional[str] = None
+
+
+class LedgerBatchResponse(BaseModel):
+    created: int
+    duplicates: int
+    failed: int
+    results: List[LedgerBatchItemResult]
+
+
 # --- PIX ---
 class PixKeyCreate(BaseModel):
     key: str
@@ -1,12 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, update
+from sqlalchemy import select, func, update, and_, or_
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException
 from datetime import timedelta, datetime
+from types import SimpleNamespace
 
 from src.domain.ledger import models, schemas
+from src.domain.ledger.idempotency import IdempotencyHandler
+from src.domain.fraud.features import feature_store
+from src.domain.fraud.graph import transfer_graph
 from src.infra.cache import cache
+from src.infra.database import async_session
+from src.infra.instrumentation import stage, timed
+from src.infra.auth_cache import auth_cache
+from src.infra.policy_cache import MISSING, policy_cache, snapshot
 from src.core import security
 from src.core.config import settings
 from src.infra.metrics import TRANSACTION_COUNT
@@ -19,13 +27,24 @@ from src.core.money import to_decimal
 import pyotp
 import random
 import secrets
+import asyncio
 import hashlib
+import json
+import base64
+import csv
+import io
 
 # Threshold em unidades (R$). Converta cents -> unidades antes de validar.
 MFA_THRESHOLD_UNITS = to_decimal("1000.00")
 
 
+SYSTEM_ACCOUNT_TYPE = "TREASURY"
+
+
 class LedgerService:
+    # Pool de contas de sistema (stripe -> account id), resolvido uma vez por processo
+    _system_account_ids: dict[int, int] = {}
+
     @staticmethod
     def _ensure_account_active(account: models.Account):
         if not account:
@@ -34,12 +53,14 @@ class LedgerService:
             raise HTTPException(status_code=403, detail="Conta inativa ou bloqueada")
 
     @staticmethod
+    @timed("ledger.lock_wait")
     async def _get_account_for_update(db: AsyncSession, account_id: int) -> models.Account | None:
         stmt = select(models.Account).where(models.Account.id == account_id).with_for_update()
         res = await db.execute(stmt)
         return res.scalar_one_or_none()
 
     @staticmethod
+    @timed("ledger.lock_wait")
     async def _get_accounts_for_update(db: AsyncSession, account_ids: list[int]) -> dict[int, models.Account]:
         if not account_ids:
             return {}
@@ -53,13 +74,10 @@ class LedgerService:
         return {acc.id: acc for acc in res.scalars().all()}
 
     @staticmethod
-    async def _ensure_kyc_for_outbound(db: AsyncSession, user_id: int, amount_units: float):
+    def _ensure_kyc(policy, amount_units):
         if amount_units < to_decimal(settings.KYC_REQUIRED_THRESHOLD):
             return
-        stmt = select(regulatory_models.KycProfile).where(regulatory_models.KycProfile.user_id == user_id)
-        res = await db.execute(stmt)
-        profile = res.scalar_one_or_none()
-        if not profile or profile.status != "VERIFIED":
+        if not policy.kyc or policy.kyc.status != "VERIFIED":
             raise HTTPException(status_code=403, detail="KYC_REQUIRED")
 
     @staticmethod
@@ -70,11 +88,74 @@ class LedgerService:
         if not cfg:
             cfg = settings_models.LimitConfig(user_id=user_id)
             db.add(cfg)
-            await db.commit()
+            try:
+                await db.commit()
+            except IntegrityError:
+                # Outra requisicao criou a linha primeiro
+                await db.rollback()
+                res = await db.execute(stmt)
+                cfg = res.scalar_one()
         return cfg
 
     @staticmethod
-    async def _get_system_account(db: AsyncSession, for_update: bool = False) -> models.Account:
+    async def _cached_user_limits(db: AsyncSession, user_id: int):
+        limits = policy_cache.get("limits", user_id)
+        if limits is MISSING:
+            limits = snapshot(await LedgerService._get_user_limits(db, user_id))
+            policy_cache.put("limits", user_id, limits)
+        return limits
+
+    @staticmethod
+    async def _cached_kyc_profile(db: AsyncSession, user_id: int):
+        profile = policy_cache.get("kyc", user_id)
+        if profile is MISSING:
+            stmt = select(regulatory_models.KycProfile).where(regulatory_models.KycProfile.user_id == user_id)
+            res = await db.execute(stmt)
+            profile = snapshot(res.scalar_one_or_none())
+            policy_cache.put("kyc", user_id, profile)
+        return profile
+
+    @staticmethod
+    @timed("ledger.policy_load")
+    async def _load_outbound_policy(db: AsyncSession, account_id: int, amount_units) -> SimpleNamespace | None:
+        """Limites e KYC do dono da conta, lidos antes de travar as contas.
+
+        Vem do policy_cache; no miss a linha de limites ausente e criada aqui (com commit),
+        de modo que a secao critica da transferencia so toca as linhas de conta.
+        """
+        user_id = policy_cache.get("account_owner", account_id)
+        if user_id is MISSING:
+            res = await db.execute(select(models.Account.user_id).where(models.Account.id == account_id))
+            user_id = res.scalar_one_or_none()
+            if user_id is None:
+                return None
+            policy_cache.put("account_owner", account_id, user_id)
+        kyc = None
+        if amount_units >= to_decimal(settings.KYC_REQUIRED_THRESHOLD):
+            kyc = await LedgerService._cached_kyc_profile(db, user_id)
+        limits = await LedgerService._cached_user_limits(db, user_id)
+        return SimpleNamespace(user_id=user_id, limits=limits, kyc=kyc)
+
+    @staticmethod
+    def _system_account_number(stripe: int) -> str:
+        if stripe == 0:
+            return settings.SYSTEM_ACCOUNT_NUMBER
+        return f"{settings.SYSTEM_ACCOUNT_NUMBER}.{stripe}"
+
+    @staticmethod
+    def _system_stripe_for(key: str | None) -> int:
+        stripes = settings.SYSTEM_ACCOUNT_STRIPES
+        if stripes <= 1 or key is None:
+            return 0
+        digest = hashlib.sha256(key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") % stripes
+
+    @staticmethod
+    async def _resolve_system_accounts(db: AsyncSession) -> dict[int, int]:
+        cached = LedgerService._system_account_ids
+        if len(cached) >= settings.SYSTEM_ACCOUNT_STRIPES:
+            return cached
+
         stmt_user = select(models.User).where(models.User.email == settings.SYSTEM_USER_EMAIL)
         res_user = await db.execute(stmt_user)
         sys_user = res_user.scalar_one_or_none()
@@ -93,24 +174,78 @@ class LedgerService:
             db.add(sys_user)
             await db.flush()
 
-        stmt_acc = select(models.Account).where(models.Account.account_number == settings.SYSTEM_ACCOUNT_NUMBER)
-        if for_update:
-            stmt_acc = stmt_acc.with_for_update()
+        numbers = {
+            stripe: LedgerService._system_account_number(stripe)
+            for stripe in range(settings.SYSTEM_ACCOUNT_STRIPES)
+        }
+        stmt_acc = select(models.Account).where(models.Account.account_number.in_(list(numbers.values())))
         res_acc = await db.execute(stmt_acc)
-        sys_acc = res_acc.scalar_one_or_none()
-        if not sys_acc:
-            sys_acc = models.Account(
-                account_number=settings.SYSTEM_ACCOUNT_NUMBER,
-                balance=to_decimal("0.00"),
-                blocked_balance=to_decimal("0.00"),
-                overdraft_limit=to_decimal("0.00"),
-                account_type="TREASURY",
-                user_id=sys_user.id,
-                owner=sys_user,
+        by_number = {acc.account_number: acc for acc in res_acc.scalars().all()}
+        pool = {}
+        for stripe, number in numbers.items():
+            sys_acc = by_number.get(number)
+            if not sys_acc:
+                sys_acc = models.Account(
+                    account_number=number,
+                    balance=to_decimal("0.00"),
+                    blocked_balance=to_decimal("0.00"),
+                    overdraft_limit=to_decimal("0.00"),
+                    account_type=SYSTEM_ACCOUNT_TYPE,
+                    user_id=sys_user.id,
+                    owner=sys_user,
+                )
+                db.add(sys_acc)
+            pool[stripe] = sys_acc
+        await db.flush()
+
+        cached.clear()
+        cached.update({stripe: acc.id for stripe, acc in pool.items()})
+        return cached
+
+    @staticmethod
+    async def _get_system_account(
+        db: AsyncSession, for_update: bool = False, stripe_key: str | None = None
+    ) -> models.Account:
+        stripe = LedgerService._system_stripe_for(stripe_key)
+
+        async def _load(account_id: int) -> models.Account | None:
+            stmt = select(models.Account).where(
+                models.Account.id == account_id,
+                models.Account.account_number == LedgerService._system_account_number(stripe),
             )
-            db.add(sys_acc)
-            await db.flush()
-        return sys_acc
+            if for_update:
+                stmt = stmt.with_for_update()
+            res = await db.execute(stmt)
+            return res.scalar_one_or_none()
+
+        account_id = LedgerService._system_account_ids.get(stripe)
+        if account_id is not None:
+            sys_acc = await _load(account_id)
+            if sys_acc:
+                return sys_acc
+            # Id em memoria obsoleto (ex.: banco recriado ou rollback da criacao)
+            LedgerService._system_account_ids.clear()
+        ids = await LedgerService._resolve_system_accounts(db)
+        return await _load(ids[stripe])
+
+    @staticmethod
+    async def get_system_balance(db: AsyncSession) -> dict:
+        """Saldo logico do sistema: soma de todas as sub-contas do pool."""
+        stmt = select(
+            func.count(models.Account.id),
+            func.coalesce(func.sum(models.Account.balance), 0.0),
+        ).where(models.Account.account_type == SYSTEM_ACCOUNT_TYPE)
+        res = await db.execute(stmt)
+        sub_accounts, balance = res.one()
+        stmt_post = select(func.coalesce(func.sum(models.Posting.amount), 0.0)).join(
+            models.Account, models.Account.id == models.Posting.account_id
+        ).where(models.Account.account_type == SYSTEM_ACCOUNT_TYPE)
+        res_post = await db.execute(stmt_post)
+        return {
+            "sub_accounts": int(sub_accounts or 0),
+            "balance": to_decimal(balance or 0),
+            "postings_balance": to_decimal(res_post.scalar() or 0),
+        }
 
     @staticmethod
     def _ensure_double_entry(postings: list[models.Posting]) -> None:
@@ -121,42 +256,128 @@ class LedgerService:
             raise HTTPException(status_code=500, detail="Invariancia double-entry violada")
 
     @staticmethod
-    async def _compute_tx_hash(
-        db: AsyncSession,
-        tx: models.Transaction,
-    ) -> tuple[int, str]:
+    def _chain_shard_for(account_id: int | None) -> int:
+        shards = settings.LEDGER_CHAIN_SHARDS
+        if shards <= 1:
+            return 0
+        # Hash estavel (nao usa hash() do Python, que varia por processo)
+        digest = hashlib.sha256(str(account_id or 0).encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") % shards
+
+    @staticmethod
+    def _tx_record_hash(tx: models.Transaction, sequence: int, prev_hash: str) -> str:
+        shard = tx.chain_shard or 0
+        # Shard 0 mantem o formato legado para nao invalidar a cadeia existente
+        seq_token = str(sequence) if shard == 0 else f"{shard}:{sequence}"
+        raw = "|".join([
+            seq_token,
+            str(tx.account_id),
+            str(tx.amount),
+            tx.operation_type,
+            tx.description or "",
+            tx.timestamp.isoformat(),
+            prev_hash or "",
+        ])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    @timed("ledger.sequence_update")
+    async def _allocate_sequences(db: AsyncSession, shard: int, count: int) -> tuple[int, str]:
+        """Reserva um bloco contiguo de `count` sequencias no shard e devolve (primeira, prev_hash)."""
+        seq_id = shard + 1
         stmt_update = (
             update(models.LedgerSequence)
-            .where(models.LedgerSequence.id == 1)
-            .values(value=models.LedgerSequence.value + 1)
+            .where(models.LedgerSequence.id == seq_id)
+            .values(value=models.LedgerSequence.value + count)
             .returning(models.LedgerSequence.value)
         )
         res_update = await db.execute(stmt_update)
         seq_value = res_update.scalar_one_or_none()
         if seq_value is None:
-            seq_row = models.LedgerSequence(id=1, value=1)
+            seq_row = models.LedgerSequence(id=seq_id, value=count)
             db.add(seq_row)
             await db.flush()
-            sequence = 1
+            last = count
         else:
-            sequence = int(seq_value)
+            last = int(seq_value)
+        first = last - count + 1
 
-        stmt_prev = select(models.Transaction).where(models.Transaction.sequence == sequence - 1)
+        stmt_prev = select(models.Transaction.record_hash).where(
+            models.Transaction.chain_shard == shard,
+            models.Transaction.sequence == first - 1,
+        )
         res_prev = await db.execute(stmt_prev)
-        last_tx = res_prev.scalar_one_or_none()
-        prev_hash = last_tx.record_hash if last_tx else ""
-        raw = "|".join([
-            str(sequence),
-            str(tx.account_id),
-            str(tx.amount),
-            tx.operation_type,
-            tx.description or "",
-            tx.timestamp.isoformat(),
-            prev_hash or "",
-        ])
-        record_hash = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        prev_hash = res_prev.scalar_one_or_none() or ""
+        return first, prev_hash
+
+    @staticmethod
+    async def _compute_tx_hash(
+        db: AsyncSession,
+        tx: models.Transaction,
+    ) -> tuple[int, str, str]:
+        shard = LedgerService._chain_shard_for(tx.account_id)
+        tx.chain_shard = shard
+        sequence, prev_hash = await LedgerService._allocate_sequences(db, shard, 1)
+        record_hash = LedgerService._tx_record_hash(tx, sequence, prev_hash)
         return sequence, prev_hash, record_hash
 
+    @staticmethod
+    def _anchor_hash(shard_heads: str, prev_hash: str) -> str:
+        raw = "|".join([shard_heads, prev_hash or ""])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    async def anchor_chain_heads(db: AsyncSession) -> models.LedgerChainAnchor | None:
+        heads_sub = (
+            select(
+                models.Transaction.chain_shard.label("shard"),
+                func.max(models.Transaction.sequence).label("seq"),
+            )
+            .where(models.Transaction.sequence.is_not(None))
+            .group_by(models.Transaction.chain_shard)
+            .subquery()
+        )
+        stmt = (
+            select(models.Transaction.chain_shard, models.Transaction.sequence, models.Transaction.record_hash)
+            .join(
+                heads_sub,
+                and_(
+                    models.Transaction.chain_shard == heads_sub.c.shard,
+                    models.Transaction.sequence == heads_sub.c.seq,
+                ),
+            )
+            .order_by(models.Transaction.chain_shard.asc())
+        )
+        res = await db.execute(stmt)
+        heads = {str(shard): [seq, record_hash] for shard, seq, record_hash in res.all()}
+        if not heads:
+            return None
+
+        stmt_last = select(models.LedgerChainAnchor).order_by(models.LedgerChainAnchor.id.desc()).limit(1)
+        shard_heads = json.dumps(heads, sort_keys=True)
+        for attempt in range(3):
+            res_last = await db.execute(stmt_last)
+            last = res_last.scalar_one_or_none()
+            if last and last.shard_heads == shard_heads:
+                return last
+
+            prev_hash = last.anchor_hash if last else ""
+            anchor = models.LedgerChainAnchor(
+                shard_heads=shard_heads,
+                prev_hash=prev_hash,
+                anchor_hash=LedgerService._anchor_hash(shard_heads, prev_hash),
+            )
+            db.add(anchor)
+            try:
+                await db.commit()
+                return anchor
+            except IntegrityError:
+                # prev_hash e unico: outra execucao ancorou sobre a mesma ancora primeiro;
+                # refaz a partir da ultima gravada em vez de bifurcar a cadeia
+                await db.rollback()
+                if attempt == 2:
+                    raise
+
     @staticmethod
     async def create_account(db: AsyncSession, data: schemas.AccountCreate):
         result = await db.execute(select(models.User).filter(models.User.email == data.email))
@@ -357,12 +578,65 @@ class LedgerService:
                 raise HTTPException(status_code=401, detail="Codigo MFA invalido")
 
     @staticmethod
-    async def check_idempotency(namespace: str, key: str):
-        cache_key = f"idem:{namespace}:{key}"
-        if await cache.get_value(cache_key):
-            return True
-        await cache.set_value(cache_key, "processed", expire_in_seconds=86400)
-        return False
+    def _idempotency_response(tx: models.Transaction) -> dict:
+        return {
+            "id": tx.id,
+            "account_id": tx.account_id,
+            "amount": str(tx.amount),
+            "operation_type": tx.operation_type,
+            "description": tx.description,
+            "timestamp": tx.timestamp.isoformat() if tx.timestamp else None,
+        }
+
+    @staticmethod
+    def _replay_transaction(payload: dict) -> models.Transaction:
+        # Transaction transitoria (fora da sessao) montada a partir da resposta gravada no Redis
+        tx = models.Transaction(
+            id=payload["id"],
+            account_id=payload.get("account_id"),
+            amount=to_decimal(payload["amount"]),
+            operation_type=payload.get("operation_type"),
+            description=payload.get("description"),
+            timestamp=datetime.fromisoformat(payload["timestamp"]) if payload.get("timestamp") else None,
+        )
+        tx.idempotency_hit = True
+        return tx
+
+    @staticmethod
+    async def _run_idempotent(db: AsyncSession, account_id: int, idempotency_key: str, operation):
+        """Executa `operation` uma unica vez por (conta, chave).
+
+        A reserva e atomica no Redis e replays sao respondidos de la sem tocar o banco;
+        a unique constraint (account_id, idempotency_key) continua como garantia duravel.
+        """
+        namespace = str(account_id)
+        with stage("ledger.idempotency"):
+            status, stored = await IdempotencyHandler.reserve(idempotency_key, namespace=namespace)
+        if status == IdempotencyHandler.REPLAY:
+            return LedgerService._replay_transaction(stored)
+        if status == IdempotencyHandler.IN_PROGRESS:
+            raise HTTPException(status_code=409, detail="Transacao em processamento")
+        if status == IdempotencyHandler.UNAVAILABLE:
+            existing = await LedgerService._find_transaction_by_idempotency(db, account_id, idempotency_key)
+            if existing:
+                existing.idempotency_hit = True
+                return existing
+
+        try:
+            tx = await operation()
+        except BaseException:
+            if status == IdempotencyHandler.RESERVED:
+                await IdempotencyHandler.release(idempotency_key, namespace=namespace)
+            raise
+        if status == IdempotencyHandler.RESERVED:
+            try:
+                await IdempotencyHandler.save_response(
+                    idempotency_key, LedgerService._idempotency_response(tx), namespace=namespace
+                )
+            except Exception:
+                # Sem a resposta gravada a reserva expira; o replay cai na unique constraint
+                pass
+        return tx
 
     @staticmethod
     async def _find_transaction_by_idempotency(
@@ -375,6 +649,61 @@ class LedgerService:
         res = await db.execute(stmt)
         return res.scalar_one_or_none()
 
+    @staticmethod
+    async def _check_transaction_policy(
+        db: AsyncSession, account: models.Account, tx_type: str, amount_units, otp: str = None, policy=None
+    ) -> None:
+        if tx_type == "WITHDRAW":
+            LedgerService._ensure_kyc(policy, amount_units)
+            if amount_units > to_decimal(policy.limits.withdrawal_limit or 0):
+                raise HTTPException(status_code=422, detail="Limite de saque excedido")
+        await LedgerService.validate_step_up_auth(db, account.id, amount_units, otp)
+
+    @staticmethod
+    async def _check_transfer_policy(
+        db: AsyncSession, acc_from: models.Account, amount_units, otp: str = None, policy=None
+    ) -> None:
+        LedgerService._ensure_kyc(policy, amount_units)
+        if amount_units > to_decimal(policy.limits.ted_limit or 0):
+            raise HTTPException(status_code=422, detail="Limite de transferencia excedido")
+        await LedgerService.validate_step_up_auth(db, acc_from.id, amount_units, otp)
+
+    @staticmethod
+    @timed("ledger.after_commit")
+    async def _after_commit(
+        db: AsyncSession, user_id: int, operation_type: str, amount_units, account_ids: list[int]
+    ) -> None:
+        for account_id in account_ids:
+            await cache.delete_key(f"balance:{account_id}")
+        await feature_store.record(
+            account_ids[0],
+            amount_units,
+            payee_id=account_ids[1] if operation_type == "TRANSFER" else None,
+        )
+        if operation_type == "TRANSFER":
+            await transfer_graph.record(account_ids[0], account_ids[1])
+        if amount_units >= to_decimal(settings.AML_LARGE_TX_THRESHOLD):
+            from src.domain.regulatory.services import RegulatoryService
+            await RegulatoryService.create_aml_alert(
+                db, user_id, rule="LARGE_TX", details=f"amount={amount_units}"
+            )
+        TRANSACTION_COUNT.labels(operation_type=operation_type).inc()
+
+    @staticmethod
+    @timed("ledger.group_commit_wait")
+    async def _submit_group_commit(db: AsyncSession, item: dict) -> models.Transaction:
+        from src.domain.ledger.group_commit import group_commit_writer
+        try:
+            return await group_commit_writer.submit(item)
+        except IntegrityError:
+            existing = await LedgerService._find_transaction_by_idempotency(
+                db, item["account_id"], item["idempotency_key"]
+            )
+            if existing:
+                existing.idempotency_hit = True
+                return existing
+            raise
+
     # --- CORE BANKING & LEDGER ---
     @staticmethod
     async def get_balance(db: AsyncSession, account_id: int, use_cache: bool = True) -> float:
@@ -384,11 +713,17 @@ class LedgerService:
             if cached is not None:
                 return to_decimal(cached)
 
-        stmt = select(func.coalesce(func.sum(models.Posting.amount), 0.0)).where(
-            models.Posting.account_id == account_id
-        )
-        res = await db.execute(stmt)
-        bal = to_decimal(res.scalar() or 0)
+        # Saldo = snapshot + postings posteriores ao ultimo posting coberto por ele
+        snapshot = models.AccountBalanceSnapshot
+        snap_balance = select(snapshot.balance).where(snapshot.account_id == account_id).scalar_subquery()
+        snap_last_id = select(snapshot.last_posting_id).where(snapshot.account_id == account_id).scalar_subquery()
+        delta = select(func.coalesce(func.sum(models.Posting.amount), 0.0)).where(
+            models.Posting.account_id == account_id,
+            models.Posting.id > func.coalesce(snap_last_id, 0),
+        ).scalar_subquery()
+        res = await db.execute(select(func.coalesce(snap_balance, 0.0), delta))
+        base, tail = res.one()
+        bal = to_decimal(base or 0) + to_decimal(tail or 0)
 
         if bal == 0:
             stmt_acc = select(models.Account).where(models.Account.id == account_id)
@@ -401,6 +736,67 @@ class LedgerService:
             await cache.set_value(cache_key, str(bal), expire_in_seconds=60)
         return bal
 
+    @staticmethod
+    async def compact_balance_snapshot(db: AsyncSession, account_id: int) -> models.AccountBalanceSnapshot | None:
+        """Avanca o snapshot de saldo da conta ate o ultimo posting gravado.
+
+        Roda com a conta travada: toda escrita de postings trava as contas envolvidas,
+        entao nenhum posting desta conta pode commitar depois com id menor que o coberto.
+        """
+        account = await LedgerService._get_account_for_update(db, account_id)
+        if not account:
+            return None
+        stmt_snap = select(models.AccountBalanceSnapshot).where(
+            models.AccountBalanceSnapshot.account_id == account_id
+        )
+        res_snap = await db.execute(stmt_snap)
+        snap = res_snap.scalar_one_or_none()
+        last_id = snap.last_posting_id if snap else 0
+
+        stmt = select(
+            func.coalesce(func.sum(models.Posting.amount), 0.0),
+            func.count(models.Posting.id),
+            func.max(models.Posting.id),
+        ).where(models.Posting.account_id == account_id, models.Posting.id > last_id)
+        res = await db.execute(stmt)
+        total, count, max_id = res.one()
+        if not count:
+            await db.commit()
+            return snap
+        if snap is None:
+            snap = models.AccountBalanceSnapshot(account_id=account_id, balance=to_decimal("0.00"), posting_count=0)
+            db.add(snap)
+        snap.balance = to_decimal(snap.balance or 0) + to_decimal(total or 0)
+        snap.posting_count = (snap.posting_count or 0) + int(count)
+        snap.last_posting_id = int(max_id)
+        await db.commit()
+        return snap
+
+    @staticmethod
+    async def compact_balance_snapshots(
+        db: AsyncSession, min_postings: int | None = None, limit: int | None = None
+    ) -> int:
+        """Compactador: avanca os snapshots das contas com mais postings pendentes."""
+        min_postings = min_postings or settings.LEDGER_SNAPSHOT_MIN_POSTINGS
+        limit = limit or settings.LEDGER_SNAPSHOT_BATCH_ACCOUNTS
+        snapshot = models.AccountBalanceSnapshot
+        pending = func.count(models.Posting.id)
+        stmt = (
+            select(models.Posting.account_id)
+            .outerjoin(snapshot, snapshot.account_id == models.Posting.account_id)
+            .where(models.Posting.id > func.coalesce(snapshot.last_posting_id, 0))
+            .group_by(models.Posting.account_id)
+            .having(pending >= min_postings)
+            .order_by(pending.desc())
+            .limit(limit)
+        )
+        res = await db.execute(stmt)
+        account_ids = [row[0] for row in res.all()]
+        # Uma transacao curta por conta para nao segurar travas de varias contas ao mesmo tempo
+        for account_id in account_ids:
+            await LedgerService.compact_balance_snapshot(db, account_id)
+        return len(account_ids)
+
     @staticmethod
     async def create_transaction(
         db: AsyncSession,
@@ -408,26 +804,20 @@ class LedgerService:
         otp: str = None,
         fraud_context: dict | None = None,
     ):
-        existing = await LedgerService._find_transaction_by_idempotency(
-            db, data.account_id, data.idempotency_key
+        return await LedgerService._run_idempotent(
+            db,
+            data.account_id,
+            data.idempotency_key,
+            lambda: LedgerService._create_transaction(db, data, otp, fraud_context),
         )
-        if existing:
-            existing.idempotency_hit = True
-            return existing
-
-        try:
-            idem_hit = await LedgerService.check_idempotency(str(data.account_id), data.idempotency_key)
-        except Exception:
-            idem_hit = False
-        if idem_hit:
-            existing = await LedgerService._find_transaction_by_idempotency(
-                db, data.account_id, data.idempotency_key
-            )
-            if existing:
-                existing.idempotency_hit = True
-                return existing
-            raise HTTPException(status_code=409, detail="Transacao em processamento")
 
+    @staticmethod
+    async def _create_transaction(
+        db: AsyncSession,
+        data: schemas.TransactionCreate,
+        otp: str = None,
+        fraud_context: dict | None = None,
+    ):
         amount_units = to_decimal(data.amount)
 
         if fraud_context:
@@ -444,18 +834,32 @@ class LedgerService:
             if result["action"] == "VERIFY" and not otp:
                 raise HTTPException(status_code=401, detail="FRAUD_VERIFICATION_REQUIRED")
 
+        policy = None
+        if data.type == "WITHDRAW":
+            policy = await LedgerService._load_outbound_policy(db, data.account_id, amount_units)
+
+        if settings.LEDGER_GROUP_COMMIT_ENABLED:
+            account = await LedgerService.get_account_by_id(db, data.account_id)
+            LedgerService._ensure_account_active(account)
+            await LedgerService._check_transaction_policy(db, account, data.type, amount_units, otp, policy)
+            tx = await LedgerService._submit_group_commit(db, {
+                "type": data.type,
+                "account_id": data.account_id,
+                "amount": amount_units,
+                "idempotency_key": data.idempotency_key,
+                "description": "Transacao",
+            })
+            if not getattr(tx, "idempotency_hit", False):
+                await LedgerService._after_commit(db, account.user_id, data.type, amount_units, [data.account_id])
+            return tx
+
         account = await LedgerService._get_account_for_update(db, data.account_id)
         LedgerService._ensure_account_active(account)
-        if data.type == "WITHDRAW":
-            await LedgerService._ensure_kyc_for_outbound(db, account.user_id, amount_units)
-            limits = await LedgerService._get_user_limits(db, account.user_id)
-            if amount_units > to_decimal(limits.withdrawal_limit or 0):
-                raise HTTPException(status_code=422, detail="Limite de saque excedido")
-        await LedgerService.validate_step_up_auth(db, data.account_id, amount_units, otp)
+        await LedgerService._check_transaction_policy(db, account, data.type, amount_units, otp, policy)
 
-        available = (
-            await LedgerService.get_balance(db, data.account_id, use_cache=False)
-        ) - to_decimal(account.blocked_balance or 0) + to_decimal(account.overdraft_limit or 0)
+        with stage("ledger.balance_sum"):
+            balance = await LedgerService.get_balance(db, data.account_id, use_cache=False)
+        available = balance - to_decimal(account.blocked_balance or 0) + to_decimal(account.overdraft_limit or 0)
         if data.type == "WITHDRAW":
             if available < amount_units:
                 raise HTTPException(status_code=422, detail="Saldo insuficiente")
@@ -473,9 +877,13 @@ class LedgerService:
         tx.prev_hash = prev_hash
         tx.record_hash = record_hash
         db.add(tx)
-        await db.flush()
+        with stage("ledger.flush"):
+            await db.flush()
 
-        sys_acc = await LedgerService._get_system_account(db, for_update=True)
+        with stage("ledger.lock_wait"):
+            sys_acc = await LedgerService._get_system_account(
+                db, for_update=True, stripe_key=f"{data.account_id}:{data.idempotency_key}"
+            )
         if data.type == "DEPOSIT":
             postings = [
                 models.Posting(transaction_id=tx.id, account_id=data.account_id, amount=amount_units),
@@ -497,7 +905,8 @@ class LedgerService:
         sys_acc.balance = to_decimal(sys_acc.balance or 0) + (-amount_units if data.type == "DEPOSIT" else amount_units)
 
         try:
-            await db.commit()
+            with stage("ledger.commit"):
+                await db.commit()
         except IntegrityError:
             await db.rollback()
             existing = await LedgerService._find_transaction_by_idempotency(
@@ -510,13 +919,7 @@ class LedgerService:
         except Exception:
             await db.rollback()
             raise
-        await cache.delete_key(f"balance:{data.account_id}")
-        if amount_units >= to_decimal(settings.AML_LARGE_TX_THRESHOLD):
-            from src.domain.regulatory.services import RegulatoryService
-            await RegulatoryService.create_aml_alert(
-                db, account.user_id, rule="LARGE_TX", details=f"amount={amount_units}"
-            )
-        TRANSACTION_COUNT.labels(operation_type=data.type).inc()
+        await LedgerService._after_commit(db, account.user_id, data.type, amount_units, [data.account_id])
         return tx
 
     @staticmethod
@@ -529,26 +932,20 @@ class LedgerService:
         if data.from_account_id == data.to_account_id:
             raise HTTPException(status_code=400, detail="Conta de origem e destino iguais")
 
-        existing = await LedgerService._find_transaction_by_idempotency(
-            db, data.from_account_id, data.idempotency_key
+        return await LedgerService._run_idempotent(
+            db,
+            data.from_account_id,
+            data.idempotency_key,
+            lambda: LedgerService._process_transfer(db, data, otp, fraud_context),
         )
-        if existing:
-            existing.idempotency_hit = True
-            return existing
-
-        try:
-            idem_hit = await LedgerService.check_idempotency(str(data.from_account_id), data.idempotency_key)
-        except Exception:
-            idem_hit = False
-        if idem_hit:
-            existing = await LedgerService._find_transaction_by_idempotency(
-                db, data.from_account_id, data.idempotency_key
-            )
-            if existing:
-                existing.idempotency_hit = True
-                return existing
-            raise HTTPException(status_code=409, detail="Transacao em processamento")
 
+    @staticmethod
+    async def _process_transfer(
+        db: AsyncSession,
+        data: schemas.TransferCreate,
+        otp: str = None,
+        fraud_context: dict | None = None,
+    ):
         amount_units = to_decimal(data.amount)
 
         if fraud_context:
@@ -565,6 +962,28 @@ class LedgerService:
             if result["action"] == "VERIFY" and not otp:
                 raise HTTPException(status_code=401, detail="FRAUD_VERIFICATION_REQUIRED")
 
+        policy = await LedgerService._load_outbound_policy(db, data.from_account_id, amount_units)
+
+        if settings.LEDGER_GROUP_COMMIT_ENABLED:
+            acc_from = await LedgerService.get_account_by_id(db, data.from_account_id)
+            acc_to = await LedgerService.get_account_by_id(db, data.to_account_id)
+            LedgerService._ensure_account_active(acc_from)
+            LedgerService._ensure_account_active(acc_to)
+            await LedgerService._check_transfer_policy(db, acc_from, amount_units, otp, policy)
+            tx = await LedgerService._submit_group_commit(db, {
+                "type": "TRANSFER",
+                "account_id": data.from_account_id,
+                "to_account_id": data.to_account_id,
+                "amount": amount_units,
+                "idempotency_key": data.idempotency_key,
+                "description": data.description,
+            })
+            if not getattr(tx, "idempotency_hit", False):
+                await LedgerService._after_commit(
+                    db, acc_from.user_id, "TRANSFER", amount_units, [data.from_account_id, data.to_account_id]
+                )
+            return tx
+
         accounts = await LedgerService._get_accounts_for_update(
             db, [data.from_account_id, data.to_account_id]
         )
@@ -572,15 +991,11 @@ class LedgerService:
         acc_to = accounts.get(data.to_account_id)
         LedgerService._ensure_account_active(acc_from)
         LedgerService._ensure_account_active(acc_to)
-        await LedgerService._ensure_kyc_for_outbound(db, acc_from.user_id, amount_units)
-        limits = await LedgerService._get_user_limits(db, acc_from.user_id)
-        if amount_units > to_decimal(limits.ted_limit or 0):
-            raise HTTPException(status_code=422, detail="Limite de transferencia excedido")
-        await LedgerService.validate_step_up_auth(db, data.from_account_id, amount_units, otp)
+        await LedgerService._check_transfer_policy(db, acc_from, amount_units, otp, policy)
 
-        available = (
-            await LedgerService.get_balance(db, data.from_account_id, use_cache=False)
-        ) - to_decimal(acc_from.blocked_balance or 0) + to_decimal(acc_from.overdraft_limit or 0)
+        with stage("ledger.balance_sum"):
+            balance = await LedgerService.get_balance(db, data.from_account_id, use_cache=False)
+        available = balance - to_decimal(acc_from.blocked_balance or 0) + to_decimal(acc_from.overdraft_limit or 0)
         if available < amount_units:
             raise HTTPException(status_code=422, detail="Saldo insuficiente")
 
@@ -597,7 +1012,8 @@ class LedgerService:
         tx.prev_hash = prev_hash
         tx.record_hash = record_hash
         db.add(tx)
-        await db.flush()
+        with stage("ledger.flush"):
+            await db.flush()
 
         postings = [
             models.Posting(transaction_id=tx.id, account_id=data.from_account_id, amount=-amount_units),
@@ -613,7 +1029,8 @@ class LedgerService:
             acc_to.balance = to_decimal(acc_to.balance or 0) + amount_units
 
         try:
-            await db.commit()
+            with stage("ledger.commit"):
+                await db.commit()
         except IntegrityError:
             await db.rollback()
             existing = await LedgerService._find_transaction_by_idempotency(
@@ -626,49 +1043,581 @@ class LedgerService:
         except Exception:
             await db.rollback()
             raise
-        await cache.delete_key(f"balance:{data.from_account_id}")
-        await cache.delete_key(f"balance:{data.to_account_id}")
-        if amount_units >= to_decimal(settings.AML_LARGE_TX_THRESHOLD):
-            from src.domain.regulatory.services import RegulatoryService
-            await RegulatoryService.create_aml_alert(
-                db, acc_from.user_id, rule="LARGE_TX", details=f"amount={amount_units}"
-            )
-        TRANSACTION_COUNT.labels(operation_type="TRANSFER").inc()
+        await LedgerService._after_commit(
+            db, acc_from.user_id, "TRANSFER", amount_units, [data.from_account_id, data.to_account_id]
+        )
         return tx
 
     @staticmethod
-    async def verify_integrity(db: AsyncSession) -> dict:
-        stmt_sum = select(
+    @timed("ledger.balance_sum")
+    async def _posting_balances(db: AsyncSession, accounts: dict[int, models.Account]) -> dict:
+        if not accounts:
+            return {}
+        snapshot = models.AccountBalanceSnapshot
+        stmt_snap = select(snapshot.account_id, snapshot.balance).where(snapshot.account_id.in_(list(accounts)))
+        res_snap = await db.execute(stmt_snap)
+        sums = {acc_id: to_decimal(balance or 0) for acc_id, balance in res_snap.all()}
+
+        stmt = (
+            select(
+                models.Posting.account_id,
+                func.coalesce(func.sum(models.Posting.amount), 0.0),
+            )
+            .outerjoin(snapshot, snapshot.account_id == models.Posting.account_id)
+            .where(
+                models.Posting.account_id.in_(list(accounts)),
+                models.Posting.id > func.coalesce(snapshot.last_posting_id, 0),
+            )
+            .group_by(models.Posting.account_id)
+        )
+        res = await db.execute(stmt)
+        for acc_id, total in res.all():
+            sums[acc_id] = sums.get(acc_id, to_decimal("0.00")) + to_decimal(total or 0)
+        balances = {}
+        for acc_id, acc in accounts.items():
+            bal = sums.get(acc_id, to_decimal("0.00"))
+            # Mesmo fallback de get_balance para contas com saldo legado sem postings
+            if bal == 0 and acc.balance and acc.balance > 0:
+                bal = to_decimal(acc.balance)
+            balances[acc_id] = bal
+        return balances
+
+    @staticmethod
+    async def _write_batch(db: AsyncSession, items: list[dict]) -> list:
+        """Grava varios lancamentos em uma unica transacao de banco.
+
+        Cada item e um dict com type (DEPOSIT, WITHDRAW, TRANSFER), account_id,
+        to_account_id (transferencias), amount, idempotency_key e description.
+        Devolve, na mesma ordem, a Transaction gravada ou a HTTPException do item.
+        """
+        results: list = [None] * len(items)
+
+        existing = {}
+        keys = list({item["idempotency_key"] for item in items})
+        for start in range(0, len(keys), 1000):
+            stmt = select(models.Transaction).where(models.Transaction.idempotency_key.in_(keys[start:start + 1000]))
+            res = await db.execute(stmt)
+            for tx in res.scalars().all():
+                existing[(tx.account_id, tx.idempotency_key)] = tx
+
+        account_ids = set()
+        stripes = {}
+        for idx, item in enumerate(items):
+            account_ids.add(item["account_id"])
+            if item["type"] == "TRANSFER":
+                account_ids.add(item["to_account_id"])
+            else:
+                stripes[idx] = LedgerService._system_stripe_for(f"{item['account_id']}:{item['idempotency_key']}")
+        sys_ids = {}
+        if stripes:
+            sys_ids = await LedgerService._resolve_system_accounts(db)
+            account_ids.update(sys_ids[stripe] for stripe in set(stripes.values()))
+        # Um unico lock por conta, sempre em ordem de id (evita deadlock entre lotes)
+        accounts = await LedgerService._get_accounts_for_update(db, sorted(account_ids))
+        if any(
+            sys_ids[stripe] not in accounts
+            or accounts[sys_ids[stripe]].account_number != LedgerService._system_account_number(stripe)
+            for stripe in set(stripes.values())
+        ):
+            LedgerService._system_account_ids.clear()
+            sys_ids = await LedgerService._resolve_system_accounts(db)
+            accounts.update(await LedgerService._get_accounts_for_update(
+                db, sorted({sys_ids[stripe] for stripe in set(stripes.values())})
+            ))
+        balances = await LedgerService._posting_balances(db, accounts)
+
+        pending = []
+        seen = set()
+        now = datetime.utcnow()
+        for idx, item in enumerate(items):
+            key = (item["account_id"], item["idempotency_key"])
+            if key in existing:
+                tx = existing[key]
+                tx.idempotency_hit = True
+                results[idx] = tx
+                continue
+            if key in seen:
+                results[idx] = HTTPException(status_code=409, detail="Transacao em processamento")
+                continue
+            amount_units = to_decimal(item["amount"])
+            try:
+                acc = accounts.get(item["account_id"])
+                LedgerService._ensure_account_active(acc)
+                if item["type"] == "TRANSFER":
+                    counterparty = accounts.get(item["to_account_id"])
+                    LedgerService._ensure_account_active(counterparty)
+                else:
+                    counterparty = accounts[sys_ids[stripes[idx]]]
+                if item["type"] != "DEPOSIT":
+                    available = (
+                        balances[acc.id]
+                        - to_decimal(acc.blocked_balance or 0)
+                        + to_decimal(acc.overdraft_limit or 0)
+                    )
+                    if available < amount_units:
+                        raise HTTPException(status_code=422, detail="Saldo insuficiente")
+            except HTTPException as exc:
+                results[idx] = exc
+                continue
+
+            delta = amount_units if item["type"] == "DEPOSIT" else -amount_units
+            balances[acc.id] = balances[acc.id] + delta
+            balances[counterparty.id] = balances[counterparty.id] - delta
+            tx = models.Transaction(
+                idempotency_key=item["idempotency_key"],
+                amount=amount_units,
+                description=item.get("description"),
+                operation_type=item["type"],
+                account_id=item["account_id"],
+                timestamp=now,
+            )
+            tx.chain_shard = LedgerService._chain_shard_for(tx.account_id)
+            pending.append((idx, tx, acc, counterparty, delta))
+            seen.add(key)
+
+        if not pending:
+            return results
+
+        by_shard: dict[int, list] = {}
+        for entry in pending:
+            by_shard.setdefault(entry[1].chain_shard, []).append(entry[1])
+        for shard in sorted(by_shard):
+            txs = by_shard[shard]
+            sequence, prev_hash = await LedgerService._allocate_sequences(db, shard, len(txs))
+            for tx in txs:
+                tx.sequence = sequence
+                tx.prev_hash = prev_hash
+                tx.record_hash = LedgerService._tx_record_hash(tx, sequence, prev_hash)
+                prev_hash = tx.record_hash
+                sequence += 1
+
+        db.add_all([entry[1] for entry in pending])
+        with stage("ledger.flush"):
+            await db.flush()
+
+        postings = []
+        for idx, tx, acc, counterparty, delta in pending:
+            pair = [
+                models.Posting(transaction_id=tx.id, account_id=acc.id, amount=delta),
+                models.Posting(transaction_id=tx.id, account_id=counterparty.id, amount=-delta),
+            ]
+            LedgerService._ensure_double_entry(pair)
+            postings.extend(pair)
+            acc.balance = to_decimal(acc.balance or 0) + delta
+            counterparty.balance = to_decimal(counterparty.balance or 0) - delta
+            results[idx] = tx
+        db.add_all(postings)
+
+        try:
+            with stage("ledger.commit"):
+                await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+        return results
+
+    @staticmethod
+    async def _check_batch_item(
+        db: AsyncSession, account: models.Account, item: dict, otp: str = None, fraud_context: dict | None = None
+    ) -> None:
+        """Controles de um item de lote de cliente, na mesma ordem de _create_transaction/_process_transfer."""
+        amount_units = item["amount"]
+        if fraud_context:
+            from src.domain.fraud.engine import FraudEngine
+            result = await FraudEngine.evaluate(
+                db,
+                account_id=account.id,
+                amount_units=amount_units,
+                ip=fraud_context.get("ip", ""),
+                user_agent=fraud_context.get("user_agent", ""),
+                device_fingerprint=fraud_context.get("device_fingerprint"),
+                transaction_id=None,
+            )
+            if result["action"] == "VERIFY" and not otp:
+                raise HTTPException(status_code=401, detail="FRAUD_VERIFICATION_REQUIRED")
+
+        if item["type"] == "DEPOSIT":
+            await LedgerService._check_transaction_policy(db, account, item["type"], amount_units, otp)
+            return
+        policy = await LedgerService._load_outbound_policy(db, account.id, amount_units)
+        if item["type"] == "TRANSFER":
+            await LedgerService._check_transfer_policy(db, account, amount_units, otp, policy)
+        else:
+            await LedgerService._check_transaction_policy(db, account, item["type"], amount_units, otp, policy)
+
+    @staticmethod
+    async def ingest_batch(
+        db: AsyncSession,
+        items: list[schemas.LedgerBatchItem],
+        owner_user_id: int | None = None,
+        otp: str = None,
+        fraud_context: dict | None = None,
+    ) -> dict:
+        """Ingestao em lote: um lock por conta, sequencias em bloco e um unico commit.
+
+        Com `owner_user_id` (lote enviado por um cliente), apenas contas desse usuario podem
+        ser debitadas/creditadas diretamente (itens de outras contas voltam com 403) e cada
+        item passa pelos mesmos controles de /transactions e /transfers: fraude, KYC,
+        limites e OTP de step-up. Sem `owner_user_id` o lote vem de fontes internas
+        (folha, liquidacao, juros) e esses controles nao se aplicam.
+        """
+        payload = [
+            {
+                "type": item.type,
+                "account_id": item.account_id,
+                "to_account_id": item.to_account_id,
+                "amount": to_decimal(item.amount),
+                "idempotency_key": item.idempotency_key,
+                "description": item.description or ("Transferencia" if item.type == "TRANSFER" else "Transacao"),
+            }
+            for item in items
+        ]
+        results: list = [None] * len(payload)
+        if owner_user_id is not None:
+            stmt = select(models.Account).where(
+                models.Account.id.in_({item["account_id"] for item in payload}),
+                models.Account.user_id == owner_user_id,
+            )
+            res = await db.execute(stmt)
+            owned = {acc.id: acc for acc in res.scalars().all()}
+            for idx, item in enumerate(payload):
+                if item["account_id"] not in owned:
+                    results[idx] = HTTPException(status_code=403, detail="Acesso negado")
+                    continue
+                try:
+                    await LedgerService._check_batch_item(db, owned[item["account_id"]], item, otp, fraud_context)
+                except HTTPException as exc:
+                    results[idx] = exc
+
+        todo = [idx for idx, result in enumerate(results) if result is None]
+        if todo:
+            try:
+                written = await LedgerService._write_batch(db, [payload[idx] for idx in todo])
+            except IntegrityError:
+                # Outro lote gravou alguma das chaves no meio do caminho: a nova tentativa as ve como duplicadas
+                written = await LedgerService._write_batch(db, [payload[idx] for idx in todo])
+            for idx, result in zip(todo, written):
+                results[idx] = result
+
+        created = [
+            (payload[idx], result) for idx, result in enumerate(results)
+            if isinstance(result, models.Transaction) and not getattr(result, "idempotency_hit", False)
+        ]
+        if created:
+            touched = set()
+            large = []
+            for item, tx in created:
+                touched.add(item["account_id"])
+                if item["type"] == "TRANSFER":
+                    touched.add(item["to_account_id"])
+                if item["amount"] >= to_decimal(settings.AML_LARGE_TX_THRESHOLD):
+                    large.append(item)
+                TRANSACTION_COUNT.labels(operation_type=item["type"]).inc()
+            for account_id in touched:
+                await cache.delete_key(f"balance:{account_id}")
+            await feature_store.record_many([
+                (
+                    item["account_id"],
+                    item["amount"],
+                    tx.timestamp,
+                    item["to_account_id"] if item["type"] == "TRANSFER" else None,
+                )
+                for item, tx in created
+            ])
+            await transfer_graph.record_many([
+                (item["account_id"], item["to_account_id"], tx.timestamp)
+                for item, tx in created
+                if item["type"] == "TRANSFER"
+            ])
+            if large:
+                from src.domain.regulatory.services import RegulatoryService
+                stmt_users = select(models.Account.id, models.Account.user_id).where(
+                    models.Account.id.in_({item["account_id"] for item in large})
+                )
+                res_users = await db.execute(stmt_users)
+                users = dict(res_users.all())
+                for item in large:
+                    await RegulatoryService.create_aml_alert(
+                        db, users.get(item["account_id"]), rule="LARGE_TX", details=f"amount={item['amount']}"
+                    )
+
+        summary = {"created": 0, "duplicates": 0, "failed": 0, "results": []}
+        for idx, result in enumerate(results):
+            if isinstance(result, HTTPException):
+                summary["failed"] += 1
+                summary["results"].append({
+                    "index": idx, "status": "ERROR", "status_code": result.status_code, "detail": result.detail,
+                })
+            elif getattr(result, "idempotency_hit", False):
+                summary["duplicates"] += 1
+                summary["results"].append({
+                    "index": idx, "status": "DUPLICATE", "transaction_id": result.id, "status_code": 200,
+                })
+            else:
+                summary["created"] += 1
+                summary["results"].append({
+                    "index": idx, "status": "CREATED", "transaction_id": result.id, "status_code": 201,
+                })
+        return summary
+
+    @staticmethod
+    async def _posting_stats(db: AsyncSession, tx_ids: list[int] | None = None) -> dict[int, tuple]:
+        """Agregados de postings por transacao: (quantidade, soma, soma absoluta, soma de account_id)."""
+        stmt = select(
             models.Posting.transaction_id,
+            func.count(models.Posting.id),
             func.coalesce(func.sum(models.Posting.amount), 0.0),
+            func.coalesce(func.sum(func.abs(models.Posting.amount)), 0.0),
+            func.coalesce(func.sum(models.Posting.account_id), 0),
         ).group_by(models.Posting.transaction_id)
-        res_sum = await db.execute(stmt_sum)
-        posting_sums = {tx_id: to_decimal(total) for tx_id, total in res_sum.all()}
-        stmt = select(models.Transaction).order_by(models.Transaction.sequence.asc())
-        res = await db.execute(stmt)
-        txs = res.scalars().all()
-        prev_hash = ""
+        stats = {}
+        chunks = [None] if tx_ids is None else [tx_ids[i:i + 1000] for i in range(0, len(tx_ids), 1000)]
+        for chunk in chunks:
+            stmt_chunk = stmt if chunk is None else stmt.where(models.Posting.transaction_id.in_(chunk))
+            res = await db.execute(stmt_chunk)
+            for tx_id, count, total, volume, acc_sum in res.all():
+                stats[tx_id] = (int(count), to_decimal(total), to_decimal(volume), int(acc_sum or 0))
+        return stats
+
+    @staticmethod
+    def _posting_digest(prev_digest: str, tx: models.Transaction, stats: tuple) -> str:
+        count, total, volume, acc_sum = stats
+        raw = "|".join([prev_digest or "", tx.record_hash or "", str(count), str(total), str(volume), str(acc_sum)])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _verify_chain(
+        txs: list[models.Transaction],
+        stats: dict[int, tuple],
+        heads: dict[str, list],
+        expected_digests: dict | None = None,
+    ) -> dict | None:
+        """Valida txs (ordenadas por shard/sequence) a partir de `heads` e avanca `heads` no lugar.
+
+        `heads` mapeia shard -> [sequence, record_hash, posting_digest]. Devolve o dict de
+        falha na primeira inconsistencia ou None.
+        """
+        empty = (0, to_decimal("0.00"), to_decimal("0.00"), 0)
         for tx in txs:
-            if posting_sums.get(tx.id, to_decimal("0.00")) != to_decimal("0.00"):
-                return {"ok": False, "tx_id": tx.id, "reason": "POSTINGS_IMBALANCE"}
-            raw = "|".join([
-                str(tx.sequence),
-                str(tx.account_id),
-                str(tx.amount),
-                tx.operation_type,
-                tx.description or "",
-                tx.timestamp.isoformat(),
-                prev_hash or "",
-            ])
-            expected = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+            shard = str(tx.chain_shard)
+            _, prev_hash, prev_digest = heads.get(shard, [0, "", ""])
+            tx_stats = stats.get(tx.id, empty)
+            if tx_stats[1] != to_decimal("0.00"):
+                return {"ok": False, "tx_id": tx.id, "shard": tx.chain_shard, "reason": "POSTINGS_IMBALANCE"}
+            expected = LedgerService._tx_record_hash(tx, tx.sequence, prev_hash)
             if tx.record_hash != expected or tx.prev_hash != prev_hash:
-                return {"ok": False, "tx_id": tx.id, "reason": "HASH_MISMATCH"}
-            prev_hash = tx.record_hash
-        return {"ok": True, "count": len(txs)}
+                return {"ok": False, "tx_id": tx.id, "shard": tx.chain_shard, "reason": "HASH_MISMATCH"}
+            digest = LedgerService._posting_digest(prev_digest, tx, tx_stats)
+            checkpoint_digest = (expected_digests or {}).get((shard, tx.sequence))
+            if checkpoint_digest is not None and checkpoint_digest != digest:
+                return {"ok": False, "tx_id": tx.id, "shard": tx.chain_shard, "reason": "POSTINGS_DIGEST_MISMATCH"}
+            heads[shard] = [tx.sequence, tx.record_hash, digest]
+        return None
 
     @staticmethod
-    async def get_statement(
+    async def _verify_anchors(
         db: AsyncSession,
+        anchors: list[models.LedgerChainAnchor],
+        prev_anchor: str,
+        chain_index: dict,
+    ) -> dict | None:
+        for anchor in anchors:
+            expected = LedgerService._anchor_hash(anchor.shard_heads, prev_anchor)
+            if anchor.anchor_hash != expected or (anchor.prev_hash or "") != prev_anchor:
+                return {"ok": False, "anchor_id": anchor.id, "reason": "ANCHOR_MISMATCH"}
+            for shard, (seq, record_hash) in json.loads(anchor.shard_heads).items():
+                key = (shard, seq)
+                if key not in chain_index:
+                    stmt = select(models.Transaction.record_hash).where(
+                        models.Transaction.chain_shard == int(shard),
+                        models.Transaction.sequence == seq,
+                    )
+                    res = await db.execute(stmt)
+                    chain_index[key] = res.scalar_one_or_none()
+                if chain_index[key] != record_hash:
+                    return {"ok": False, "anchor_id": anchor.id, "shard": int(shard), "reason": "ANCHOR_HEAD_MISMATCH"}
+            prev_anchor = anchor.anchor_hash
+        return None
+
+    @staticmethod
+    async def verify_integrity(db: AsyncSession, expected_digests: dict | None = None) -> dict:
+        stats = await LedgerService._posting_stats(db)
+        stmt = select(models.Transaction).order_by(
+            models.Transaction.chain_shard.asc(),
+            models.Transaction.sequence.asc(),
+        )
+        res = await db.execute(stmt)
+        txs = res.scalars().all()
+        # Cada shard e uma cadeia independente: o prev_hash reinicia em cada shard
+        heads: dict[str, list] = {}
+        failure = LedgerService._verify_chain(txs, stats, heads, expected_digests)
+        if failure:
+            return failure
+        chain_index = {(str(tx.chain_shard), tx.sequence): tx.record_hash for tx in txs}
+
+        stmt_anchor = select(models.LedgerChainAnchor).order_by(models.LedgerChainAnchor.id.asc())
+        res_anchor = await db.execute(stmt_anchor)
+        anchors = res_anchor.scalars().all()
+        failure = await LedgerService._verify_anchors(db, anchors, "", chain_index)
+        if failure:
+            return failure
+
+        return {
+            "ok": True,
+            "count": len(txs),
+            "shards": len(heads),
+            "anchors": len(anchors),
+            "heads": heads,
+            "anchor_id": anchors[-1].id if anchors else None,
+            "anchor_hash": anchors[-1].anchor_hash if anchors else None,
+        }
+
+    @staticmethod
+    async def get_latest_integrity_checkpoint(
+        db: AsyncSession, ok_only: bool = False
+    ) -> models.LedgerIntegrityCheckpoint | None:
+        stmt = select(models.LedgerIntegrityCheckpoint)
+        if ok_only:
+            stmt = stmt.where(models.LedgerIntegrityCheckpoint.ok.is_(True))
+        stmt = stmt.order_by(models.LedgerIntegrityCheckpoint.id.desc()).limit(1)
+        res = await db.execute(stmt)
+        return res.scalar_one_or_none()
+
+    @staticmethod
+    def _checkpoint_digests(checkpoint: models.LedgerIntegrityCheckpoint | None) -> dict:
+        if checkpoint is None:
+            return {}
+        heads = json.loads(checkpoint.chain_heads)
+        return {(shard, seq): digest for shard, (seq, _, digest) in heads.items()}
+
+    @staticmethod
+    async def verify_integrity_full(db: AsyncSession, workers: int | None = None) -> dict:
+        """Re-verificacao completa pelo scanner (cursor no servidor, um processo por shard).
+
+        Confere tambem o digest de postings do ultimo checkpoint e devolve as cabecas para o proximo.
+        `workers=0` varre no proprio processo, sem pool.
+        """
+        from src.domain.ledger.scanner import scan_ledger
+        checkpoint = await LedgerService.get_latest_integrity_checkpoint(db, ok_only=True)
+        expected = LedgerService._checkpoint_digests(checkpoint)
+        result = await asyncio.to_thread(scan_ledger, workers=workers, expected_digests=expected)
+        result["mode"] = "FULL"
+        if result.get("ok"):
+            result["verified"] = result["count"]
+        return result
+
+    @staticmethod
+    async def verify_integrity_incremental(db: AsyncSession) -> dict:
+        """Verifica apenas a cauda da cadeia apos o ultimo checkpoint valido."""
+        checkpoint = await LedgerService.get_latest_integrity_checkpoint(db, ok_only=True)
+        if checkpoint is None:
+            # Primeiro checkpoint: roda na API (loop de startup, /ledger/integrity), entao varre
+            # no proprio processo; o pool de processos fica com a task semanal e o script
+            return await LedgerService.verify_integrity_full(db, workers=0)
+
+        heads = json.loads(checkpoint.chain_heads)
+        known_shards = [int(shard) for shard in heads]
+        conditions = [
+            and_(models.Transaction.chain_shard == int(shard), models.Transaction.sequence > seq)
+            for shard, (seq, _, _) in heads.items()
+        ]
+        if known_shards:
+            conditions.append(models.Transaction.chain_shard.notin_(known_shards))
+        stmt = select(models.Transaction)
+        if conditions:
+            stmt = stmt.where(or_(*conditions))
+        stmt = stmt.order_by(models.Transaction.chain_shard.asc(), models.Transaction.sequence.asc())
+        res = await db.execute(stmt)
+        tail = res.scalars().all()
+
+        stats = await LedgerService._posting_stats(db, [tx.id for tx in tail]) if tail else {}
+        failure = LedgerService._verify_chain(tail, stats, heads)
+        if failure:
+            failure["mode"] = "INCREMENTAL"
+            return failure
+
+        chain_index = {(shard, seq): record_hash for shard, (seq, record_hash, _) in heads.items()}
+        chain_index.update({(str(tx.chain_shard), tx.sequence): tx.record_hash for tx in tail})
+        stmt_anchor = select(models.LedgerChainAnchor).order_by(models.LedgerChainAnchor.id.asc())
+        if checkpoint.anchor_id is not None:
+            stmt_anchor = stmt_anchor.where(models.LedgerChainAnchor.id > checkpoint.anchor_id)
+        res_anchor = await db.execute(stmt_anchor)
+        anchors = res_anchor.scalars().all()
+        failure = await LedgerService._verify_anchors(db, anchors, checkpoint.anchor_hash or "", chain_index)
+        if failure:
+            failure["mode"] = "INCREMENTAL"
+            return failure
+
+        return {
+            "ok": True,
+            "mode": "INCREMENTAL",
+            "count": (checkpoint.total_count or 0) + len(tail),
+            "verified": len(tail),
+            "shards": len(heads),
+            "anchors": len(anchors),
+            "heads": heads,
+            "anchor_id": anchors[-1].id if anchors else checkpoint.anchor_id,
+            "anchor_hash": anchors[-1].anchor_hash if anchors else checkpoint.anchor_hash,
+        }
+
+    @staticmethod
+    async def save_integrity_checkpoint(
+        db: AsyncSession, result: dict, duration_ms: int = 0
+    ) -> models.LedgerIntegrityCheckpoint:
+        ok = bool(result.get("ok"))
+        previous = None if ok else await LedgerService.get_latest_integrity_checkpoint(db, ok_only=True)
+        # Em falha mantem as cabecas do ultimo checkpoint valido: a proxima execucao re-verifica a mesma cauda
+        if ok:
+            heads = result.get("heads") or {}
+            anchor_id, anchor_hash = result.get("anchor_id"), result.get("anchor_hash")
+            total = result.get("count", 0)
+        elif previous is not None:
+            heads = json.loads(previous.chain_heads)
+            anchor_id, anchor_hash, total = previous.anchor_id, previous.anchor_hash, previous.total_count
+        else:
+            heads, anchor_id, anchor_hash, total = {}, None, None, 0
+        checkpoint = models.LedgerIntegrityCheckpoint(
+            mode=result.get("mode", "FULL"),
+            ok=ok,
+            reason=result.get("reason"),
+            tx_id=result.get("tx_id"),
+            shard=result.get("shard"),
+            chain_heads=json.dumps(heads, sort_keys=True),
+            anchor_id=anchor_id,
+            anchor_hash=anchor_hash,
+            verified_count=result.get("verified", 0),
+            total_count=total,
+            duration_ms=duration_ms,
+        )
+        db.add(checkpoint)
+        await db.commit()
+        await db.refresh(checkpoint)
+        return checkpoint
+
+    @staticmethod
+    def integrity_checkpoint_to_dict(checkpoint: models.LedgerIntegrityCheckpoint) -> dict:
+        return {
+            "ok": checkpoint.ok,
+            "mode": checkpoint.mode,
+            "reason": checkpoint.reason,
+            "tx_id": checkpoint.tx_id,
+            "shard": checkpoint.shard,
+            "count": checkpoint.total_count,
+            "verified": checkpoint.verified_count,
+            "anchor_id": checkpoint.anchor_id,
+            "duration_ms": checkpoint.duration_ms,
+            "checked_at": checkpoint.created_at.isoformat() if checkpoint.created_at else None,
+        }
+
+    @staticmethod
+    def _parse_statement_date(value: str) -> datetime:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Data invalida, use o formato ISO 8601")
+
+    @staticmethod
+    def _statement_query(
         account_id: int,
         start_date: str | None = None,
         end_date: str | None = None,
@@ -676,13 +1625,12 @@ class LedgerService:
         min_amount: float | None = None,
         max_amount: float | None = None,
         search: str | None = None,
-    ) -> dict:
-        balance = await LedgerService.get_balance(db, account_id)
+    ):
         stmt = select(models.Transaction).where(models.Transaction.account_id == account_id)
         if start_date:
-            stmt = stmt.where(models.Transaction.timestamp >= datetime.fromisoformat(start_date))
+            stmt = stmt.where(models.Transaction.timestamp >= LedgerService._parse_statement_date(start_date))
         if end_date:
-            stmt = stmt.where(models.Transaction.timestamp <= datetime.fromisoformat(end_date))
+            stmt = stmt.where(models.Transaction.timestamp <= LedgerService._parse_statement_date(end_date))
         if tx_type:
             stmt = stmt.where(models.Transaction.operation_type == tx_type)
         if min_amount is not None:
@@ -691,20 +1639,105 @@ class LedgerService:
             stmt = stmt.where(models.Transaction.amount <= to_decimal(max_amount))
         if search:
             stmt = stmt.where(models.Transaction.description.ilike(f"%{search}%"))
+        # Ordem total e estavel: (timestamp, id) decrescente, coberta por ix_transactions_account_ts_id
+        return stmt.order_by(models.Transaction.timestamp.desc(), models.Transaction.id.desc())
 
-        stmt = stmt.order_by(models.Transaction.timestamp.desc()).limit(50)
-        result = await db.execute(stmt)
+    @staticmethod
+    def _encode_statement_cursor(tx: models.Transaction) -> str:
+        raw = f"{tx.timestamp.isoformat()}|{tx.id}"
+        return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_statement_cursor(cursor: str) -> tuple[datetime, int]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+            timestamp, tx_id = raw.rsplit("|", 1)
+            return datetime.fromisoformat(timestamp), int(tx_id)
+        except Exception:
+            raise HTTPException(status_code=400, detail="Cursor invalido")
+
+    @staticmethod
+    async def get_statement(
+        db: AsyncSession,
+        account_id: int,
+        start_date: str | None = None,
+        end_date: str | None = None,
+        tx_type: str | None = None,
+        min_amount: float | None = None,
+        max_amount: float | None = None,
+        search: str | None = None,
+        limit: int | None = None,
+        cursor: str | None = None,
+    ) -> dict:
+        """Extrato paginado por keyset: `next_cursor` aponta para a pagina seguinte (mais antiga)."""
+        limit = max(1, min(limit or settings.LEDGER_STATEMENT_PAGE_SIZE, settings.LEDGER_STATEMENT_MAX_PAGE_SIZE))
+        balance = await LedgerService.get_balance(db, account_id)
+        stmt = LedgerService._statement_query(
+            account_id, start_date, end_date, tx_type, min_amount, max_amount, search
+        )
+        if cursor:
+            cursor_ts, cursor_id = LedgerService._decode_statement_cursor(cursor)
+            stmt = stmt.where(
+                or_(
+                    models.Transaction.timestamp < cursor_ts,
+                    and_(models.Transaction.timestamp == cursor_ts, models.Transaction.id < cursor_id),
+                )
+            )
+
+        result = await db.execute(stmt.limit(limit + 1))
+        txs = result.scalars().all()
+        next_cursor = LedgerService._encode_statement_cursor(txs[limit - 1]) if len(txs) > limit else None
 
         history = []
-        for tx in result.scalars().all():
+        for tx in txs[:limit]:
             history.append({
+                "id": tx.id,
                 "date": str(tx.timestamp),
                 "amount": tx.amount,
                 "type": tx.operation_type,
                 "description": tx.description,
             })
 
-        return {"account_id": account_id, "balance_current": balance, "transactions": history}
+        return {
+            "account_id": account_id,
+            "balance_current": balance,
+            "transactions": history,
+            "next_cursor": next_cursor,
+        }
+
+    @staticmethod
+    def stream_statement_csv(account_id: int, chunk_size: int | None = None, **filters):
+        """Gera o extrato completo em CSV, em pedacos, lendo por cursor no servidor.
+
+        Os filtros sao validados aqui, antes de devolver o gerador: uma data invalida vira
+        400 na rota, e nao um 200 com o cabecalho ja enviado e o corpo cortado.
+        """
+        chunk_size = chunk_size or settings.LEDGER_EXPORT_CHUNK_SIZE
+        stmt = LedgerService._statement_query(account_id, **filters)
+        stmt = stmt.with_only_columns(
+            models.Transaction.timestamp,
+            models.Transaction.amount,
+            models.Transaction.operation_type,
+            models.Transaction.description,
+        ).execution_options(yield_per=chunk_size)
+        return LedgerService._statement_csv_chunks(stmt)
+
+    @staticmethod
+    async def _statement_csv_chunks(stmt):
+        # Abre a propria sessao: o gerador roda depois que a sessao da requisicao ja foi fechada
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        writer.writerow(["date", "amount", "type", "description"])
+        yield buffer.getvalue()
+
+        async with async_session() as db:
+            result = await db.stream(stmt)
+            async for rows in result.partitions():
+                buffer.seek(0)
+                buffer.truncate()
+                for timestamp, amount, operation_type, description in rows:
+                    writer.writerow([timestamp, amount, operation_type, description])
+                yield buffer.getvalue()
 
     # --- PIX ---
     @staticmethod
@@ -763,3 +1796,9 @@ class LedgerService:
         )
 
         return await LedgerService.process_transfer(db, internal_transfer_data, otp)
+
+
+policy_cache.watch(settings_models.LimitConfig, "limits", "user_id")
+policy_cache.watch(regulatory_models.KycProfile, "kyc", "user_id")
+auth_cache.watch(models.Account, "account", "id", ("status", "user_id"))
+auth_cache.watch(models.User, "user", "id", ("mfa_enabled", "is_anonymized"))
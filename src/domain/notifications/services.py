@@ -9,7 +9,10 @@ from src.domain.notifications import models, schemas
 
 class NotificationService:
     @staticmethod
-    async def send(db: AsyncSession, user_id: int, data: schemas.NotificationCreate) -> models.Notification:
+    async def send(
+        db: AsyncSession, user_id: int, data: schemas.NotificationCreate, commit: bool = True
+    ) -> models.Notification:
+        """Envia e registra a notificacao; `commit=False` deixa a linha na transacao de quem chamou."""
         prefs = await settings_services.SettingsService.get_or_create_notifications(db, user_id)
         channel = data.channel.upper()
         if channel == "EMAIL" and not prefs.email_enabled:
@@ -17,28 +20,32 @@ class NotificationService:
                 user_id=user_id, channel=channel, subject=data.subject, message=data.message, status="SKIPPED"
             )
             db.add(notif)
-            await db.commit()
+            if commit:
+                await db.commit()
             return notif
         if channel == "SMS" and not prefs.sms_enabled:
             notif = models.Notification(
                 user_id=user_id, channel=channel, subject=data.subject, message=data.message, status="SKIPPED"
             )
             db.add(notif)
-            await db.commit()
+            if commit:
+                await db.commit()
             return notif
         if channel == "PUSH" and not prefs.push_enabled:
             notif = models.Notification(
                 user_id=user_id, channel=channel, subject=data.subject, message=data.message, status="SKIPPED"
             )
             db.add(notif)
-            await db.commit()
+            if commit:
+                await db.commit()
             return notif
         if channel == "WHATSAPP" and not prefs.whatsapp_enabled:
             notif = models.Notification(
                 user_id=user_id, channel=channel, subject=data.subject, message=data.message, status="SKIPPED"
             )
             db.add(notif)
-            await db.commit()
+            if commit:
+                await db.commit()
             return notif
 
         status = "SENT"
@@ -73,7 +80,8 @@ class NotificationService:
             status=status,
         )
         db.add(notif)
-        await db.commit()
+        if commit:
+            await db.commit()
         return notif
 
     @staticmethod
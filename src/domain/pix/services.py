@@ -8,6 +8,7 @@ from sqlalchemy import select
 
 from src.domain.pix import models, schemas
 from src.infra.cache import cache
+from src.infra.policy_cache import MISSING, policy_cache, snapshot
 import qrcode
 from src.domain.ledger import services as ledger_services
 from src.domain.ledger import schemas as ledger_schemas
@@ -28,15 +29,17 @@ class PixService:
         img.save(buf, format="PNG")
         return base64.b64encode(buf.getvalue()).decode("ascii")
 
+    @staticmethod
+    async def _cached_limits(db: AsyncSession, account_id: int):
+        limit = policy_cache.get("pix_limit", account_id)
+        if limit is MISSING:
+            limit = snapshot(await PixService.get_limits(db, account_id))
+            policy_cache.put("pix_limit", account_id, limit)
+        return limit
+
     @staticmethod
     async def _enforce_limits(db: AsyncSession, account_id: int, amount: float):
-        stmt = select(models.PixLimit).where(models.PixLimit.account_id == account_id)
-        res = await db.execute(stmt)
-        limit = res.scalar_one_or_none()
-        if not limit:
-            limit = models.PixLimit(account_id=account_id)
-            db.add(limit)
-            await db.commit()
+        limit = await PixService._cached_limits(db, account_id)
 
         amount_value = to_decimal(amount)
         if amount_value > to_decimal(limit.per_tx_limit):
@@ -141,6 +144,7 @@ class PixService:
         limit.monthly_limit = data.monthly_limit
         limit.updated_at = datetime.utcnow()
         await db.commit()
+        await policy_cache.invalidate("pix_limit", account_id)
         return limit
 
     @staticmethod
@@ -161,3 +165,6 @@ class PixService:
         stmt = select(models.PixSchedule).where(models.PixSchedule.from_account_id == account_id)
         res = await db.execute(stmt)
         return res.scalars().all()
+
+
+policy_cache.watch(models.PixLimit, "pix_limit", "account_id")
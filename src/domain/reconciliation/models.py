@@ -24,4 +24,5 @@ class ReconciliationDiscrepancy(Base):
     expected_balance = Column(Money, nullable=False)
     actual_balance = Column(Money, nullable=False)
     delta = Column(Money, nullable=False)
+    source = Column(String, default="ACCOUNT_BALANCE")  # ACCOUNT_BALANCE, BALANCE_SNAPSHOT
     created_at = Column(DateTime, default=datetime.utcnow)
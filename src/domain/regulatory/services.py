@@ -4,6 +4,7 @@ from sqlalchemy import select, func
 
 from src.domain.regulatory import models, schemas
 from src.domain.ledger import models as ledger_models
+from src.infra.policy_cache import policy_cache
 
 
 class RegulatoryService:
@@ -16,6 +17,7 @@ class RegulatoryService:
             existing.document_id = data.document_id
             existing.status = "PENDING"
             await db.commit()
+            await policy_cache.invalidate("kyc", user_id)
             return existing
 
         status = "VERIFIED" if data.document_id and len(data.document_id) >= 6 else "PENDING"
@@ -27,6 +29,7 @@ class RegulatoryService:
         )
         db.add(profile)
         await db.commit()
+        await policy_cache.invalidate("kyc", user_id)
         return profile
 
     @staticmethod
@@ -36,14 +39,15 @@ class RegulatoryService:
         return res.scalars().all()
 
     @staticmethod
-    async def create_aml_alert(db: AsyncSession, user_id: int, rule: str, details: str):
+    async def create_aml_alert(db: AsyncSession, user_id: int, rule: str, details: str, commit: bool = True):
         alert = models.AmlAlert(
             user_id=user_id,
             rule=rule,
             details=details,
         )
         db.add(alert)
-        await db.commit()
+        if commit:
+            await db.commit()
         return alert
 
     @staticmethod
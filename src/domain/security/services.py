@@ -8,6 +8,7 @@ from sqlalchemy import select
 from src.domain.ledger import models as ledger_models
 from src.domain.security import models
 from src.core import security as core_security
+from src.infra.auth_cache import auth_cache
 
 
 class SecurityService:
@@ -92,14 +93,17 @@ class SecurityService:
         await db.commit()
 
     @staticmethod
-    async def create_alert(db: AsyncSession, user_id: int, alert_type: str, details: str | None = None) -> None:
+    async def create_alert(
+        db: AsyncSession, user_id: int, alert_type: str, details: str | None = None, commit: bool = True
+    ) -> None:
         alert = models.SecurityAlert(
             user_id=user_id,
             alert_type=alert_type,
             details=details,
         )
         db.add(alert)
-        await db.commit()
+        if commit:
+            await db.commit()
 
     @staticmethod
     async def request_password_reset(db: AsyncSession, email: str) -> str:
@@ -181,3 +185,6 @@ class SecurityService:
     def compute_device_fingerprint(user_agent: str, accept_language: str, client_ip: str) -> str:
         raw = f"{user_agent}|{accept_language}|{client_ip}"
         return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+auth_cache.watch(models.Session, "jti", "jti", ("revoked",))
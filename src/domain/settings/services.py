@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from src.domain.settings import models, schemas
+from src.infra.policy_cache import policy_cache
 
 
 class SettingsService:
@@ -69,6 +70,7 @@ class SettingsService:
         cfg.withdrawal_limit = data.withdrawal_limit
         cfg.updated_at = datetime.utcnow()
         await db.commit()
+        await policy_cache.invalidate("limits", user_id)
         return cfg
 
     @staticmethod
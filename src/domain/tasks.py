@@ -13,12 +13,14 @@ from src.domain.pix import models as pix_models, schemas as pix_schemas
 from src.domain.ledger import services as ledger_services
 from src.domain.ledger import models as ledger_models
 from src.domain.ledger import schemas as ledger_schemas
+from src.domain.ledger.integrity import run_integrity_check
 from src.domain.billing import models as billing_models
 from src.domain.loans import models as loan_models
 from src.domain.investments import models as inv_models
 from src.domain.investments import services as inv_services
 from src.domain.investments import schemas as inv_schemas
 from src.domain.fraud.training import FraudTraining
+from src.domain.fraud.outbox import fraud_outbox
 from src.domain.regulatory.services import RegulatoryService
 from src.domain.ml.services import MlService
 from src.core.config import settings
@@ -191,6 +193,11 @@ async def _run_fraud_training():
         await FraudTraining.train(db)
 
 
+async def _run_fraud_outbox():
+    # Rede de seguranca do dispatcher da API: drena o que ficou pendente
+    await fraud_outbox.dispatch_pending()
+
+
 async def _run_regulatory_reports():
     async with async_session() as db:
         period = datetime.utcnow().strftime("%Y-%m")
@@ -198,6 +205,20 @@ async def _run_regulatory_reports():
         await RegulatoryService.generate_coaf_report(db, period)
 
 
+async def _run_ledger_chain_anchor():
+    async with async_session() as db:
+        await ledger_services.LedgerService.anchor_chain_heads(db)
+
+
+async def _run_ledger_balance_snapshots():
+    async with async_session() as db:
+        await ledger_services.LedgerService.compact_balance_snapshots(db)
+
+
+async def _run_ledger_integrity_full():
+    await run_integrity_check(full=True)
+
+
 async def _run_ml_training():
     async with async_session() as db:
         await MlService.train_churn(db)
@@ -244,6 +265,11 @@ def fraud_training_task():
     asyncio.run(_run_fraud_training())
 
 
+@celery_app.task
+def fraud_outbox_task():
+    asyncio.run(_run_fraud_outbox())
+
+
 @celery_app.task
 def regulatory_reports_task():
     asyncio.run(_run_regulatory_reports())
@@ -254,6 +280,21 @@ def ml_training_task():
     asyncio.run(_run_ml_training())
 
 
+@celery_app.task
+def ledger_chain_anchor_task():
+    asyncio.run(_run_ledger_chain_anchor())
+
+
+@celery_app.task
+def ledger_balance_snapshot_task():
+    asyncio.run(_run_ledger_balance_snapshots())
+
+
+@celery_app.task
+def ledger_integrity_full_task():
+    asyncio.run(_run_ledger_integrity_full())
+
+
 celery_app.conf.beat_schedule.update({
     "reconciliation-daily": {
         "task": "src.domain.tasks.reconciliation_task",
@@ -287,6 +328,10 @@ celery_app.conf.beat_schedule.update({
         "task": "src.domain.tasks.fraud_training_task",
         "schedule": crontab(hour=4, minute=30),
     },
+    "fraud-outbox": {
+        "task": "src.domain.tasks.fraud_outbox_task",
+        "schedule": crontab(minute="*"),
+    },
     "regulatory-reports": {
         "task": "src.domain.tasks.regulatory_reports_task",
         "schedule": crontab(day_of_month="1", hour=5, minute=0),
@@ -295,4 +340,16 @@ celery_app.conf.beat_schedule.update({
         "task": "src.domain.tasks.ml_training_task",
         "schedule": crontab(hour=6, minute=0),
     },
+    "ledger-chain-anchor": {
+        "task": "src.domain.tasks.ledger_chain_anchor_task",
+        "schedule": crontab(minute="*/5"),
+    },
+    "ledger-balance-snapshots": {
+        "task": "src.domain.tasks.ledger_balance_snapshot_task",
+        "schedule": crontab(minute="*/10"),
+    },
+    "ledger-integrity-full": {
+        "task": "src.domain.tasks.ledger_integrity_full_task",
+        "schedule": crontab(day_of_week="sunday", hour=3, minute=30),
+    },
 })
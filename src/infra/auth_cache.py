@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from src.core.config import settings
+from src.infra.policy_cache import PolicyCache
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "auth_cache:invalidate"
+PENDING_KEY = "auth_cache_pending"
+
+
+class AuthContextCache(PolicyCache):
+    """Contexto de autenticacao resolvido (principal) por jti, com TTL curto.
+
+    Alem da chave ("jti", jti), cada entrada fica indexada por usuario e por conta:
+    `invalidate("user", id)` / `invalidate("account", id)` descartam todos os tokens
+    daquele dono, neste processo e nos demais (mesmo pub/sub do PolicyCache).
+    """
+
+    channel = INVALIDATION_CHANNEL
+
+    def __init__(self, ttl_seconds: float | None = None, max_entries: int | None = None):
+        super().__init__(
+            settings.AUTH_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds,
+            settings.AUTH_CACHE_MAX_ENTRIES if max_entries is None else max_entries,
+        )
+        self._owners: dict = {}
+        self._tasks: set = set()
+
+    def _unindex(self, jti: str, principal):
+        for owner in (("user", principal.user_id), ("account", principal.account_id)):
+            jtis = self._owners.get(owner)
+            if jtis is not None:
+                jtis.discard(jti)
+                if not jtis:
+                    del self._owners[owner]
+
+    def put(self, kind: str, key, value):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        key = str(key)
+        self.evict(kind, key)
+        self._entries[(kind, key)] = (time.monotonic() + self.ttl_seconds, value)
+        for owner in (("user", value.user_id), ("account", value.account_id)):
+            self._owners.setdefault(owner, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            (_, old_key), (_, old_value) = self._entries.popitem(last=False)
+            self._unindex(old_key, old_value)
+
+    def get(self, kind: str, key):
+        return super().get(kind, str(key))
+
+    def evict(self, kind: str, key):
+        if kind == "jti":
+            entry = self._entries.pop((kind, str(key)), None)
+            if entry is not None:
+                self._unindex(str(key), entry[1])
+            return
+        for jti in list(self._owners.get((kind, key), ())):
+            self.evict("jti", jti)
+
+    def clear(self):
+        super().clear()
+        self._owners.clear()
+
+    def _schedule(self, keys: set):
+        for kind, key in keys:
+            self.evict(kind, key)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Sessao sincrona fora do event loop (Celery, scripts): os outros processos dependem do TTL
+            logger.info(f"Invalidacao de auth sem event loop; vale o TTL: {sorted(keys, key=str)}")
+            return
+        for kind, key in keys:
+            task = loop.create_task(self.invalidate(kind, key))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Espera as publicacoes de invalidacao em andamento."""
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    def watch(self, model, kind: str, key_attr: str, columns: tuple[str, ...] = ()):
+        """Invalida `(kind, getattr(linha, key_attr))` depois do commit que alterar alguma de `columns`.
+
+        A publicacao so sai no commit: um rollback nao descarta nada e outro processo
+        nao recarrega o valor antigo antes da escrita ficar visivel.
+        """
+        def _mark(mapper, connection, target):
+            state = inspect(target)
+            if not any(state.attrs[column].history.has_changes() for column in columns):
+                return
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault(PENDING_KEY, set()).add((kind, getattr(target, key_attr)))
+
+        event.listen(model, "after_update", _mark)
+
+
+def _after_commit(session):
+    pending = session.info.pop(PENDING_KEY, None)
+    if pending:
+        auth_cache._schedule(pending)
+
+
+def _after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+auth_cache = AuthContextCache()
+event.listen(Session, "after_commit", _after_commit)
+event.listen(Session, "after_rollback", _after_rollback)
@@ -0,0 +1,94 @@
+import abc
+import asyncio
+import contextvars
+import time
+
+from src.infra.instrumentation import current_profile
+
+
+class MicroBatcher(abc.ABC):
+    """Fila + worker que agrupa chamadas concorrentes e processa cada lote de uma vez.
+
+    Uma chamada espera no maximo `window_ms` (ou ate o lote atingir `max_batch`). Cada
+    item do lote e `(item, future, enqueued_at, profile)`; subclasses implementam
+    `_flush(batch)` e resolvem o future de cada chamador com o proprio resultado ou a
+    propria excecao. `queue_max` limita a fila (0 = sem limite).
+    """
+
+    def __init__(self, window_ms: float, max_batch: int, queue_max: int = 0):
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.queue_max = queue_max
+        self._queue: asyncio.Queue | None = None
+        self._worker: asyncio.Task | None = None
+        self._loop = None
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        # Tasks Celery usam asyncio.run (um loop novo por execucao): recria fila e worker
+        if self._worker is None or self._worker.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.queue_max)
+            # Contexto vazio: o worker nao herda o perfil da requisicao que o criou
+            self._worker = loop.create_task(self._run(), context=contextvars.Context())
+
+    async def submit(self, item):
+        self._ensure_worker()
+        future = self._loop.create_future()
+        await self._queue.put((item, future, time.perf_counter(), current_profile()))
+        return await future
+
+    async def _collect(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self._loop.time() + (self.window_ms / 1000.0)
+        while len(batch) < self.max_batch:
+            timeout = deadline - self._loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._collect()
+            try:
+                await self._flush(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    @abc.abstractmethod
+    async def _flush(self, batch: list):
+        ...
+
+    @staticmethod
+    def _fail(batch: list, exc: Exception):
+        for _, future, _, _ in batch:
+            if not future.done():
+                future.set_exception(exc)
+
+    @staticmethod
+    def _resolve(batch: list, results: list):
+        for (_, future, _, _), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def stop(self):
+        if self._worker is None or self._worker.done() or self._loop.is_closed():
+            self._worker = None
+            return
+        if self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
@@ -1,5 +1,4 @@
 import redis.asyncio as redis
-import time
 from src.core.config import settings
 from src.core.money import to_minor_units, from_minor_units
 
@@ -67,23 +66,6 @@ class CacheService:
                 return False
             return True
 
-    # --- RATE LIMITING (SLIDING WINDOW) ---
-    async def check_rate_limit_sliding_window(self, key: str, limit: int, window_seconds: int) -> bool:
-        try:
-            now_ms = int(time.time() * 1000)
-            window_start = now_ms - (window_seconds * 1000)
-            pipe = self.redis.pipeline()
-            pipe.zremrangebyscore(key, 0, window_start)
-            pipe.zadd(key, {str(now_ms): now_ms})
-            pipe.zcard(key)
-            pipe.expire(key, window_seconds)
-            _, _, count, _ = await pipe.execute()
-            return count <= limit
-        except Exception:
-            if settings.STRICT_SECURITY:
-                return False
-            return True
-
     async def incr_with_expire(self, key: str, ttl_seconds: int) -> int:
         try:
             pipe = self.redis.pipeline()
@@ -124,10 +124,11 @@ async def init_db():
                 from src.infra.seed import seed_dev
                 await seed_dev(session)
                 from src.domain.ledger import models as ledger_models
-                seq = await session.get(ledger_models.LedgerSequence, 1)
-                if not seq:
-                    session.add(ledger_models.LedgerSequence(id=1, value=0))
-                    await session.commit()
+                for seq_id in range(1, settings.LEDGER_CHAIN_SHARDS + 1):
+                    seq = await session.get(ledger_models.LedgerSequence, seq_id)
+                    if not seq:
+                        session.add(ledger_models.LedgerSequence(id=seq_id, value=0))
+                await session.commit()
 
             print("Tabelas criadas/sincronizadas.")
             return
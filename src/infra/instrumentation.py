@@ -0,0 +1,161 @@
+import contextlib
+import functools
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+from src.core.config import settings
+from src.infra.metrics import REQUEST_SQL_STATEMENTS, STAGE_LATENCY
+
+try:
+    from opentelemetry import trace
+except Exception:
+    trace = None
+
+logger = logging.getLogger(__name__)
+
+_NOOP = contextlib.nullcontext()
+_stage_children: dict = {}
+_profile: ContextVar["RequestProfile | None"] = ContextVar("request_profile", default=None)
+
+
+class RequestProfile:
+    """Etapas e consultas SQL de uma requisicao, acumuladas pelos `stage()` dentro dela."""
+
+    __slots__ = ("method", "path", "stages", "statements", "started")
+
+    def __init__(self, method: str, path: str):
+        self.method = method
+        self.path = path
+        self.stages: list[tuple[str, float]] = []
+        self.statements = 0
+        self.started = time.perf_counter()
+
+    def breakdown(self) -> dict:
+        """Tempo total (ms) e numero de chamadas por etapa, na ordem da primeira chamada."""
+        result: dict = {}
+        for name, seconds in self.stages:
+            entry = result.setdefault(name, {"ms": 0.0, "calls": 0})
+            entry["ms"] += seconds * 1000
+            entry["calls"] += 1
+        for entry in result.values():
+            entry["ms"] = round(entry["ms"], 3)
+        return result
+
+
+class _Stage:
+    __slots__ = ("name", "start", "span")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.span = None
+
+    def __enter__(self):
+        if settings.INSTRUMENTATION_OTEL_SPANS and trace is not None:
+            self.span = trace.get_tracer(__name__).start_as_current_span(self.name)
+            self.span.__enter__()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        child = _stage_children.get(self.name)
+        if child is None:
+            child = _stage_children.setdefault(self.name, STAGE_LATENCY.labels(stage=self.name))
+        child.observe(elapsed)
+        profile = _profile.get()
+        if profile is not None:
+            profile.stages.append((self.name, elapsed))
+        if self.span is not None:
+            self.span.__exit__(exc_type, exc, tb)
+        return False
+
+
+def stage(name: str):
+    """Mede um trecho do hot path: `with stage("ledger.commit"): ...`.
+
+    Desligado (INSTRUMENTATION_ENABLED=false) devolve sempre o mesmo nullcontext.
+    """
+    if not settings.INSTRUMENTATION_ENABLED:
+        return _NOOP
+    return _Stage(name)
+
+
+def timed(name: str):
+    """Decorator de `stage()` para funcoes async."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            if not settings.INSTRUMENTATION_ENABLED:
+                return await fn(*args, **kwargs)
+            with _Stage(name):
+                return await fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request(method: str, path: str):
+    """Abre o perfil da requisicao (no middleware); devolve o token para `finish_request`."""
+    profile = RequestProfile(method, path)
+    return profile, _profile.set(profile)
+
+
+def finish_request(profile: RequestProfile, token, status_code: int) -> dict | None:
+    """Fecha o perfil: registra as consultas SQL e loga o detalhamento das requisicoes lentas amostradas."""
+    _profile.reset(token)
+    elapsed_ms = (time.perf_counter() - profile.started) * 1000
+    REQUEST_SQL_STATEMENTS.labels(path=profile.path, method=profile.method).observe(profile.statements)
+    if elapsed_ms < settings.SLOW_REQUEST_THRESHOLD_MS or random.random() >= settings.SLOW_REQUEST_SAMPLE_RATE:
+        return None
+    report = {
+        "method": profile.method,
+        "path": profile.path,
+        "status": status_code,
+        "total_ms": round(elapsed_ms, 3),
+        "sql_statements": profile.statements,
+        "stages": profile.breakdown(),
+    }
+    logger.warning("Requisicao lenta", extra={"slow_request": report})
+    return report
+
+
+def current_profile() -> RequestProfile | None:
+    return _profile.get()
+
+
+@contextlib.contextmanager
+def attribute_to(profiles):
+    """Trecho rodado por um worker em nome de varias requisicoes (lote do group commit, inferencia).
+
+    Etapas e consultas do trecho sao copiadas para o perfil de cada requisicao do lote
+    (`None` e ignorado); o worker deve rodar com um contexto vazio, para nao herdar o
+    perfil da requisicao que o criou.
+    """
+    profiles = [profile for profile in profiles if profile is not None]
+    if not profiles:
+        yield
+        return
+    batch = RequestProfile("WORKER", "")
+    token = _profile.set(batch)
+    try:
+        yield
+    finally:
+        _profile.reset(token)
+        for profile in profiles:
+            profile.stages.extend(batch.stages)
+            profile.statements += batch.statements
+
+
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    profile = _profile.get()
+    if profile is not None:
+        profile.statements += 1
+
+
+def instrument_engine(engine):
+    """Conta os statements de cada requisicao (evento do engine sincrono; no async, `engine.sync_engine`)."""
+    if not event.contains(engine, "before_cursor_execute", _count_statement):
+        event.listen(engine, "before_cursor_execute", _count_statement)
@@ -44,3 +44,121 @@ LEDGER_INTEGRITY_FAILURES = Counter(
     "ledger_integrity_failures_total",
     "Ledger integrity failures total",
 )
+
+LEDGER_INTEGRITY_SCAN_THROUGHPUT = Gauge(
+    "ledger_integrity_scan_tx_per_second",
+    "Transactions per second verified by the last full-chain scan",
+)
+
+LEDGER_GROUP_COMMIT_BATCH_SIZE = Histogram(
+    "ledger_group_commit_batch_size",
+    "Ledger writes per group-commit batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+LEDGER_GROUP_COMMIT_WAIT = Histogram(
+    "ledger_group_commit_wait_seconds",
+    "Time a ledger write waited in the group-commit queue before its batch started",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+POLICY_CACHE_REQUESTS = Counter(
+    "policy_cache_requests_total",
+    "Policy cache lookups (limits, KYC) by kind and result",
+    ["kind", "result"],
+)
+
+FRAUD_MODEL_LOAD_SECONDS = Histogram(
+    "fraud_model_load_seconds",
+    "Time to load the fraud model artifacts from disk",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+
+FRAUD_MODEL_RELOADS = Counter(
+    "fraud_model_reloads_total",
+    "Fraud model reload attempts by result",
+    ["result"],
+)
+
+FRAUD_MODEL_VERSION = Gauge(
+    "fraud_model_version_info",
+    "Fraud model version currently in service (1 for the active version)",
+    ["version"],
+)
+
+FRAUD_INFERENCE_BATCH_SIZE = Histogram(
+    "fraud_inference_batch_size",
+    "Rows scored per fraud model inference batch",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+
+FRAUD_INFERENCE_WAIT = Histogram(
+    "fraud_inference_wait_seconds",
+    "Time a fraud scoring call waited in the inference queue before its batch started",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25),
+)
+
+FRAUD_OUTBOX_EVENTS = Counter(
+    "fraud_outbox_events_total",
+    "Fraud outbox events processed by result (dispatched, retried, failed)",
+    ["result"],
+)
+
+FRAUD_OUTBOX_LAG = Histogram(
+    "fraud_outbox_lag_seconds",
+    "Time between a fraud decision commit and its side effects being dispatched",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300),
+)
+
+FRAUD_IP_REPUTATION_PREFIXES = Gauge(
+    "fraud_ip_reputation_prefixes",
+    "IPv4/IPv6 prefixes loaded in the IP reputation index",
+)
+
+FRAUD_RULES_RELOADS = Counter(
+    "fraud_rules_reloads_total",
+    "Fraud rule set reload attempts by result",
+    ["result"],
+)
+
+AUDIT_QUEUE_DEPTH = Gauge(
+    "audit_queue_depth",
+    "Audit records waiting in the in-process writer queue",
+)
+
+AUDIT_BATCH_SIZE = Histogram(
+    "audit_batch_size",
+    "Audit records per bulk insert",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512),
+)
+
+AUDIT_RECORDS = Counter(
+    "audit_records_total",
+    "Audit records by outcome (written, dropped)",
+    ["result"],
+)
+
+AUDIT_CHAIN_CONFLICTS = Counter(
+    "audit_chain_conflicts_total",
+    "Audit batches re-chained because another process advanced the chain head",
+)
+
+RATE_LIMIT_DECISIONS = Counter(
+    "rate_limit_decisions_total",
+    "Rate limit decisions by limiter and source (allowed, rejected_local, rejected, error)",
+    ["limiter", "result"],
+)
+
+STAGE_LATENCY = Histogram(
+    "app_stage_latency_seconds",
+    "Hot-path stage latency (lock wait, sequence update, balance sums, fraud scoring, commit)",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+REQUEST_SQL_STATEMENTS = Histogram(
+    "app_request_sql_statements",
+    "SQL statements executed per request",
+    ["path", "method"],
+    buckets=(0, 1, 2, 4, 8, 16, 32, 64, 128),
+)
@@ -0,0 +1,125 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from sqlalchemy import event, inspect
+
+from src.core.config import settings
+from src.infra.metrics import POLICY_CACHE_REQUESTS
+from src.infra.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "policy_cache:invalidate"
+MISSING = object()
+
+
+def snapshot(obj) -> SimpleNamespace | None:
+    """Copia as colunas de uma linha ORM para um objeto solto (sem sessao, sem lazy load)."""
+    if obj is None:
+        return None
+    return SimpleNamespace(**{attr.key: getattr(obj, attr.key) for attr in inspect(obj).mapper.column_attrs})
+
+
+class PolicyCache:
+    """Cache LRU com TTL, por processo, para linhas de politica que quase nunca mudam.
+
+    Guarda snapshots (ou None para "linha inexistente") por (tipo, chave). Escritas
+    invalidam a entrada local e publicam a chave no Redis; cada processo escuta o canal
+    e descarta a propria copia. O TTL limita a janela stale se uma mensagem se perder.
+    """
+
+    channel = INVALIDATION_CHANNEL
+
+    def __init__(self, ttl_seconds: float | None = None, max_entries: int | None = None):
+        self.ttl_seconds = settings.POLICY_CACHE_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self.max_entries = settings.POLICY_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._listener: asyncio.Task | None = None
+
+    def get(self, kind: str, key):
+        entry = self._entries.get((kind, key))
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._entries.pop((kind, key), None)
+            POLICY_CACHE_REQUESTS.labels(kind=kind, result="miss").inc()
+            return MISSING
+        self._entries.move_to_end((kind, key))
+        POLICY_CACHE_REQUESTS.labels(kind=kind, result="hit").inc()
+        return entry[1]
+
+    def put(self, kind: str, key, value):
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[(kind, key)] = (time.monotonic() + self.ttl_seconds, value)
+        self._entries.move_to_end((kind, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def evict(self, kind: str, key):
+        self._entries.pop((kind, key), None)
+
+    def clear(self):
+        self._entries.clear()
+
+    async def invalidate(self, kind: str, key):
+        """Descarta a entrada neste processo e avisa os demais via pub/sub."""
+        self.evict(kind, key)
+        try:
+            await get_redis().publish(self.channel, f"{kind}:{key}")
+        except Exception as exc:
+            logger.warning(f"Falha ao publicar invalidacao de politica {kind}:{key}: {exc}")
+
+    def _apply_message(self, data: str):
+        kind, _, key = data.partition(":")
+        self.evict(kind, int(key) if key.lstrip("-").isdigit() else key)
+
+    async def _listen(self):
+        while True:
+            pubsub = None
+            try:
+                pubsub = get_redis().pubsub()
+                await pubsub.subscribe(self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_message(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                # Mensagens perdidas durante a queda nao sao reentregues: limpa tudo ao reconectar
+                logger.warning(f"Listener de invalidacao de politicas caiu: {exc}")
+                self.clear()
+                await asyncio.sleep(5)
+            finally:
+                if pubsub is not None:
+                    try:
+                        await pubsub.aclose()
+                    except Exception:
+                        pass
+
+    def start_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self._listen())
+
+    async def stop_listener(self):
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except asyncio.CancelledError:
+            pass
+        self._listener = None
+
+    def watch(self, model, kind: str, key_attr: str):
+        """Descarta a entrada local em qualquer flush ORM que altere uma linha de `model`."""
+        def _evict(mapper, connection, target):
+            self.evict(kind, getattr(target, key_attr))
+
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(model, name, _evict)
+
+
+policy_cache = PolicyCache()
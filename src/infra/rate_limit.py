@@ -0,0 +1,142 @@
+import math
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from src.core.config import settings
+from src.infra.cache import cache
+from src.infra.metrics import RATE_LIMIT_DECISIONS
+
+# Token bucket em um hash (tokens, ultimo ms): memoria O(1) por chave e um unico
+# EVALSHA por decisao. O relogio e o do Redis, igual para todas as instancias da API.
+_TOKEN_BUCKET_LUA = """
+if redis.replicate_commands then redis.replicate_commands() end
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil or ts == nil then
+  tokens = capacity
+  ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_ms = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry_ms = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', string.format('%.6f', tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate) + 1000)
+return {allowed, math.floor(tokens), retry_ms}
+"""
+
+
+class LocalBuckets:
+    """Token buckets do processo, com o mesmo limite do bucket no Redis.
+
+    O bucket global ve tudo que este processo teve aceito (e o dos outros), entao
+    se o bucket local esvaziou o global tambem esvaziou: a rejeicao e segura sem
+    ir ao Redis. Chaves menos usadas saem primeiro acima de `max_keys`.
+    """
+
+    def __init__(self, max_keys: int | None = None):
+        self.max_keys = settings.RATE_LIMIT_LOCAL_MAX_KEYS if max_keys is None else max_keys
+        self._buckets: OrderedDict = OrderedDict()
+
+    def take(self, key: str, capacity: float, rate_per_ms: float, now_ms: float | None = None) -> bool:
+        now_ms = time.monotonic() * 1000 if now_ms is None else now_ms
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [capacity, now_ms]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + max(0.0, now_ms - bucket[1]) * rate_per_ms)
+            bucket[1] = now_ms
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def refund(self, key: str, capacity: float):
+        bucket = self._buckets.get(key)
+        if bucket is not None:
+            bucket[0] = min(capacity, bucket[0] + 1)
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class RateLimiter:
+    """Limite `limit` requisicoes por `window_seconds` por identidade (IP, usuario...).
+
+    `hit()` devolve `allowed`, `remaining` e `retry_after` (segundos). Erros do Redis
+    sobem para o chamador decidir (STRICT_SECURITY).
+    """
+
+    def __init__(self, name: str, limit: int, window_seconds: int, local: LocalBuckets | None = None):
+        self.name = name
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.rate_per_ms = limit / (window_seconds * 1000.0)
+        self.local = local or LocalBuckets()
+        self._script_sha: str | None = None
+
+    def _key(self, identity: str) -> str:
+        return f"rl:{self.name}:{identity}"
+
+    async def _script(self, redis, reload: bool = False) -> str:
+        if self._script_sha is None or reload:
+            self._script_sha = await redis.script_load(_TOKEN_BUCKET_LUA)
+        return self._script_sha
+
+    async def _eval(self, key: str) -> list:
+        redis = cache.redis
+        sha = await self._script(redis)
+        try:
+            return await redis.evalsha(sha, 1, key, self.limit, repr(self.rate_per_ms))
+        except Exception as exc:
+            # Redis reiniciado perde o cache de scripts: recarrega uma vez
+            if "NOSCRIPT" not in str(exc):
+                raise
+            sha = await self._script(redis, reload=True)
+            return await redis.evalsha(sha, 1, key, self.limit, repr(self.rate_per_ms))
+
+    async def hit(self, identity: str) -> SimpleNamespace:
+        key = self._key(identity)
+        if not self.local.take(key, self.limit, self.rate_per_ms):
+            RATE_LIMIT_DECISIONS.labels(limiter=self.name, result="rejected_local").inc()
+            return SimpleNamespace(
+                allowed=False, remaining=0, retry_after=max(1, math.ceil(1 / (self.rate_per_ms * 1000)))
+            )
+        try:
+            allowed, remaining, retry_ms = await self._eval(key)
+        except Exception:
+            # Sem resposta do Redis o token volta: a decisao fica com o chamador (STRICT_SECURITY)
+            self.local.refund(key, self.limit)
+            RATE_LIMIT_DECISIONS.labels(limiter=self.name, result="error").inc()
+            raise
+        allowed = bool(int(allowed))
+        if not allowed:
+            # Recusa do Redis nao consome token: o bucket local so conta o que foi aceito,
+            # entao nunca fica mais vazio que o global
+            self.local.refund(key, self.limit)
+        RATE_LIMIT_DECISIONS.labels(limiter=self.name, result="allowed" if allowed else "rejected").inc()
+        retry_after = 0 if allowed else max(1, math.ceil(int(retry_ms) / 1000))
+        return SimpleNamespace(allowed=allowed, remaining=int(remaining), retry_after=retry_after)
+
+
+global_rate_limiter = RateLimiter(
+    "global", settings.RATE_LIMIT_GLOBAL_LIMIT, settings.RATE_LIMIT_GLOBAL_WINDOW_SECONDS
+)
+login_rate_limiter = RateLimiter(
+    "login", settings.RATE_LIMIT_LOGIN_LIMIT, settings.RATE_LIMIT_LOGIN_WINDOW_SECONDS
+)
@@ -26,13 +26,22 @@ from src.api import ml_routes
 from src.api import feature_flags_routes
 from src.infra.database import init_db
 from src.infra.cache import cache
-from src.api.middleware import LedgerMiddleware
+from src.api.middleware import AuditMiddleware, MetricsMiddleware, RateLimitMiddleware
+from src.domain.ledger.audit import audit_writer
 from src.infra.logging import configure_logging
 from src.infra.metrics import TOTAL_BALANCE
-from src.infra.database import async_session
+from src.infra.database import async_engine, async_session
+from src.infra.instrumentation import instrument_engine
 from sqlalchemy import select, func
 from src.domain.ledger import models as ledger_models
 from src.domain.ledger.integrity import run_integrity_check
+from src.domain.ledger.group_commit import group_commit_writer
+from src.infra.auth_cache import auth_cache
+from src.infra.policy_cache import policy_cache
+from src.domain.fraud.ml import inference_batcher, model_registry
+from src.domain.fraud.outbox import fraud_outbox
+from src.domain.fraud.ip_reputation import ip_reputation
+from src.domain.fraud.rules import fraud_rules
 from src.core.config import settings
 import asyncio
 
@@ -64,8 +73,14 @@ if FastAPIInstrumentor and TracerProvider and Resource:
     provider.add_span_processor(processor)
     FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
 
+if settings.INSTRUMENTATION_ENABLED:
+    instrument_engine(async_engine.sync_engine)
+
 # MIDDLEWARES (ordem: ultimo adicionado roda primeiro)
-app.add_middleware(LedgerMiddleware)
+# Rate limit -> audit -> metricas: recusas por rate limit nao sao medidas nem auditadas
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(AuditMiddleware)
+app.add_middleware(RateLimitMiddleware)
 
 # Em dev, deixa permissivo sem credenciais (evita conflito com "*" + credentials)
 app.add_middleware(
@@ -104,10 +119,23 @@ async def startup_event():
 
     if not os.getenv("PYTEST_CURRENT_TEST"):
         asyncio.create_task(ledger_integrity_loop())
+        policy_cache.start_listener()
+        auth_cache.start_listener()
+        fraud_outbox.start()
+        # Carrega os modelos de fraude antes da primeira transferencia, fora do event loop
+        await asyncio.to_thread(model_registry.refresh)
+        await asyncio.to_thread(ip_reputation.refresh)
+        await asyncio.to_thread(fraud_rules.refresh)
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await group_commit_writer.stop()
+    await audit_writer.stop()
+    await inference_batcher.stop()
+    await fraud_outbox.stop()
+    await policy_cache.stop_listener()
+    await auth_cache.stop_listener()
     await cache.close()
 
 
@@ -4,12 +4,24 @@ from httpx import AsyncClient, ASGITransport
 
 os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///./test.db")
 os.environ.setdefault("REDIS_URL", "redis://localhost:6379/0")
+os.environ.setdefault("FRAUD_FEATURE_STORE", "memory")
+os.environ.setdefault("FRAUD_GRAPH_STORE", "memory")
 
 from src.main import app
 from src.core import security
 from src.core.encryption import CryptoService
+from sqlalchemy import delete
+
+from src.domain.fraud import models as fraud_models
+from src.domain.ledger import models as ledger_models, schemas as ledger_schemas
+from src.domain.notifications import models as notification_models
+from src.domain.pix import models as pix_models
+from src.domain.reconciliation import models as reconciliation_models
+from src.domain.regulatory import models as regulatory_models
+from src.domain.security import models as security_models
+from src.domain.settings import models as settings_models
 from src.infra import cache as cache_module
-from src.infra.database import async_engine, Base
+from src.infra.database import async_engine, async_session, Base
 
 
 @pytest.fixture(scope="session", autouse=True)
@@ -19,6 +31,67 @@ async def setup_db_schema():
     yield
 
 
+# Linhas criadas pelos testes de servico; filhas antes das pais, porque o delete() e direto
+CLEANUP_TABLES = (
+    notification_models.Notification,
+    settings_models.NotificationPreference,
+    fraud_models.FraudOutboxEvent,
+    fraud_models.FraudScore,
+    fraud_models.FraudTeamAlert,
+    security_models.SecurityAlert,
+    security_models.Session,
+    regulatory_models.AmlAlert,
+    reconciliation_models.ReconciliationDiscrepancy,
+    reconciliation_models.ReconciliationReport,
+    ledger_models.LedgerIntegrityCheckpoint,
+    ledger_models.LedgerChainAnchor,
+    ledger_models.AccountBalanceSnapshot,
+    ledger_models.Posting,
+    ledger_models.Transaction,
+    pix_models.PixLimit,
+    regulatory_models.KycProfile,
+    settings_models.LimitConfig,
+    ledger_models.Account,
+    ledger_models.User,
+)
+
+
+async def _delete_test_rows(db):
+    for table in CLEANUP_TABLES:
+        await db.execute(delete(table))
+    await db.commit()
+
+
+@pytest.fixture()
+async def db_session():
+    async with async_session() as session:
+        yield session
+        await session.rollback()
+
+
+@pytest.fixture()
+async def clean_db(db_session):
+    """Comeca e termina o teste sem contas, ledger e alertas de outros testes."""
+    await _delete_test_rows(db_session)
+    yield db_session
+    await db_session.rollback()
+    await _delete_test_rows(db_session)
+
+
+@pytest.fixture()
+def account_payload():
+    """`account_payload("101")` monta um AccountCreate unico pelo sufixo (3 primeiros digitos no CPF)."""
+    def build(suffix: str) -> ledger_schemas.AccountCreate:
+        return ledger_schemas.AccountCreate(
+            name=f"User {suffix}",
+            cpf=f"90080070{suffix[:3]}",
+            email=f"user-{suffix}@example.com",
+            password="SenhaForte123",
+            account_type="CHECKING",
+        )
+    return build
+
+
 @pytest.fixture(autouse=True)
 def fast_hashing(monkeypatch):
     def fake_hash(password: str) -> str:
@@ -44,6 +117,76 @@ def fast_hashing(monkeypatch):
     monkeypatch.setattr(cache_module.cache, "set_value", fake_set_value)
     monkeypatch.setattr(cache_module.cache, "delete_key", fake_delete_key)
 
+
+class FakeIdempotencyRedis:
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, name, value, nx=False, ex=None, get=False):
+        previous = self.store.get(name)
+        if not (nx and previous is not None):
+            self.store[name] = value
+        return previous if get else True
+
+    async def get(self, name):
+        return self.store.get(name)
+
+    async def setex(self, name, time, value):
+        self.store[name] = value
+
+    async def delete(self, name):
+        self.store.pop(name, None)
+
+
+@pytest.fixture(autouse=True)
+def fake_idempotency_redis(monkeypatch):
+    from src.domain.ledger import idempotency
+
+    fake = FakeIdempotencyRedis()
+    monkeypatch.setattr(idempotency, "get_redis", lambda: fake)
+    return fake
+
+class FakePublisher:
+    def __init__(self):
+        self.messages = []
+
+    async def publish(self, channel, message):
+        self.messages.append((channel, message))
+        return 0
+
+
+@pytest.fixture(autouse=True)
+def fake_policy_publisher(monkeypatch):
+    from src.infra import policy_cache as policy_cache_module
+    from src.infra.auth_cache import auth_cache
+
+    fake = FakePublisher()
+    monkeypatch.setattr(policy_cache_module, "get_redis", lambda: fake)
+    # Os testes apagam tabelas com delete() direto e os ids sao reaproveitados
+    policy_cache_module.policy_cache.clear()
+    auth_cache.clear()
+    yield fake
+    policy_cache_module.policy_cache.clear()
+    auth_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_feature_store():
+    from src.domain.fraud.features import feature_store
+
+    feature_store.local.clear()
+    yield feature_store
+    feature_store.local.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_transfer_graph():
+    from src.domain.fraud.graph import transfer_graph
+
+    transfer_graph.memory.clear()
+    yield transfer_graph
+    transfer_graph.memory.clear()
+
 # Define que os testes usarao asyncio
 @pytest.fixture(scope="session")
 def anyio_backend():
@@ -56,3 +56,15 @@ async def test_full_ledger_scenario(client: AsyncClient):
     resp_fail = await client.post("/ledger/transactions", json=payload_withdraw, headers=headers)
     assert resp_fail.status_code == 403
     assert "KYC_REQUIRED" in resp_fail.json()["detail"]
+
+    resp_export = await client.get(f"/ledger/accounts/{account_id}/statement/export", headers=headers)
+    assert resp_export.status_code == 200
+    assert resp_export.headers["content-type"].startswith("text/csv")
+    lines = resp_export.text.strip().split("\n")
+    assert lines[0] == "date,amount,type,description"
+    assert len(lines) == 2
+
+    resp_bad_export = await client.get(
+        f"/ledger/accounts/{account_id}/statement/export", params={"start_date": "ontem"}, headers=headers
+    )
+    assert resp_bad_export.status_code == 400
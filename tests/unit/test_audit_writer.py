@@ -0,0 +1,145 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from sqlalchemy import delete, select
+
+from src.domain.ledger import audit as audit_module
+from src.domain.ledger.audit import AuditWriter, audit_hash, audit_writer
+from src.domain.ledger.models import AuditChainHead, AuditLog
+from src.infra.database import async_session
+
+
+def _record(i: int) -> dict:
+    return {
+        "action": "HTTP GET",
+        "user_id": i % 3 or None,
+        "ip_address": "10.0.0.1",
+        "method": "GET",
+        "path": f"/ledger/{i}",
+        "details": "status=200 duration_ms=1",
+        "user_agent": "pytest",
+        "timestamp": datetime.utcnow(),
+    }
+
+
+async def _reset():
+    # Drena o writer global (requisicoes de outros testes) antes de limpar a cadeia
+    await audit_writer.stop()
+    async with async_session() as db:
+        await db.execute(delete(AuditLog))
+        await db.execute(delete(AuditChainHead))
+        await db.commit()
+
+
+async def _assert_chain() -> list:
+    async with async_session() as db:
+        rows = (await db.execute(select(AuditLog).order_by(AuditLog.id))).scalars().all()
+        head = (await db.execute(select(AuditChainHead.record_hash))).scalar()
+    prev = ""
+    for row in rows:
+        record = {
+            "action": row.action,
+            "user_id": row.user_id,
+            "ip_address": row.ip_address,
+            "method": row.method,
+            "path": row.path,
+            "details": row.details,
+            "timestamp": row.timestamp,
+        }
+        assert row.prev_hash == prev
+        assert row.record_hash == audit_hash(record, prev)
+        prev = row.record_hash
+    assert head == prev
+    return rows
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_chained_in_batches(monkeypatch):
+    await _reset()
+    writer = AuditWriter(window_ms=20, max_batch=16)
+    batches = []
+    real_flush = writer._flush
+
+    async def counting_flush(batch):
+        batches.append(len(batch))
+        return await real_flush(batch)
+
+    monkeypatch.setattr(writer, "_flush", counting_flush)
+    assert all(await asyncio.gather(*[writer.enqueue(_record(i)) for i in range(40)]))
+    # Shutdown grava o que ainda estiver na fila
+    await writer.stop()
+
+    rows = await _assert_chain()
+    assert [row.path for row in rows] == [f"/ledger/{i}" for i in range(40)]
+    assert batches == [16, 16, 8]
+
+
+@pytest.mark.asyncio
+async def test_chain_survives_restart_and_other_process_writes():
+    await _reset()
+    first = AuditWriter(window_ms=1)
+    await first.enqueue(_record(0))
+    await first.stop()
+
+    # Outro processo (ou um restart) continua a partir do head persistido
+    second = AuditWriter(window_ms=1)
+    await second.enqueue(_record(1))
+    await second.stop()
+
+    # O head em memoria do primeiro ficou velho: o lote e re-encadeado
+    await first.enqueue(_record(2))
+    await first.stop()
+
+    rows = await _assert_chain()
+    assert [row.path for row in rows] == ["/ledger/0", "/ledger/1", "/ledger/2"]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_applies_backpressure_then_drops(monkeypatch):
+    writer = AuditWriter(queue_max=1, window_ms=1, enqueue_timeout_ms=20)
+    release = asyncio.Event()
+
+    async def blocked_flush(batch):
+        await release.wait()
+        return True
+
+    monkeypatch.setattr(writer, "_flush", blocked_flush)
+    assert await writer.enqueue(_record(0))
+    await asyncio.sleep(0.01)  # worker retira o primeiro e fica preso no flush
+    assert await writer.enqueue(_record(1))
+    assert not await writer.enqueue(_record(2))
+    release.set()
+    await writer.stop()
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_retries_then_drops(monkeypatch):
+    await _reset()
+    failures = {"left": 1}
+
+    def flaky_session():
+        if failures["left"] > 0:
+            failures["left"] -= 1
+            raise RuntimeError("db indisponivel")
+        return async_session()
+
+    monkeypatch.setattr(audit_module, "async_session", flaky_session)
+    writer = AuditWriter(window_ms=1, retries=1)
+    results = []
+    real_flush = writer._flush
+
+    async def recording_flush(batch):
+        results.append(await real_flush(batch))
+        return results[-1]
+
+    monkeypatch.setattr(writer, "_flush", recording_flush)
+    await writer.enqueue(_record(0))
+    await writer.stop()
+    failures["left"] = 5
+    await writer.enqueue(_record(1))
+    await writer.stop()
+    assert results == [True, False]
+    rows = await _assert_chain()
+    assert [row.path for row in rows] == ["/ledger/0"]
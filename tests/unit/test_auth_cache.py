@@ -0,0 +1,135 @@
+import secrets
+from types import SimpleNamespace
+
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.api import deps
+from src.core import security
+from src.domain.compliance.services import ComplianceService
+from src.domain.ledger import models, schemas, services
+from src.domain.security.services import SecurityService
+from src.infra.auth_cache import INVALIDATION_CHANNEL, AuthContextCache, auth_cache
+from src.infra.cache import cache
+from src.infra.database import async_engine
+from src.infra.policy_cache import MISSING
+
+
+async def _login(db: AsyncSession, suffix: str):
+    acc = await services.LedgerService.create_account(
+        db,
+        schemas.AccountCreate(
+            name=f"User {suffix}",
+            cpf=f"77766655{suffix[:3]}",
+            email=f"auth-{suffix}@example.com",
+            password="SenhaForte123",
+            account_type="CHECKING",
+        ),
+    )
+    jti = secrets.token_urlsafe(16)
+    session = await SecurityService.create_session(
+        db, acc.user_id, jti=jti, user_agent="pytest", ip_address="127.0.0.1", device_fingerprint=None, expires_at=None
+    )
+    token = security.create_access_token(acc.user_id, account_id=acc.id, extra_claims={"jti": jti})
+    return acc.id, acc.user_id, session.id, jti, token
+
+
+class _StatementCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_cache_hit_resolves_principal_without_queries(db_session: AsyncSession):
+    account_id, user_id, _, jti, token = await _login(db_session, "801")
+
+    principal = await deps.get_current_principal(token, db_session)
+    assert (principal.id, principal.user_id, principal.status, principal.mfa_enabled) == (
+        account_id, user_id, "ACTIVE", False
+    )
+
+    counter = _StatementCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+    try:
+        assert await deps.get_current_principal(token, db_session) is principal
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+    assert counter.count == 0
+
+    # Rotas que precisam do objeto ORM continuam recebendo a conta com o owner
+    account = await deps.get_current_account(principal, db_session)
+    assert account.owner.id == user_id
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_revoke_session_and_status_changes_invalidate(db_session: AsyncSession, fake_policy_publisher):
+    account_id, user_id, session_id, jti, token = await _login(db_session, "802")
+    await deps.get_current_principal(token, db_session)
+
+    account = await db_session.get(models.Account, account_id)
+    account.status = "BLOCKED"
+    await db_session.commit()
+    await auth_cache.drain()
+    assert (INVALIDATION_CHANNEL, f"account:{account_id}") in fake_policy_publisher.messages
+    assert auth_cache.get("jti", jti) is MISSING
+    assert (await deps.get_current_principal(token, db_session)).status == "BLOCKED"
+
+    await SecurityService.revoke_session(db_session, session_id, user_id)
+    await auth_cache.drain()
+    assert (INVALIDATION_CHANNEL, f"jti:{jti}") in fake_policy_publisher.messages
+    with pytest.raises(HTTPException) as exc:
+        await deps.get_current_principal(token, db_session)
+    assert exc.value.status_code == 401
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_anonymize_user_invalidates_every_token(db_session: AsyncSession, fake_policy_publisher):
+    _, user_id, _, jti, token = await _login(db_session, "803")
+    await deps.get_current_principal(token, db_session)
+
+    await ComplianceService.anonymize_user(db_session, user_id)
+    await auth_cache.drain()
+    assert (INVALIDATION_CHANNEL, f"user:{user_id}") in fake_policy_publisher.messages
+    assert auth_cache.get("jti", jti) is MISSING
+    with pytest.raises(HTTPException):
+        await deps.get_current_principal(token, db_session)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_blacklisted_token_is_rejected(db_session: AsyncSession, monkeypatch):
+    *_, token = await _login(db_session, "804")
+
+    async def blacklisted(jti):
+        return True
+
+    monkeypatch.setattr(cache, "is_jti_blacklisted", blacklisted)
+    with pytest.raises(HTTPException) as exc:
+        await deps.get_current_principal(token, db_session)
+    assert exc.value.detail == "Token revogado. Faca login novamente."
+
+
+def test_owner_index_lru_and_remote_invalidation():
+    cache_ = AuthContextCache(ttl_seconds=60, max_entries=2)
+    cache_.put("jti", "a", SimpleNamespace(user_id=1, account_id=10))
+    cache_.put("jti", "b", SimpleNamespace(user_id=1, account_id=11))
+    cache_.put("jti", "c", SimpleNamespace(user_id=2, account_id=20))
+    # "a" era a entrada menos usada e saiu tambem dos indices
+    assert cache_.get("jti", "a") is MISSING
+    assert ("account", 10) not in cache_._owners
+
+    cache_._apply_message("user:1")
+    assert cache_.get("jti", "b") is MISSING
+    assert cache_.get("jti", "c").user_id == 2
+    cache_._apply_message("jti:c")
+    assert cache_.get("jti", "c") is MISSING
+    assert cache_._owners == {}
@@ -0,0 +1,79 @@
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.ledger import models, schemas, services
+from src.domain.reconciliation import models as reconciliation_models
+from src.domain.reconciliation.services import ReconciliationService
+
+
+async def _tx(db: AsyncSession, account_id: int, key: str, amount: float, tx_type: str = "DEPOSIT"):
+    data = schemas.TransactionCreate(account_id=account_id, amount=amount, type=tx_type, idempotency_key=key)
+    return await services.LedgerService.create_transaction(db, data, otp=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_balance_reads_snapshot_plus_delta(db_session: AsyncSession, account_payload):
+    acc = await services.LedgerService.create_account(db_session, account_payload("701"))
+    account_id = acc.id
+    for i in range(4):
+        await _tx(db_session, account_id, f"idem-snap-{i}", 25.0)
+
+    # A conta e a sub-conta de sistema tem 4 postings cada
+    compacted = await services.LedgerService.compact_balance_snapshots(db_session, min_postings=4)
+    assert compacted == 2
+    res = await db_session.execute(
+        select(models.AccountBalanceSnapshot).where(models.AccountBalanceSnapshot.account_id == account_id)
+    )
+    snap = res.scalar_one()
+    assert float(snap.balance) == pytest.approx(100.0)
+    assert snap.posting_count == 4
+
+    await _tx(db_session, account_id, "idem-snap-wd", 30.0, tx_type="WITHDRAW")
+    bal = await services.LedgerService.get_balance(db_session, account_id, use_cache=False)
+    assert float(bal) == pytest.approx(70.0)
+    balances = await services.LedgerService._posting_balances(db_session, {account_id: acc})
+    assert float(balances[account_id]) == pytest.approx(70.0)
+
+    with pytest.raises(HTTPException) as exc:
+        await _tx(db_session, account_id, "idem-snap-wd-big", 80.0, tx_type="WITHDRAW")
+    assert exc.value.status_code == 422
+
+    # Sem postings novos suficientes o compactador nao toca a conta
+    assert await services.LedgerService.compact_balance_snapshots(db_session, min_postings=2) == 0
+    snap = await services.LedgerService.compact_balance_snapshot(db_session, account_id)
+    assert snap.posting_count == 5
+    assert float(snap.balance) == pytest.approx(70.0)
+    assert float(await services.LedgerService.get_balance(db_session, account_id, use_cache=False)) == pytest.approx(70.0)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_reconciliation_discards_diverging_snapshot(db_session: AsyncSession, account_payload):
+    acc = await services.LedgerService.create_account(db_session, account_payload("702"))
+    account_id = acc.id
+    await _tx(db_session, account_id, "idem-snap-rec-a", 40.0)
+    await _tx(db_session, account_id, "idem-snap-rec-b", 10.0)
+    await services.LedgerService.compact_balance_snapshot(db_session, account_id)
+
+    await db_session.execute(
+        text("UPDATE account_balance_snapshots SET balance = 999 WHERE account_id = :id"),
+        {"id": account_id},
+    )
+    await db_session.commit()
+    assert float(await services.LedgerService.get_balance(db_session, account_id, use_cache=False)) == pytest.approx(999.0)
+
+    report = await ReconciliationService.run_reconciliation(db_session)
+    assert report.discrepancies == 1
+    res = await db_session.execute(select(reconciliation_models.ReconciliationDiscrepancy))
+    discrepancy = res.scalar_one()
+    assert discrepancy.source == "BALANCE_SNAPSHOT"
+    assert discrepancy.account_id == account_id
+    assert float(discrepancy.expected_balance) == pytest.approx(50.0)
+
+    res = await db_session.execute(select(models.AccountBalanceSnapshot))
+    assert res.scalars().all() == []
+    assert float(await services.LedgerService.get_balance(db_session, account_id, use_cache=False)) == pytest.approx(50.0)
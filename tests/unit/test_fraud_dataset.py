@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.fraud.dataset import FraudDataset
+from src.domain.fraud.engine import FEATURE_LABELS, FraudEngine
+from src.domain.ledger import schemas, services
+from src.domain.security import models as security_models
+from src.infra.database import async_engine
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_vectorized_dataset_matches_online_features(
+    db_session: AsyncSession, account_payload, clear_feature_store, tmp_path
+):
+    acc_a = await services.LedgerService.create_account(db_session, account_payload("941"))
+    acc_b = await services.LedgerService.create_account(db_session, account_payload("942"))
+    a, b = acc_a.id, acc_b.id
+    for i, ip in enumerate(["10.1.1.1", "10.1.1.2", "10.1.1.1"]):
+        db_session.add(security_models.Session(user_id=acc_a.user_id, jti=f"dataset-{i}", ip_address=ip))
+    await db_session.commit()
+
+    operations = [
+        ("DEPOSIT", a, None, 500.0),
+        ("DEPOSIT", b, None, 200.0),
+        ("TRANSFER", a, b, 50.0),
+        ("TRANSFER", b, a, 20.0),
+        ("TRANSFER", a, b, 30.0),
+        ("DEPOSIT", a, None, 0.5),
+    ]
+    online = []
+    for i, (kind, source, target, amount) in enumerate(operations):
+        # O que o motor online ve imediatamente antes de cada transacao
+        features, _ = await FraudEngine.build_features(db_session, source, amount, "127.0.0.1", "", None)
+        online.append(features)
+        if kind == "DEPOSIT":
+            data = schemas.TransactionCreate(account_id=source, amount=amount, type=kind, idempotency_key=f"ds-{i}")
+            await services.LedgerService.create_transaction(db_session, data, otp=None)
+        else:
+            data = schemas.TransferCreate(from_account_id=source, to_account_id=target, amount=amount, idempotency_key=f"ds-{i}")
+            await services.LedgerService.process_transfer(db_session, data, otp=None)
+    online = np.array(online, dtype=float)
+
+    X, y = await FraudDataset.build(db_session, days=1, cache_dir=str(tmp_path))
+    assert X.shape == (len(operations), len(FEATURE_LABELS))
+    delta = FEATURE_LABELS.index("last_tx_delta")
+    exact = [i for i in range(len(FEATURE_LABELS)) if i != delta]
+    np.testing.assert_allclose(X[:, exact], online[:, exact], rtol=1e-9, atol=1e-9)
+    np.testing.assert_allclose(X[:, delta], online[:, delta], atol=2)
+    assert X[4, FEATURE_LABELS.index("net_cycle")] == 1
+    assert X[5, FEATURE_LABELS.index("dust_tx")] == 1
+    expected_y = [1 if FraudEngine._rule_score(list(row), list(FEATURE_LABELS))[0] >= 60 else 0 for row in online]
+    assert list(y) == expected_y
+
+    # Segunda execucao: so a consulta da chave e o dataset vem do memmap
+    statements = []
+
+    def log(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", log)
+    try:
+        cached_X, cached_y = await FraudDataset.build(db_session, days=1, cache_dir=str(tmp_path))
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", log)
+    assert len(statements) == 1
+    assert isinstance(cached_X, np.memmap)
+    np.testing.assert_array_equal(cached_X, X)
+    np.testing.assert_array_equal(cached_y, y)
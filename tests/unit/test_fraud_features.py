@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.fraud.engine import FraudEngine
+from src.domain.fraud.features import FeatureState, LocalFeatureStore, epoch_seconds
+from src.domain.ledger import schemas, services
+from src.infra.database import async_engine
+
+
+def test_windows_and_welford_match_direct_computation():
+    store = LocalFeatureStore()
+    now = epoch_seconds(datetime(2026, 3, 10, 15, 30, 5))
+    rng = np.random.default_rng(7)
+    offsets = [5, 30, 200, 500, 1800, 3000, 7200, 40000, 82000, 90000, 200000]
+    amounts = rng.uniform(1, 500, len(offsets)).round(2)
+    for offset, amount in sorted(zip(offsets, amounts), key=lambda item: -item[0]):
+        store.record(1, now - offset, float(amount), payee_id=offset % 3)
+
+    features = store.read(1, now)
+    assert features["tx_1m"] == 2
+    assert features["tx_10m"] == 4
+    assert features["tx_1h"] == 6
+    # A janela de 24h e alinhada a hora: 82000s atras ainda entra, 90000s ja saiu
+    in_day = amounts[[i for i, offset in enumerate(offsets) if offset <= 82000]]
+    assert features["tx_24h"] == len(in_day)
+    assert features["avg_24h"] == pytest.approx(float(np.mean(in_day)))
+    assert features["std_24h"] == pytest.approx(float(np.std(in_day)))
+    assert features["last_tx_ts"] == now - 5
+    assert features["distinct_payees_24h"] == 3
+
+    # Estado de outra conta nao vaza e lancamento mais antigo que o slot e ignorado
+    fields = {}
+    FeatureState.apply(fields, now, 10.0)
+    FeatureState.apply(fields, now - 3600 * 24, 99.0)
+    assert FeatureState.read(fields, now)["tx_24h"] == 1
+    assert store.read(2, now)["tx_24h"] == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_build_features_reads_store_and_rebuild_restores_it(
+    db_session: AsyncSession, account_payload, clear_feature_store
+):
+    acc_from = await services.LedgerService.create_account(db_session, account_payload("971"))
+    acc_to = await services.LedgerService.create_account(db_session, account_payload("972"))
+    acc_other = await services.LedgerService.create_account(db_session, account_payload("973"))
+    from_id, to_id, other_id = acc_from.id, acc_to.id, acc_other.id
+
+    deposit = schemas.TransactionCreate(account_id=from_id, amount=300.0, type="DEPOSIT", idempotency_key="feat-dep")
+    await services.LedgerService.create_transaction(db_session, deposit, otp=None)
+    for i, (payee, amount) in enumerate([(to_id, 10.0), (other_id, 20.0), (to_id, 30.0)]):
+        data = schemas.TransferCreate(
+            from_account_id=from_id, to_account_id=payee, amount=amount, idempotency_key=f"feat-tr-{i}"
+        )
+        await services.LedgerService.process_transfer(db_session, data, otp=None)
+
+    statements = []
+
+    def log(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", log)
+    try:
+        features, labels = await FraudEngine.build_features(db_session, from_id, 50.0, "10.0.0.1", "ua", None)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", log)
+    live = dict(zip(labels, features))
+    # Nenhuma varredura do historico da conta nem dos postings (sinais de rede vem do grafo)
+    assert not [s for s in statements if s.startswith("SELECT transactions.")]
+    assert not [s for s in statements if "FROM postings" in s]
+    assert live["tx_24h"] == 4
+    assert live["tx_1m"] == 4
+    assert live["distinct_payees_24h"] == 2
+    assert live["avg_24h"] == pytest.approx(90.0)
+    assert live["std_24h"] == pytest.approx(float(np.std([300.0, 10.0, 20.0, 30.0])))
+
+    clear_feature_store.local.clear()
+    cold = await clear_feature_store.read(from_id)
+    assert cold["tx_24h"] == 0
+
+    summary = await clear_feature_store.rebuild(db_session, batch_size=2)
+    assert summary == {"transactions": 4, "accounts": 1, "duration_ms": summary["duration_ms"]}
+    rebuilt = await clear_feature_store.read(from_id)
+    for name in ("tx_1h", "tx_24h", "distinct_payees_24h"):
+        assert rebuilt[name] == live[name]
+    assert rebuilt["avg_24h"] == pytest.approx(live["avg_24h"])
+    assert rebuilt["std_24h"] == pytest.approx(live["std_24h"])
+
+    # Conta sem lancamentos no store: ultimo lancamento vem da busca indexada
+    clear_feature_store.local.clear()
+    features, labels = await FraudEngine.build_features(db_session, from_id, 50.0, "10.0.0.1", "ua", None)
+    assert dict(zip(labels, features))["last_tx_delta"] < 60
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.linear_model import LogisticRegression
+
+from src.domain.fraud import ml
+from src.domain.fraud.ml import InferenceBatcher, ModelRegistry
+from src.infra.metrics import FRAUD_MODEL_RELOADS, FRAUD_MODEL_VERSION
+
+
+def _write_models(tmp_path, version: str, mtime: int):
+    rng = np.random.default_rng(3)
+    X = rng.normal(size=(40, 3))
+    y = (X[:, 0] > 0).astype(int)
+    paths = {
+        "if_path": str(tmp_path / "iforest.joblib"),
+        "xgb_path": str(tmp_path / "xgb.joblib"),
+        "version_path": str(tmp_path / "version.json"),
+    }
+    joblib.dump(IsolationForest(n_estimators=5, random_state=1).fit(X), paths["if_path"])
+    joblib.dump(LogisticRegression().fit(X, y), paths["xgb_path"])
+    with open(paths["version_path"], "w") as fh:
+        json.dump({"version": version}, fh)
+    for path in paths.values():
+        os.utime(path, (mtime, mtime))
+    return paths
+
+
+def test_models_load_once_and_hot_swap(tmp_path, monkeypatch):
+    paths = _write_models(tmp_path, "20260101000000", 1_000_000)
+    registry = ModelRegistry(**paths)
+    monkeypatch.setattr(ml, "model_registry", registry)
+    loads = []
+    real_load = joblib.load
+    monkeypatch.setattr(joblib, "load", lambda path: loads.append(path) or real_load(path))
+
+    first = ml.score_models([0.5, 0.1, -0.2])
+    for _ in range(20):
+        assert ml.score_models([0.5, 0.1, -0.2]) == first
+    assert first["version"] == "20260101000000"
+    assert len(loads) == 2
+    assert FRAUD_MODEL_VERSION.labels(version="20260101000000")._value.get() == 1
+
+    # Sem versao nova a checagem e so a leitura do manifesto
+    assert registry.refresh() is False
+    assert len(loads) == 2
+
+    # Artefato reescrito (treino em andamento) sem manifesto novo nao dispara recarga
+    os.utime(paths["if_path"], (1_500_000, 1_500_000))
+    assert registry.refresh() is False
+    assert len(loads) == 2
+
+    _write_models(tmp_path, "20260102000000", 2_000_000)
+    assert registry.refresh() is True
+    assert ml.score_models([0.5, 0.1, -0.2])["version"] == "20260102000000"
+
+    # Artefato corrompido: a versao anterior continua em servico
+    failures = FRAUD_MODEL_RELOADS.labels(result="failure")._value.get()
+    with open(paths["if_path"], "wb") as fh:
+        fh.write(b"not a model")
+    with open(paths["version_path"], "w") as fh:
+        json.dump({"version": "20260103000000"}, fh)
+    assert registry.refresh() is False
+    assert registry.get().version == "20260102000000"
+    assert FRAUD_MODEL_RELOADS.labels(result="failure")._value.get() == failures + 1
+
+
+def test_manifest_names_the_artifacts_to_load(tmp_path, monkeypatch):
+    paths = _write_models(tmp_path, "20260101000000", 1_000_000)
+    registry = ModelRegistry(**paths)
+    assert registry.refresh() is True
+    legacy = registry.get()
+
+    # Trio versionado ao lado dos caminhos fixos; o manifesto passa a apontar para ele
+    rng = np.random.default_rng(5)
+    X = rng.normal(size=(40, 3))
+    joblib.dump(IsolationForest(n_estimators=7, random_state=2).fit(X), str(tmp_path / "iforest-v2.joblib"))
+    joblib.dump(LogisticRegression().fit(X, (X[:, 1] > 0).astype(int)), str(tmp_path / "xgb-v2.joblib"))
+    with open(paths["version_path"], "w") as fh:
+        json.dump({"version": "v2", "iforest": "iforest-v2.joblib", "xgb": "xgb-v2.joblib", "trees": "xgb-v2.npz"}, fh)
+
+    loads = []
+    real_load = joblib.load
+    monkeypatch.setattr(joblib, "load", lambda path: loads.append(path) or real_load(path))
+    assert registry.refresh() is True
+    assert loads == [str(tmp_path / "iforest-v2.joblib"), str(tmp_path / "xgb-v2.joblib")]
+    assert registry.get().version == "v2"
+    assert registry.get().iforest is not legacy.iforest
+
+
+def test_missing_artifacts_score_rules_only(tmp_path, monkeypatch):
+    registry = ModelRegistry(
+        if_path=str(tmp_path / "missing_if.joblib"),
+        xgb_path=str(tmp_path / "missing_xgb.joblib"),
+        version_path=str(tmp_path / "missing.json"),
+    )
+    monkeypatch.setattr(ml, "model_registry", registry)
+    assert ml.score_models([1.0, 2.0]) == {"iforest": 0.0, "xgb": 0.0, "version": None}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_scores_share_one_batch(tmp_path, monkeypatch):
+    registry = ModelRegistry(**_write_models(tmp_path, "20260101000000", 1_000_000))
+    monkeypatch.setattr(ml, "model_registry", registry)
+    batches = []
+    real_score_batch = ml.score_batch
+    monkeypatch.setattr(ml, "score_batch", lambda rows, loaded: batches.append(len(rows)) or real_score_batch(rows, loaded))
+
+    batcher = InferenceBatcher(window_ms=50, max_batch=8)
+    rows = [[float(i), 0.5 - i / 10, 1.0] for i in range(10)]
+    results = await asyncio.gather(*[batcher.score(row) for row in rows])
+    await batcher.stop()
+
+    # 10 chamadas concorrentes viram um lote cheio (8) e o restante (2)
+    assert batches == [8, 2]
+    for row, result in zip(rows, results):
+        assert result == pytest.approx(real_score_batch([row], registry.get())[0])
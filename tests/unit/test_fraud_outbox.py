@@ -0,0 +1,158 @@
+import json
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import aiosmtplib
+import pytest
+
+from sqlalchemy import event, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.fraud import ml
+from src.domain.fraud import models as fraud_models
+from src.domain.fraud.engine import FraudEngine
+from src.domain.fraud.outbox import fraud_outbox
+from src.domain.ledger import services
+from src.domain.notifications import models as notification_models
+from src.domain.notifications.services import NotificationService
+from src.domain.regulatory import models as regulatory_models
+from src.domain.security import models as security_models
+from src.infra.database import async_engine
+
+
+async def _count(db: AsyncSession, model) -> int:
+    return int((await db.execute(select(func.count()).select_from(model))).scalar())
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_verify_decision_is_durable_and_side_effects_retry(
+    db_session: AsyncSession, account_payload, monkeypatch
+):
+    acc = await services.LedgerService.create_account(db_session, account_payload("951"))
+    account_id = acc.id
+
+    # Regras no teto + xgb 0.5 => score 74 (VERIFY)
+    monkeypatch.setattr(FraudEngine, "_rule_score", staticmethod(lambda features, labels: (100.0, ["HIGH_VALUE"])))
+
+    async def fake_score(features):
+        return {"iforest": 0.0, "xgb": 0.5, "version": "test"}
+
+    monkeypatch.setattr(ml.inference_batcher, "score", fake_score)
+    sent = []
+
+    async def flaky_send(db, user_id, data, commit=True):
+        sent.append(user_id)
+        return SimpleNamespace(status="FAILED" if len(sent) == 1 else "SENT")
+
+    monkeypatch.setattr(NotificationService, "send", staticmethod(flaky_send))
+
+    statements = []
+
+    def log(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", log)
+    try:
+        result = await FraudEngine.evaluate(db_session, account_id, 1000.0, "10.0.0.1", "ua", None)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", log)
+    assert result["action"] == "VERIFY"
+    # No caminho da transferencia so o score e o evento sao gravados
+    inserts = [s for s in statements if s.startswith("INSERT")]
+    assert len(inserts) == 2
+    assert any("fraud_outbox" in s for s in inserts)
+    assert not sent
+
+    first = await fraud_outbox.dispatch_pending()
+    assert first == {"claimed": 1, "dispatched": 0, "retried": 1, "failed": 0}
+    outbox_event = (await db_session.execute(select(fraud_models.FraudOutboxEvent))).scalar_one()
+    assert outbox_event.status == "PENDING"
+    assert outbox_event.attempts == 1
+    # Os alertas internos ja saem na primeira tentativa, mesmo com o e-mail fora do ar
+    assert outbox_event.steps_done == '["aml_alert", "security_alert", "team_alert"]'
+    assert await _count(db_session, regulatory_models.AmlAlert) == 1
+
+    # Antes do backoff vencer o evento nao e reprocessado
+    assert (await fraud_outbox.dispatch_pending())["claimed"] == 0
+    outbox_event.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    await db_session.commit()
+
+    second = await fraud_outbox.dispatch_pending()
+    assert second == {"claimed": 1, "dispatched": 1, "retried": 0, "failed": 0}
+    assert len(sent) == 2
+    # Efeitos ja aplicados na primeira tentativa nao se repetem
+    assert await _count(db_session, security_models.SecurityAlert) == 1
+    assert await _count(db_session, fraud_models.FraudTeamAlert) == 1
+    assert await _count(db_session, regulatory_models.AmlAlert) == 1
+    db_session.expire_all()
+    outbox_event = (await db_session.execute(select(fraud_models.FraudOutboxEvent))).scalar_one()
+    assert outbox_event.status == "DONE"
+
+
+async def _pending_event(db: AsyncSession, account_payload, suffix: str) -> int:
+    acc = await services.LedgerService.create_account(db, account_payload(suffix))
+    event_ = fraud_models.FraudOutboxEvent(
+        event_type="FRAUD_DECISION",
+        payload=json.dumps({"account_id": acc.id, "user_id": acc.user_id, "action": "BLOCK", "score": 90.0, "rules": []}),
+    )
+    db.add(event_)
+    await db.commit()
+    return event_.id
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_failed_email_leaves_no_duplicate_rows(db_session: AsyncSession, account_payload, monkeypatch):
+    event_id = await _pending_event(db_session, account_payload, "952")
+    smtp_up = {"value": False}
+
+    class FakeSMTP:
+        def __init__(self, **kwargs):
+            pass
+
+        async def connect(self):
+            if not smtp_up["value"]:
+                raise ConnectionRefusedError("smtp fora do ar")
+
+        async def sendmail(self, *args):
+            pass
+
+        async def quit(self):
+            pass
+
+    monkeypatch.setattr(aiosmtplib, "SMTP", FakeSMTP)
+    for _ in range(2):
+        assert (await fraud_outbox.dispatch_pending())["retried"] == 1
+        await db_session.execute(
+            update(fraud_models.FraudOutboxEvent).values(next_attempt_at=datetime.utcnow() - timedelta(seconds=1))
+        )
+        await db_session.commit()
+    # O envio que falhou e desfeito pelo rollback: nenhuma linha FAILED acumulada
+    assert await _count(db_session, notification_models.Notification) == 0
+    assert await _count(db_session, regulatory_models.AmlAlert) == 1
+
+    smtp_up["value"] = True
+    assert (await fraud_outbox.dispatch_pending())["dispatched"] == 1
+    statuses = (await db_session.execute(select(notification_models.Notification.status))).scalars().all()
+    assert statuses == ["SENT"]
+    event_ = await db_session.get(fraud_models.FraudOutboxEvent, event_id)
+    await db_session.refresh(event_)
+    assert event_.status == "DONE"
+    assert json.loads(event_.steps_done) == ["aml_alert", "notification", "security_alert", "team_alert"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_event_reclaimed_after_lease_expired_is_skipped(db_session: AsyncSession, account_payload):
+    event_id = await _pending_event(db_session, account_payload, "953")
+    ids, lease_until = await fraud_outbox._claim(10)
+    assert ids == [event_id]
+
+    # Outro dispatcher reservou o evento depois que o lease deste lote venceu
+    await db_session.execute(
+        update(fraud_models.FraudOutboxEvent).values(next_attempt_at=lease_until + timedelta(seconds=30))
+    )
+    await db_session.commit()
+    assert await fraud_outbox._process(event_id, lease_until) is None
+    assert await _count(db_session, security_models.SecurityAlert) == 0
@@ -1,4 +1,11 @@
-from src.domain.fraud.engine import FraudEngine
+import json
+import os
+
+import numpy as np
+import pytest
+
+from src.domain.fraud.engine import FEATURE_LABELS, FraudEngine
+from src.domain.fraud.rules import FraudRules, fraud_rules
 
 
 def test_rule_score_flags_multiple_rules():
@@ -8,3 +15,68 @@ def test_rule_score_flags_multiple_rules():
     assert "VALUE_OVER_3SIGMA" in rules
     assert "HIGH_FREQUENCY" in rules
     assert score > 0
+
+
+def _hand_written_rules(mapping: dict) -> tuple[float, list[str]]:
+    # Encadeamento de ifs anterior ao rule set declarativo
+    checks = [
+        ("VALUE_OVER_3SIGMA", mapping["over_3sigma"] == 1),
+        ("HIGH_FREQUENCY", mapping["tx_1m"] >= 3),
+        ("UNKNOWN_DEVICE", mapping["device_known"] == 0),
+        ("SUSPICIOUS_IP", mapping["ip_suspicious"] == 1),
+        ("UNUSUAL_HOUR", mapping["is_night"] == 1),
+        ("SUSPECTED_CYCLE", mapping["net_cycle"] == 1),
+        ("MULE_PATTERN", mapping["net_mule"] == 1),
+        ("NEW_ACCOUNT", mapping["new_account"] == 1),
+        ("SPIKE_10M", mapping["tx_10m_spike"] == 1),
+        ("SPIKE_1H", mapping["tx_1h_spike"] == 1),
+        ("HIGH_VALUE", mapping["high_value_10k"] == 1),
+        ("LOW_BALANCE", mapping["balance_zero"] == 1),
+        ("DUST_TX", mapping["dust_tx"] == 1),
+    ]
+    rules = [code for code, hit in checks if hit]
+    return min(100.0, len(rules) * 12.0 + mapping["zscore"] * 3.0), rules
+
+
+def test_builtin_rule_set_matches_hand_written_rules_for_rows_and_matrix():
+    rng = np.random.default_rng(7)
+    labels = list(FEATURE_LABELS)
+    X = rng.integers(0, 2, size=(500, len(labels))).astype(float)
+    X[:, labels.index("tx_1m")] = rng.integers(0, 6, size=500)
+    X[:, labels.index("zscore")] = rng.normal(0, 4, size=500)
+    scores, fired = fraud_rules.evaluate_matrix(X, labels)
+    codes = fraud_rules.compiled(labels).codes
+    for i, row in enumerate(X):
+        expected_score, expected_rules = _hand_written_rules(dict(zip(labels, row)))
+        score, rules = FraudEngine._rule_score(list(row), labels)
+        assert rules == expected_rules
+        assert score == pytest.approx(expected_score)
+        assert scores[i] == pytest.approx(expected_score)
+        assert [codes[j] for j in np.flatnonzero(fired[i])] == expected_rules
+
+
+def test_rule_file_hot_reload_and_invalid_file_keeps_previous(tmp_path):
+    path = tmp_path / "rules.yaml"
+    path.write_text(
+        "version: v1\n"
+        "rules:\n"
+        "  - {code: BIG, feature: amount, op: '>', value: 1000, weight: 70}\n"
+        "  - {code: NIGHT, feature: is_night, op: '==', value: 1, weight: 20}\n"
+    )
+    rules = FraudRules(str(path))
+    labels = ["amount", "is_night"]
+    assert rules.evaluate([5000, 1], labels) == (90.0, ["BIG", "NIGHT"])
+    assert rules.evaluate([10, 0], labels) == (0.0, [])
+
+    path.write_text(json.dumps({"version": "v2", "max_score": 50, "rules": [
+        {"code": "BIG", "feature": "amount", "op": ">=", "value": 10, "weight": 80},
+    ]}))
+    os.utime(path, ns=(1, 1))
+    assert rules.refresh()
+    assert rules.rule_set["version"] == "v2"
+    assert rules.evaluate([10, 1], labels) == (50.0, ["BIG"])
+
+    path.write_text("version: v3\nrules:\n  - {code: X, feature: amount, op: '~', value: 1}\n")
+    os.utime(path, ns=(2, 2))
+    assert not rules.refresh()
+    assert rules.rule_set["version"] == "v2"
@@ -0,0 +1,68 @@
+import json
+import os
+
+import joblib
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from xgboost import XGBClassifier
+
+from src.domain.fraud import ml
+from src.domain.fraud.ml import ModelRegistry
+from src.domain.fraud.trees import TreeEnsemble, export_xgboost
+
+
+def _training_data(rows: int = 600, width: int = 6):
+    rng = np.random.default_rng(11)
+    X = rng.normal(size=(rows, width))
+    y = ((X[:, 0] + X[:, 1] * X[:, 2]) > 0.2).astype(int)
+    # Valores ausentes exercitam o ramo default de cada split
+    X[::9, 2] = np.nan
+    return X, y
+
+
+def test_native_scorer_matches_predict_proba(tmp_path):
+    X, y = _training_data()
+    model = XGBClassifier(n_estimators=60, max_depth=4, learning_rate=0.1, subsample=0.9, random_state=42).fit(X, y)
+    trees = export_xgboost(model)
+    trees.save(str(tmp_path / "xgb.npz"))
+    loaded = TreeEnsemble.load(str(tmp_path / "xgb.npz"))
+
+    expected = model.predict_proba(X)
+    np.testing.assert_allclose(loaded.predict_proba(X), expected, atol=1e-6)
+    np.testing.assert_allclose(loaded.predict_proba(X[:1]), expected[:1], atol=1e-6)
+    assert loaded.n_features_in_ == X.shape[1]
+
+
+def test_registry_serves_exported_trees_without_loading_xgboost_model(tmp_path, monkeypatch):
+    X, y = _training_data()
+    paths = {
+        "if_path": str(tmp_path / "iforest.joblib"),
+        "xgb_path": str(tmp_path / "xgb.joblib"),
+        "version_path": str(tmp_path / "version.json"),
+    }
+    model = XGBClassifier(n_estimators=20, max_depth=3, random_state=42).fit(X, y)
+    joblib.dump(IsolationForest(n_estimators=5, random_state=1).fit(np.nan_to_num(X)), paths["if_path"])
+    joblib.dump(model, paths["xgb_path"])
+    export_xgboost(model).save(str(tmp_path / "xgb.npz"))
+    with open(paths["version_path"], "w") as fh:
+        json.dump({"version": "20260301000000"}, fh)
+
+    registry = ModelRegistry(**paths)
+    monkeypatch.setattr(ml, "model_registry", registry)
+    loads = []
+    real_load = joblib.load
+    monkeypatch.setattr(joblib, "load", lambda path: loads.append(path) or real_load(path))
+
+    row = list(np.nan_to_num(X[3]))
+    scores = ml.score_models(row)
+    assert loads == [paths["if_path"]]
+    assert isinstance(registry.get().xgb, TreeEnsemble)
+    assert abs(scores["xgb"] - float(model.predict_proba(np.array([row]))[0, 1])) < 1e-6
+
+    # Sem o .npz (artefato antigo) o joblib e convertido na carga da proxima versao
+    os.remove(str(tmp_path / "xgb.npz"))
+    with open(paths["version_path"], "w") as fh:
+        json.dump({"version": "20260302000000"}, fh)
+    assert registry.refresh() is True
+    assert isinstance(registry.get().xgb, TreeEnsemble)
+    assert loads[-1] == paths["xgb_path"]
@@ -0,0 +1,147 @@
+import asyncio
+import pytest
+import pytest_asyncio
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import group_commit, models, schemas, services
+from src.infra.database import async_session
+
+
+@pytest_asyncio.fixture(loop_scope="function")
+async def writer(monkeypatch):
+    monkeypatch.setattr(settings, "LEDGER_GROUP_COMMIT_ENABLED", True)
+    instance = group_commit.GroupCommitWriter(window_ms=50, max_batch=64)
+    monkeypatch.setattr(group_commit, "group_commit_writer", instance)
+    batches = []
+    original = services.LedgerService._write_batch
+
+    async def tracking_write_batch(db, items):
+        batches.append(len(items))
+        return await original(db, items)
+
+    monkeypatch.setattr(services.LedgerService, "_write_batch", tracking_write_batch)
+    instance.batches = batches
+    yield instance
+    await instance.stop()
+
+
+async def _run_deposit(account_id: int, key: str, amount: float = 10.0):
+    async with async_session() as session:
+        data = schemas.TransactionCreate(account_id=account_id, amount=amount, type="DEPOSIT", idempotency_key=key)
+        return await services.LedgerService.create_transaction(session, data, otp=None)
+
+
+async def _run_transfer(from_id: int, to_id: int, key: str, amount: float):
+    async with async_session() as session:
+        data = schemas.TransferCreate(
+            from_account_id=from_id, to_account_id=to_id, amount=amount, idempotency_key=key
+        )
+        return await services.LedgerService.process_transfer(session, data, otp=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_concurrent_deposits_share_one_commit(db_session: AsyncSession, account_payload, writer):
+    acc = await services.LedgerService.create_account(db_session, account_payload("301"))
+
+    txs = await asyncio.gather(*[_run_deposit(acc.id, f"idem-gc-301-{i}") for i in range(8)])
+    assert len({tx.id for tx in txs}) == 8
+    assert writer.batches == [8]
+
+    res = await db_session.execute(
+        select(models.Transaction.sequence).where(models.Transaction.account_id == acc.id)
+    )
+    sequences = sorted(row[0] for row in res.all())
+    assert sequences == list(range(sequences[0], sequences[0] + 8))
+
+    integrity = await services.LedgerService.verify_integrity(db_session)
+    assert integrity["ok"] is True
+    bal = await services.LedgerService.get_balance(db_session, acc.id, use_cache=False)
+    assert float(bal) == pytest.approx(80.0)
+
+    replay = await _run_deposit(acc.id, "idem-gc-301-0")
+    assert getattr(replay, "idempotency_hit", False) is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_batched_transfers_get_individual_errors(db_session: AsyncSession, account_payload, writer):
+    acc_from = await services.LedgerService.create_account(db_session, account_payload("302"))
+    acc_to = await services.LedgerService.create_account(db_session, account_payload("303"))
+    await _run_deposit(acc_from.id, "idem-gc-302-dep", amount=100.0)
+    await services.LedgerService._get_user_limits(db_session, acc_from.user_id)
+
+    results = await asyncio.gather(
+        _run_transfer(acc_from.id, acc_to.id, "idem-gc-302-a", 80.0),
+        _run_transfer(acc_from.id, acc_to.id, "idem-gc-302-b", 80.0),
+        _run_deposit(acc_to.id, "idem-gc-303-dep"),
+        _run_deposit(acc_to.id, "idem-gc-303-dep"),
+        return_exceptions=True,
+    )
+    # A chave repetida e barrada pela reserva de idempotencia antes de entrar no lote
+    assert writer.batches[-1] == 3
+    transfer_errors = [r.status_code for r in results[:2] if isinstance(r, HTTPException)]
+    deposit_errors = [r.status_code for r in results[2:] if isinstance(r, HTTPException)]
+    assert transfer_errors == [422]
+    assert deposit_errors == [409]
+
+    bal_from = await services.LedgerService.get_balance(db_session, acc_from.id, use_cache=False)
+    bal_to = await services.LedgerService.get_balance(db_session, acc_to.id, use_cache=False)
+    assert float(bal_from) == pytest.approx(20.0)
+    assert float(bal_to) == pytest.approx(90.0)
+    assert (await services.LedgerService.verify_integrity(db_session))["ok"] is True
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_batch_failure_reaches_every_caller(db_session: AsyncSession, account_payload, writer, monkeypatch):
+    acc = await services.LedgerService.create_account(db_session, account_payload("304"))
+
+    async def boom(db, items):
+        raise RuntimeError("db down")
+
+    monkeypatch.setattr(services.LedgerService, "_write_batch", boom)
+    results = await asyncio.gather(
+        _run_deposit(acc.id, "idem-gc-304-a"),
+        _run_deposit(acc.id, "idem-gc-304-b"),
+        return_exceptions=True,
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_idempotency_conflict_only_fails_the_conflicting_item(
+    db_session: AsyncSession, account_payload, writer, monkeypatch
+):
+    acc = await services.LedgerService.create_account(db_session, account_payload("305"))
+    account_id = acc.id
+    original = services.LedgerService._write_batch
+    calls = []
+
+    async def racing_write_batch(db, items):
+        calls.append(len(items))
+        if len(calls) == 1:
+            # Outro processo grava a chave "a" entre a leitura das chaves e o commit do lote
+            async with async_session() as other:
+                await original(other, [dict(items[0])])
+            raise IntegrityError("INSERT INTO transactions", {}, Exception("UNIQUE constraint failed"))
+        return await original(db, items)
+
+    monkeypatch.setattr(services.LedgerService, "_write_batch", racing_write_batch)
+    results = await asyncio.gather(
+        _run_deposit(account_id, "idem-gc-305-a"),
+        _run_deposit(account_id, "idem-gc-305-b"),
+        return_exceptions=True,
+    )
+    assert calls == [2, 1, 1]
+    assert not any(isinstance(r, Exception) for r in results)
+    assert getattr(results[0], "idempotency_hit", False) is True
+    assert getattr(results[1], "idempotency_hit", False) is False
+    bal = await services.LedgerService.get_balance(db_session, account_id, use_cache=False)
+    assert float(bal) == pytest.approx(20.0)
@@ -0,0 +1,106 @@
+import contextlib
+
+import pytest
+
+from prometheus_client import REGISTRY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import group_commit, schemas, services
+from src.infra import instrumentation
+from src.infra.database import async_engine, async_session
+
+
+def _stage_count(name: str) -> float:
+    return REGISTRY.get_sample_value("app_stage_latency_seconds_count", {"stage": name}) or 0.0
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_transfer_stage_breakdown_and_sql_count(db_session: AsyncSession, account_payload, monkeypatch):
+    monkeypatch.setattr(settings, "INSTRUMENTATION_ENABLED", True)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SAMPLE_RATE", 1.0)
+    instrumentation.instrument_engine(async_engine.sync_engine)
+    acc_from = await services.LedgerService.create_account(db_session, account_payload("701"))
+    acc_to = await services.LedgerService.create_account(db_session, account_payload("702"))
+    from_id, to_id = acc_from.id, acc_to.id
+    deposit = schemas.TransactionCreate(account_id=from_id, amount=100.0, type="DEPOSIT", idempotency_key="stg-dep")
+    await services.LedgerService.create_transaction(db_session, deposit, otp=None)
+    commits_before = _stage_count("ledger.commit")
+
+    profile, token = instrumentation.start_request("POST", "/ledger/transfers")
+    data = schemas.TransferCreate(from_account_id=from_id, to_account_id=to_id, amount=10.0, idempotency_key="stg-1")
+    await services.LedgerService.process_transfer(db_session, data, otp=None)
+    report = instrumentation.finish_request(profile, token, 200)
+
+    assert instrumentation.current_profile() is None
+    for name in ("ledger.lock_wait", "ledger.balance_sum", "ledger.sequence_update", "ledger.flush", "ledger.commit"):
+        assert report["stages"][name]["calls"] >= 1
+    # As consultas rodam no greenlet do SQLAlchemy e ainda caem no perfil da requisicao
+    assert report["sql_statements"] >= 5
+    assert _stage_count("ledger.commit") == commits_before + 1
+
+
+@pytest.mark.asyncio
+async def test_disabled_instrumentation_is_a_noop(monkeypatch):
+    monkeypatch.setattr(settings, "INSTRUMENTATION_ENABLED", False)
+    assert isinstance(instrumentation.stage("ledger.commit"), contextlib.nullcontext)
+
+    @instrumentation.timed("test.disabled")
+    async def work():
+        return 42
+
+    profile, token = instrumentation.start_request("GET", "/x")
+    assert await work() == 42
+    with instrumentation.stage("test.disabled"):
+        pass
+    instrumentation.finish_request(profile, token, 200)
+    assert profile.stages == []
+    assert _stage_count("test.disabled") == 0
+
+
+def test_slow_request_sampling(monkeypatch):
+    monkeypatch.setattr(settings, "INSTRUMENTATION_ENABLED", True)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SAMPLE_RATE", 0.0)
+    profile, token = instrumentation.start_request("GET", "/x")
+    with instrumentation.stage("test.sampled"):
+        pass
+    with instrumentation.stage("test.sampled"):
+        pass
+    assert instrumentation.finish_request(profile, token, 200) is None
+    assert profile.breakdown()["test.sampled"]["calls"] == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_group_commit_worker_reports_to_each_caller(db_session: AsyncSession, account_payload, monkeypatch):
+    monkeypatch.setattr(settings, "INSTRUMENTATION_ENABLED", True)
+    monkeypatch.setattr(settings, "LEDGER_GROUP_COMMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_THRESHOLD_MS", 0)
+    monkeypatch.setattr(settings, "SLOW_REQUEST_SAMPLE_RATE", 1.0)
+    instrumentation.instrument_engine(async_engine.sync_engine)
+    writer = group_commit.GroupCommitWriter(window_ms=20, max_batch=8)
+    monkeypatch.setattr(group_commit, "group_commit_writer", writer)
+    account_id = (await services.LedgerService.create_account(db_session, account_payload("703"))).id
+
+    async def request(key: str):
+        profile, token = instrumentation.start_request("POST", "/ledger/transactions")
+        async with async_session() as session:
+            data = schemas.TransactionCreate(account_id=account_id, amount=5.0, type="DEPOSIT", idempotency_key=key)
+            await services.LedgerService.create_transaction(session, data, otp=None)
+        return profile, instrumentation.finish_request(profile, token, 201)
+
+    try:
+        first_profile, first = await request("stg-gc-1")
+        second_profile, second = await request("stg-gc-2")
+    finally:
+        await writer.stop()
+
+    # O worker foi criado dentro da primeira requisicao, mas nao herda o perfil dela
+    assert first_profile.breakdown()["ledger.commit"]["calls"] == 1
+    for report in (first, second):
+        assert report["stages"]["ledger.commit"]["calls"] == 1
+        assert report["stages"]["ledger.flush"]["calls"] == 1
+    assert first_profile.statements == first["sql_statements"]
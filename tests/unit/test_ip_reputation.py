@@ -0,0 +1,66 @@
+import os
+
+from src.domain.fraud.engine import FEATURE_LABELS, FraudEngine
+from src.domain.fraud.ip_reputation import (
+    CATEGORY_CODES,
+    INVALID,
+    IpReputation,
+    IpReputationIndex,
+    category_code,
+    ip_reputation,
+)
+
+
+def test_longest_prefix_wins_for_nested_ranges():
+    index = IpReputationIndex([
+        ("10.0.0.0/8", "corp", "other"),
+        ("10.1.0.0/16", "vpn-feed", "vpn"),
+        ("10.1.2.0/24", "tor-exits", "tor"),
+        ("10.1.2.128/25", "botnet-c2", "botnet"),
+        ("2001:db8::/32", "v6-hosting", "hosting"),
+        ("2001:db8:1::/48", "v6-proxy", "proxy"),
+    ])
+    assert index.lookup("10.9.9.9").list == "corp"
+    assert index.lookup("10.1.9.9").category == "vpn"
+    assert index.lookup("10.1.2.1").category == "tor"
+    assert index.lookup("10.1.2.200").category == "botnet"
+    # Depois do trecho mais especifico o prefixo que o contem volta a valer
+    assert index.lookup("10.1.3.0").category == "vpn"
+    assert index.lookup("10.2.0.0").list == "corp"
+    assert index.lookup("11.0.0.0") is None
+    assert index.lookup("2001:db8:1::5").prefix == "2001:db8:1::/48"
+    assert index.lookup("2001:db8:2::5").category == "hosting"
+    assert index.lookup("2001:db9::1") is None
+    assert index.lookup("nao-e-ip") is INVALID
+    assert index.size == 6
+
+
+def test_builtin_ranges_keep_previous_suspicious_ip_semantics():
+    assert FraudEngine._is_suspicious_ip("203.0.113.7")
+    assert FraudEngine._is_suspicious_ip("invalid")
+    assert not FraudEngine._is_suspicious_ip("10.0.0.1")
+    assert category_code(ip_reputation.lookup("10.0.0.1")) == CATEGORY_CODES["none"]
+    assert category_code(ip_reputation.lookup("invalid")) == CATEGORY_CODES["invalid"]
+    assert FEATURE_LABELS[-1] == "ip_rep_category"
+
+
+def test_feed_hot_reload_keeps_previous_index_on_error(tmp_path):
+    feed = tmp_path / "feed.csv"
+    feed.write_text("prefix,list,category\n# comentario\n45.0.0.0/16,spamhaus,spam\n45.0.1.0/24\n")
+    reputation = IpReputation(str(feed))
+    assert reputation.lookup("45.0.1.1").list == "feed"
+    assert reputation.lookup("45.0.1.1").category == "suspicious"
+    assert reputation.lookup("45.0.9.9").category == "spam"
+    # Sem feed configurado nao vale mais a faixa embutida
+    assert reputation.lookup("203.0.113.7") is None
+
+    feed.write_text("45.0.0.0/16,spamhaus,spam\n46.0.0.0/8,tor-exits,tor\n")
+    os.utime(feed, ns=(1, 1))
+    assert reputation.refresh()
+    assert reputation.lookup("46.1.1.1").category == "tor"
+    assert not reputation.refresh()
+
+    feed.write_text("nao-e-prefixo,lista,tor\n")
+    os.utime(feed, ns=(2, 2))
+    assert not reputation.refresh()
+    assert reputation.lookup("46.1.1.1").category == "tor"
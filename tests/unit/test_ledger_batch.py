@@ -0,0 +1,97 @@
+import pytest
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.ledger import models, schemas, services
+
+
+def _item(**kwargs):
+    return schemas.LedgerBatchItem(**kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_ingest_batch_reports_per_item_results(db_session: AsyncSession, account_payload):
+    payer = await services.LedgerService.create_account(db_session, account_payload("801"))
+    payee = await services.LedgerService.create_account(db_session, account_payload("802"))
+    payer_id, payee_id = payer.id, payee.id
+
+    items = [_item(type="DEPOSIT", account_id=payer_id, amount=999.0, idempotency_key="batch-fund")]
+    items += [
+        _item(type="TRANSFER", account_id=payer_id, to_account_id=payee_id, amount=50.0, idempotency_key=f"batch-pay-{i}")
+        for i in range(10)
+    ]
+    items += [
+        _item(type="WITHDRAW", account_id=payer_id, amount=600.0, idempotency_key="batch-too-much"),
+        _item(type="DEPOSIT", account_id=payee_id, amount=5.0, idempotency_key="batch-pay-0"),
+        _item(type="TRANSFER", account_id=payer_id, to_account_id=payee_id, amount=1.0, idempotency_key="batch-pay-0"),
+    ]
+    summary = await services.LedgerService.ingest_batch(db_session, items, owner_user_id=payer.user_id)
+
+    assert summary["created"] == 11
+    assert summary["failed"] == 3
+    statuses = [(r["status"], r["status_code"]) for r in summary["results"]]
+    assert statuses[:11] == [("CREATED", 201)] * 11
+    assert statuses[11] == ("ERROR", 422)
+    assert statuses[12] == ("ERROR", 403)
+    assert statuses[13] == ("ERROR", 409)
+
+    bal_payer = await services.LedgerService.get_balance(db_session, payer_id, use_cache=False)
+    bal_payee = await services.LedgerService.get_balance(db_session, payee_id, use_cache=False)
+    assert float(bal_payer) == pytest.approx(499.0)
+    assert float(bal_payee) == pytest.approx(500.0)
+    assert (await services.LedgerService.verify_integrity(db_session))["ok"] is True
+
+    replay = await services.LedgerService.ingest_batch(db_session, items[:3], owner_user_id=payer.user_id)
+    assert replay["duplicates"] == 3
+    assert [r["transaction_id"] for r in replay["results"]] == [r["transaction_id"] for r in summary["results"][:3]]
+    res = await db_session.execute(select(func.count(models.Transaction.id)))
+    assert res.scalar() == 11
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_client_batch_runs_per_item_controls(db_session: AsyncSession, account_payload, monkeypatch):
+    payer = await services.LedgerService.create_account(db_session, account_payload("803"))
+    payee = await services.LedgerService.create_account(db_session, account_payload("804"))
+    payer_id, payee_id = payer.id, payee.id
+    fund = [_item(type="DEPOSIT", account_id=payer_id, amount=900.0, idempotency_key=f"ctl-fund-{i}") for i in range(8)]
+    await services.LedgerService.ingest_batch(db_session, fund)
+
+    evaluated = []
+
+    async def fake_evaluate(db, account_id, amount_units, **kwargs):
+        evaluated.append(account_id)
+        return {"action": "VERIFY" if amount_units == 13 else "ALLOW", "score": 0.0, "rules": []}
+
+    monkeypatch.setattr("src.domain.fraud.engine.FraudEngine.evaluate", fake_evaluate)
+    items = [
+        _item(type="WITHDRAW", account_id=payer_id, amount=1500.0, idempotency_key="ctl-withdraw"),
+        _item(type="TRANSFER", account_id=payer_id, to_account_id=payee_id, amount=5001.0, idempotency_key="ctl-kyc"),
+        _item(type="DEPOSIT", account_id=payer_id, amount=2000.0, idempotency_key="ctl-step-up"),
+        _item(type="TRANSFER", account_id=payer_id, to_account_id=payee_id, amount=13.0, idempotency_key="ctl-fraud"),
+        _item(type="TRANSFER", account_id=payer_id, to_account_id=payee_id, amount=10.0, idempotency_key="ctl-ok"),
+    ]
+    summary = await services.LedgerService.ingest_batch(
+        db_session, items, owner_user_id=payer.user_id, fraud_context={"ip": "10.0.0.1"}
+    )
+
+    assert [(r["status_code"], r.get("detail")) for r in summary["results"]] == [
+        (422, "Limite de saque excedido"),
+        (403, "KYC_REQUIRED"),
+        (403, "MFA_SETUP_REQUIRED"),
+        (401, "FRAUD_VERIFICATION_REQUIRED"),
+        (201, None),
+    ]
+    assert evaluated == [payer_id] * 5
+
+
+def test_batch_item_validation():
+    with pytest.raises(ValueError):
+        _item(type="TRANSFER", account_id=1, amount=10.0, idempotency_key="k")
+    with pytest.raises(ValueError):
+        _item(type="TRANSFER", account_id=1, to_account_id=1, amount=10.0, idempotency_key="k")
+    with pytest.raises(ValueError):
+        schemas.LedgerBatchCreate(items=[])
+    assert _item(type="deposit", account_id=1, amount=1.0, idempotency_key=" k ").type == "DEPOSIT"
@@ -3,6 +3,7 @@ import hashlib
 import pyotp
 import pytest
 
+from fastapi import HTTPException
 from sqlalchemy import delete, select, text
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -385,3 +386,63 @@ async def test_idempotency_handler(monkeypatch):
     await idempotency.IdempotencyHandler.save_response("k1", {"ok": True})
     res = await idempotency.IdempotencyHandler.get_cached_response("k1")
     assert res["ok"] is True
+
+
+@pytest.mark.asyncio
+async def test_idempotency_reservation_and_replay(db_session: AsyncSession, monkeypatch):
+    from src.domain.ledger import idempotency
+
+    class FakeRedis:
+        def __init__(self):
+            self.store = {}
+            self.calls = 0
+
+        async def set(self, name, value, nx=False, ex=None, get=False):
+            self.calls += 1
+            previous = self.store.get(name)
+            if not (nx and previous is not None):
+                self.store[name] = value
+            return previous if get else True
+
+        async def setex(self, name, time, value):
+            self.calls += 1
+            self.store[name] = value
+
+        async def delete(self, name):
+            self.calls += 1
+            self.store.pop(name, None)
+
+    fake = FakeRedis()
+    monkeypatch.setattr(idempotency, "get_redis", lambda: fake)
+    handler = idempotency.IdempotencyHandler
+
+    assert await handler.reserve("k2", namespace="1") == (handler.RESERVED, None)
+    assert await handler.reserve("k2", namespace="1") == (handler.IN_PROGRESS, None)
+    await handler.release("k2", namespace="1")
+    assert await handler.reserve("k2", namespace="1") == (handler.RESERVED, None)
+
+    await _cleanup(db_session)
+    account = await services.LedgerService.create_account(db_session, _account_payload("090"))
+    deposit = schemas.TransactionCreate(
+        account_id=account.id, amount=10.0, type="DEPOSIT", idempotency_key="idem-reserve-090"
+    )
+    tx = await services.LedgerService.create_transaction(db_session, deposit, otp=None)
+    # Reserva + resposta gravada: dois round trips no Redis, nenhuma consulta de idempotencia no banco
+    assert fake.calls == 6
+
+    async def no_db(*args, **kwargs):
+        raise AssertionError("replay nao deve consultar o banco")
+
+    monkeypatch.setattr(services.LedgerService, "_find_transaction_by_idempotency", no_db)
+    replay = await services.LedgerService.create_transaction(db_session, deposit, otp=None)
+    assert replay.id == tx.id
+    assert float(replay.amount) == 10.0
+    assert getattr(replay, "idempotency_hit", False) is True
+
+    withdraw = schemas.TransactionCreate(
+        account_id=account.id, amount=500.0, type="WITHDRAW", idempotency_key="idem-reserve-090-wd"
+    )
+    with pytest.raises(HTTPException):
+        await services.LedgerService.create_transaction(db_session, withdraw, otp=None)
+    # Falha libera a reserva para o cliente tentar de novo
+    assert f"idempotency:{account.id}:idem-reserve-090-wd" not in fake.store
@@ -0,0 +1,172 @@
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import integrity, scanner, schemas, services
+from src.infra.metrics import LEDGER_INTEGRITY_FAILURES, LEDGER_INTEGRITY_OK
+
+
+@pytest.fixture()
+def alerts(monkeypatch):
+    sent = []
+
+    async def fake_alert(event, severity, details):
+        sent.append(event)
+
+    monkeypatch.setattr(integrity, "send_alert", fake_alert)
+    return sent
+
+
+async def _deposit(db: AsyncSession, account_id: int, key: str, amount: float = 10.0):
+    data = schemas.TransactionCreate(account_id=account_id, amount=amount, type="DEPOSIT", idempotency_key=key)
+    return await services.LedgerService.create_transaction(db, data, otp=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_incremental_check_verifies_only_tail(db_session: AsyncSession, account_payload, monkeypatch, alerts):
+    monkeypatch.setattr(settings, "LEDGER_CHAIN_SHARDS", 2)
+    acc = await services.LedgerService.create_account(db_session, account_payload("501"))
+    for i in range(3):
+        await _deposit(db_session, acc.id, f"idem-ckpt-{i}")
+
+    scans = []
+    real_scan = scanner.scan_ledger
+
+    def recording_scan(workers=None, **kwargs):
+        scans.append(workers)
+        return real_scan(workers, **kwargs)
+
+    monkeypatch.setattr(scanner, "scan_ledger", recording_scan)
+    first = await integrity.run_integrity_check()
+    assert first["ok"] is True
+    assert first["mode"] == "FULL"
+    assert first["verified"] == 3
+    # Sem checkpoint a varredura roda no proprio processo da API, sem pool
+    assert scans == [0]
+
+    await _deposit(db_session, acc.id, "idem-ckpt-tail")
+    await services.LedgerService.anchor_chain_heads(db_session)
+    second = await integrity.run_integrity_check()
+    assert second["ok"] is True
+    assert second["mode"] == "INCREMENTAL"
+    assert second["verified"] == 1
+    assert second["count"] == 4
+    assert second["anchors"] == 1
+
+    third = await integrity.run_integrity_check()
+    assert third["verified"] == 0
+    assert third["count"] == 4
+
+    checkpoint = await services.LedgerService.get_latest_integrity_checkpoint(db_session)
+    data = services.LedgerService.integrity_checkpoint_to_dict(checkpoint)
+    assert data["ok"] is True
+    assert data["count"] == 4
+    assert data["anchor_id"] is not None
+
+    full = await integrity.run_integrity_check(full=True)
+    assert full["ok"] is True
+    assert full["count"] == 4
+    assert scans == [0, None]
+    assert alerts == []
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_tampered_tail_fails_and_keeps_last_good_checkpoint(db_session: AsyncSession, account_payload, alerts):
+    acc = await services.LedgerService.create_account(db_session, account_payload("502"))
+    await _deposit(db_session, acc.id, "idem-ckpt-good")
+    assert (await integrity.run_integrity_check())["ok"] is True
+    good = await services.LedgerService.get_latest_integrity_checkpoint(db_session, ok_only=True)
+    good_heads = good.chain_heads
+
+    tx = await _deposit(db_session, acc.id, "idem-ckpt-bad")
+    await db_session.execute(
+        text("UPDATE transactions SET description = 'Adulterada' WHERE id = :id"),
+        {"id": tx.id},
+    )
+    await db_session.commit()
+
+    for _ in range(2):
+        result = await integrity.run_integrity_check()
+        assert result["ok"] is False
+        assert result["reason"] == "HASH_MISMATCH"
+        assert result["tx_id"] == tx.id
+    assert alerts == ["LEDGER_INTEGRITY_FAILURE", "LEDGER_INTEGRITY_FAILURE"]
+
+    db_session.expire_all()
+    latest = await services.LedgerService.get_latest_integrity_checkpoint(db_session)
+    assert latest.ok is False
+    assert latest.chain_heads == good_heads
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_full_check_detects_posting_rewrite_behind_checkpoint(db_session: AsyncSession, account_payload, alerts):
+    acc = await services.LedgerService.create_account(db_session, account_payload("503"))
+    tx = await _deposit(db_session, acc.id, "idem-ckpt-post", amount=50.0)
+    assert (await integrity.run_integrity_check())["ok"] is True
+
+    # Desvia o credito para outra conta sem alterar a soma da transacao
+    other = await services.LedgerService.create_account(db_session, account_payload("504"))
+    await db_session.execute(
+        text("UPDATE postings SET account_id = :other WHERE transaction_id = :tx AND account_id = :acc"),
+        {"other": other.id, "tx": tx.id, "acc": acc.id},
+    )
+    await db_session.commit()
+
+    assert (await integrity.run_integrity_check())["ok"] is True
+    result = await integrity.run_integrity_check(full=True)
+    assert result["ok"] is False
+    assert result["reason"] == "POSTINGS_DIGEST_MISMATCH"
+    assert result["tx_id"] == tx.id
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_full_check_failure_reports_alert_and_metrics(db_session: AsyncSession, account_payload, monkeypatch):
+    sent = []
+
+    async def fake_alert(event, severity, details):
+        sent.append((event, severity, details))
+
+    monkeypatch.setattr(integrity, "send_alert", fake_alert)
+    acc = await services.LedgerService.create_account(db_session, account_payload("505"))
+    tx = await _deposit(db_session, acc.id, "idem-ckpt-report")
+    await db_session.execute(
+        text("UPDATE transactions SET description = 'Adulterada' WHERE id = :id"),
+        {"id": tx.id},
+    )
+    await db_session.commit()
+
+    failures = LEDGER_INTEGRITY_FAILURES._value.get()
+    result = await integrity.run_integrity_check(full=True)
+    assert result["ok"] is False
+    assert result["mode"] == "FULL"
+    assert LEDGER_INTEGRITY_OK._value.get() == 0
+    assert LEDGER_INTEGRITY_FAILURES._value.get() == failures + 1
+    assert len(sent) == 1
+    event, severity, details = sent[0]
+    assert (event, severity) == ("LEDGER_INTEGRITY_FAILURE", "critical")
+    assert "mode=FULL" in details
+    assert f"tx_id={tx.id}" in details
+    assert "reason=HASH_MISMATCH" in details
+
+    latest = await services.LedgerService.get_latest_integrity_checkpoint(db_session)
+    assert latest.ok is False
+
+
+@pytest.mark.asyncio
+async def test_check_error_reports_integrity_error(monkeypatch, alerts):
+    async def broken(db):
+        raise RuntimeError("scanner indisponivel")
+
+    monkeypatch.setattr(services.LedgerService, "verify_integrity_full", staticmethod(broken))
+    failures = LEDGER_INTEGRITY_FAILURES._value.get()
+    result = await integrity.run_integrity_check(full=True)
+    assert result == {"ok": False, "reason": "INTEGRITY_ERROR"}
+    assert alerts == ["LEDGER_INTEGRITY_ERROR"]
+    assert LEDGER_INTEGRITY_OK._value.get() == 0
+    assert LEDGER_INTEGRITY_FAILURES._value.get() == failures + 1
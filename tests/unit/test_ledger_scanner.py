@@ -0,0 +1,89 @@
+import pytest
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import models, scanner, schemas, services
+
+
+async def _seed(db: AsyncSession, account_payload, count: int = 3):
+    accounts = [
+        await services.LedgerService.create_account(db, account_payload(f"6{i:02d}"))
+        for i in range(2)
+    ]
+    txs = []
+    for acc in accounts:
+        for i in range(count):
+            data = schemas.TransactionCreate(
+                account_id=acc.id, amount=10.0, type="DEPOSIT", idempotency_key=f"idem-scan-{acc.id}-{i}"
+            )
+            txs.append(await services.LedgerService.create_transaction(db, data, otp=None))
+    return txs
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("workers", [0, 2])
+@pytest.mark.usefixtures("clean_db")
+async def test_scan_matches_full_verification(db_session: AsyncSession, account_payload, monkeypatch, workers):
+    monkeypatch.setattr(settings, "LEDGER_CHAIN_SHARDS", 2)
+    await _seed(db_session, account_payload)
+    await services.LedgerService.anchor_chain_heads(db_session)
+
+    result = scanner.scan_ledger(workers=workers, range_size=2, batch_size=1)
+    assert result["ok"] is True
+    assert result["count"] == 6
+    assert result["ranges"] >= 3
+    assert result["anchors"] == 1
+    assert result["tx_per_second"] > 0
+
+    full = await services.LedgerService.verify_integrity(db_session)
+    assert full["count"] == result["count"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_scan_detects_rewrite_at_range_boundary(db_session: AsyncSession, account_payload):
+    txs = await _seed(db_session, account_payload)
+    tx = txs[2]
+
+    # Reescrita consistente dentro da propria faixa: so a fronteira com a faixa seguinte denuncia
+    forged_tx = models.Transaction(
+        account_id=tx.account_id,
+        amount=tx.amount,
+        operation_type=tx.operation_type,
+        description="Adulterada",
+        timestamp=tx.timestamp,
+        chain_shard=tx.chain_shard,
+    )
+    forged = services.LedgerService._tx_record_hash(forged_tx, tx.sequence, tx.prev_hash)
+    await db_session.execute(
+        text("UPDATE transactions SET description = 'Adulterada', record_hash = :h WHERE id = :id"),
+        {"h": forged, "id": tx.id},
+    )
+    await db_session.commit()
+
+    result = scanner.scan_ledger(workers=0, range_size=1)
+    assert result["ok"] is False
+    assert result["reason"] == "RANGE_BOUNDARY_MISMATCH"
+    assert result["tx_id"] == txs[3].id
+
+    result = scanner.scan_ledger(workers=0, range_size=100)
+    assert result["ok"] is False
+    assert result["reason"] == "HASH_MISMATCH"
+    assert result["tx_id"] == txs[3].id
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_full_mode_scan_reports_checkpoint_heads(db_session: AsyncSession, account_payload, monkeypatch):
+    monkeypatch.setattr(settings, "LEDGER_CHAIN_SHARDS", 2)
+    await _seed(db_session, account_payload)
+    await services.LedgerService.anchor_chain_heads(db_session)
+
+    result = scanner.scan_ledger(workers=0, range_size=1, expected_digests={})
+    # Com digests cada shard e uma faixa so, para encadear o digest de postings
+    assert result["ranges"] == result["shards"]
+    full = await services.LedgerService.verify_integrity(db_session)
+    assert result["heads"] == full["heads"]
+    assert (result["anchor_id"], result["anchor_hash"]) == (full["anchor_id"], full["anchor_hash"])
@@ -0,0 +1,78 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from httpx import ASGITransport, AsyncClient
+
+from src.api import middleware
+from src.api.middleware import AuditMiddleware, MetricsMiddleware, RateLimitMiddleware
+from src.core import security
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ok")
+    async def ok():
+        return {"ok": True}
+
+    @app.get("/stream")
+    async def stream():
+        return StreamingResponse(iter([b"a", b"b", b"c"]), media_type="text/plain")
+
+    @app.get("/boom")
+    async def boom():
+        raise RuntimeError("falhou")
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok"}
+
+    # Mesma ordem do main: rate limit -> audit -> metricas
+    app.add_middleware(MetricsMiddleware)
+    app.add_middleware(AuditMiddleware)
+    app.add_middleware(RateLimitMiddleware)
+    return app
+
+
+@pytest.mark.asyncio
+async def test_asgi_middlewares_rate_limit_measure_and_audit(monkeypatch):
+    audited = []
+    hits = []
+
+    async def enqueue(record):
+        audited.append(record)
+        return True
+
+    async def hit(identity):
+        hits.append(identity)
+        return SimpleNamespace(allowed=len(hits) <= 3, remaining=0, retry_after=7)
+
+    monkeypatch.setattr(middleware.audit_writer, "enqueue", enqueue)
+    monkeypatch.setattr(middleware.global_rate_limiter, "hit", hit)
+    token = security.create_access_token(42, account_id=1)
+
+    async with AsyncClient(transport=ASGITransport(app=_app()), base_url="http://test") as client:
+        ok = await client.get("/ok", headers={"Authorization": f"Bearer {token}", "X-Forwarded-For": "9.9.9.9, 10.0.0.1"})
+        assert ok.json() == {"ok": True}
+        stream = await client.get("/stream")
+        assert stream.text == "abc"
+        boom = await client.get("/boom")
+        assert boom.status_code == 500
+        assert boom.json() == {"detail": "Erro interno"}
+        limited = await client.get("/ok")
+        assert limited.status_code == 429
+        assert limited.headers["retry-after"] == "7"
+        # Rotas de infraestrutura nao passam pelo rate limit nem pelo audit
+        assert (await client.get("/health")).status_code == 200
+
+    assert hits[0] == "9.9.9.9"
+    assert len(hits) == 4
+    assert [(r["path"], r["details"].split()[0]) for r in audited] == [
+        ("/ok", "status=200"),
+        ("/stream", "status=200"),
+        ("/boom", "status=500"),
+    ]
+    assert audited[0]["user_id"] == 42
+    assert audited[0]["ip_address"] == "9.9.9.9"
@@ -0,0 +1,108 @@
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import schemas, services
+from src.domain.pix import schemas as pix_schemas
+from src.domain.pix.services import PixService
+from src.domain.regulatory import schemas as regulatory_schemas
+from src.domain.regulatory.services import RegulatoryService
+from src.domain.settings import schemas as settings_schemas
+from src.domain.settings.services import SettingsService
+from src.infra.database import async_engine
+from src.infra.policy_cache import INVALIDATION_CHANNEL, MISSING, PolicyCache, policy_cache
+
+
+class _StatementLog:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def touching(self, *tables):
+        return [s for s in self.statements if any(table in s for table in tables)]
+
+
+async def _transfer(db: AsyncSession, from_id: int, to_id: int, key: str, amount: float):
+    data = schemas.TransferCreate(from_account_id=from_id, to_account_id=to_id, amount=amount, idempotency_key=key)
+    return await services.LedgerService.process_transfer(db, data, otp=None)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_transfer_reads_policy_from_cache(db_session: AsyncSession, account_payload, fake_policy_publisher):
+    acc_from = await services.LedgerService.create_account(db_session, account_payload("901"))
+    acc_to = await services.LedgerService.create_account(db_session, account_payload("902"))
+    from_id, to_id, user_id = acc_from.id, acc_to.id, acc_from.user_id
+    deposit = schemas.TransactionCreate(account_id=from_id, amount=500.0, type="DEPOSIT", idempotency_key="pol-dep")
+    await services.LedgerService.create_transaction(db_session, deposit, otp=None)
+
+    # Primeira transferencia cria a linha de limites fora do lock e aquece o cache
+    await _transfer(db_session, from_id, to_id, "pol-1", 10.0)
+    log = _StatementLog()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", log)
+    try:
+        await _transfer(db_session, from_id, to_id, "pol-2", 10.0)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", log)
+    assert log.touching("limit_configs", "kyc_profiles") == []
+
+    await SettingsService.update_limits(
+        db_session,
+        user_id,
+        settings_schemas.LimitConfigUpdate(pix_limit=1000, ted_limit=5, doc_limit=5000, withdrawal_limit=1000),
+    )
+    assert (INVALIDATION_CHANNEL, f"limits:{user_id}") in fake_policy_publisher.messages
+    with pytest.raises(HTTPException) as exc:
+        await _transfer(db_session, from_id, to_id, "pol-3", 10.0)
+    assert exc.value.status_code == 422
+
+    await RegulatoryService.create_kyc(db_session, user_id, regulatory_schemas.KycCreate(document_id="12345678"))
+    assert (INVALIDATION_CHANNEL, f"kyc:{user_id}") in fake_policy_publisher.messages
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_pix_limits_invalidated_on_update(db_session: AsyncSession, account_payload, fake_policy_publisher):
+    acc = await services.LedgerService.create_account(db_session, account_payload("903"))
+    account_id = acc.id
+
+    await PixService._enforce_limits(db_session, account_id, 100.0)
+    assert policy_cache.get("pix_limit", account_id).per_tx_limit == 1000
+
+    await PixService.update_limits(
+        db_session,
+        account_id,
+        pix_schemas.PixLimitUpdate(day_limit=10000, night_limit=1000, per_tx_limit=50, monthly_limit=50000),
+    )
+    assert (INVALIDATION_CHANNEL, f"pix_limit:{account_id}") in fake_policy_publisher.messages
+    with pytest.raises(ValueError):
+        await PixService._enforce_limits(db_session, account_id, 100.0)
+
+
+def test_policy_cache_ttl_lru_and_remote_invalidation(monkeypatch):
+    cache = PolicyCache(ttl_seconds=60, max_entries=2)
+    cache.put("limits", 1, "a")
+    cache.put("limits", 2, "b")
+    assert cache.get("limits", 1) == "a"
+    cache.put("kyc", 1, None)
+    # limits:2 era a entrada menos usada
+    assert cache.get("limits", 2) is MISSING
+    assert cache.get("kyc", 1) is None
+
+    cache._apply_message("kyc:1")
+    assert cache.get("kyc", 1) is MISSING
+
+    clock = {"now": 1000.0}
+    monkeypatch.setattr("src.infra.policy_cache.time.monotonic", lambda: clock["now"])
+    cache.put("limits", 3, "c")
+    clock["now"] += settings.POLICY_CACHE_TTL_SECONDS + 61
+    assert cache.get("limits", 3) is MISSING
+
+    disabled = PolicyCache(ttl_seconds=0)
+    disabled.put("limits", 1, "a")
+    assert disabled.get("limits", 1) is MISSING
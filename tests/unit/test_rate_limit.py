@@ -1,19 +1,123 @@
+import math
+import time
+
 import pytest
-from src.infra.cache import CacheService
+
+from src.core.config import settings
+from src.infra import cache as cache_module
+from src.infra.rate_limit import LocalBuckets, RateLimiter, global_rate_limiter, login_rate_limiter
+
+
+class FakeBucketRedis:
+    """Executa o token bucket do script Lua em Python e conta as idas ao Redis."""
+
+    def __init__(self, noscript_once: bool = False):
+        self.state = {}
+        self.calls = 0
+        self.loads = 0
+        self.noscript_once = noscript_once
+        self.fail = False
+
+    async def script_load(self, script):
+        self.loads += 1
+        return f"sha-{self.loads}"
+
+    async def evalsha(self, sha, numkeys, key, capacity, rate):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("redis fora")
+        if self.noscript_once:
+            self.noscript_once = False
+            raise Exception("NOSCRIPT No matching script")
+        capacity, rate = float(capacity), float(rate)
+        now = time.monotonic() * 1000
+        tokens, ts = self.state.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+        allowed, retry_ms = 0, 0
+        if tokens >= 1:
+            tokens -= 1
+            allowed = 1
+        else:
+            retry_ms = math.ceil((1 - tokens) / rate)
+        self.state[key] = (tokens, now)
+        return [allowed, math.floor(tokens), retry_ms]
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_one_round_trip_and_local_prefilter(monkeypatch):
+    fake = FakeBucketRedis(noscript_once=True)
+    monkeypatch.setattr(cache_module.cache, "redis", fake)
+    limiter = RateLimiter("test", limit=3, window_seconds=60)
+
+    decisions = [await limiter.hit("10.0.0.1") for _ in range(3)]
+    assert all(decision.allowed for decision in decisions)
+    assert [decision.remaining for decision in decisions] == [2, 1, 0]
+    # Um EVALSHA por decisao (mais a repeticao apos o NOSCRIPT)
+    assert fake.calls == 4
+    assert fake.loads == 2
+
+    # Bucket local vazio: recusa sem ir ao Redis
+    blocked = await limiter.hit("10.0.0.1")
+    assert not blocked.allowed
+    assert blocked.retry_after >= 1
+    assert fake.calls == 4
+    # Outra identidade tem o proprio bucket
+    assert (await limiter.hit("10.0.0.2")).allowed
+
+
+@pytest.mark.asyncio
+async def test_processes_share_the_redis_bucket_and_redis_errors_refund(monkeypatch):
+    fake = FakeBucketRedis()
+    monkeypatch.setattr(cache_module.cache, "redis", fake)
+    process_a = RateLimiter("test", limit=3, window_seconds=60, local=LocalBuckets())
+    process_b = RateLimiter("test", limit=3, window_seconds=60, local=LocalBuckets())
+
+    assert (await process_a.hit("ip")).allowed
+    assert (await process_a.hit("ip")).allowed
+    assert (await process_b.hit("ip")).allowed
+    # O bucket global esgotou; o local de A ainda tinha token, entao A consulta o Redis
+    rejected = await process_a.hit("ip")
+    assert not rejected.allowed
+    assert fake.calls == 4
+    # A recusa do Redis devolve o token local: a proxima tambem vai ao Redis
+    assert not (await process_a.hit("ip")).allowed
+    assert fake.calls == 5
+
+    fake.fail = True
+    limiter = RateLimiter("other", limit=1, window_seconds=60)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            await limiter.hit("ip")
+    assert fake.calls == 8
+
+
+def test_login_and_global_quotas_are_separate():
+    assert global_rate_limiter.name != login_rate_limiter.name
+    assert (global_rate_limiter.limit, global_rate_limiter.window_seconds) == (
+        settings.RATE_LIMIT_GLOBAL_LIMIT,
+        settings.RATE_LIMIT_GLOBAL_WINDOW_SECONDS,
+    )
+    assert (login_rate_limiter.limit, login_rate_limiter.window_seconds) == (
+        settings.RATE_LIMIT_LOGIN_LIMIT,
+        settings.RATE_LIMIT_LOGIN_WINDOW_SECONDS,
+    )
+    assert global_rate_limiter._key("1.2.3.4") != login_rate_limiter._key("1.2.3.4")
 
 
 @pytest.mark.asyncio
-async def test_sliding_window_limit():
-    cache = CacheService()
-    key = "test:rl"
+async def test_lua_token_bucket_on_redis():
+    limiter = RateLimiter("test_lua", limit=2, window_seconds=60, local=LocalBuckets())
     try:
-        for _ in range(5):
-            assert await cache.check_rate_limit_sliding_window(key, limit=5, window_seconds=60)
-        assert not await cache.check_rate_limit_sliding_window(key, limit=5, window_seconds=60)
+        await cache_module.cache.delete_key(limiter._key("lua"))
+        first = await limiter.hit("lua")
     except Exception:
         pytest.skip("Redis not available for rate limit test")
+    try:
+        assert first.allowed
+        assert (await limiter.hit("lua")).allowed
+        limiter.local.clear()
+        blocked = await limiter.hit("lua")
+        assert not blocked.allowed
+        assert 1 <= blocked.retry_after <= 30
     finally:
-        try:
-            await cache.delete_key(key)
-        except Exception:
-            pass
+        await cache_module.cache.redis.delete(limiter._key("lua"))
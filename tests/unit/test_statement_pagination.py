@@ -0,0 +1,84 @@
+import csv
+import io
+
+import pytest
+
+from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.domain.ledger import schemas, services
+
+
+async def _seed(db: AsyncSession, account_id: int, owner_user_id: int):
+    # Lotes gravam todas as transacoes com o mesmo timestamp: o id desempata o cursor
+    for batch in range(3):
+        items = [
+            schemas.LedgerBatchItem(
+                type="DEPOSIT",
+                account_id=account_id,
+                amount=float(batch * 10 + i + 1),
+                idempotency_key=f"stmt-{batch}-{i}",
+                description=f"Lote {batch}, item {i}",
+            )
+            for i in range(3)
+        ]
+        await services.LedgerService.ingest_batch(db, items, owner_user_id=owner_user_id)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_statement_keyset_pagination(db_session: AsyncSession, account_payload):
+    acc = await services.LedgerService.create_account(db_session, account_payload("951"))
+    account_id, user_id = acc.id, acc.user_id
+    await _seed(db_session, account_id, user_id)
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        page = await services.LedgerService.get_statement(db_session, account_id, limit=4, cursor=cursor)
+        seen.extend((tx["date"], tx["id"]) for tx in page["transactions"])
+        pages += 1
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert len(seen) == 9
+    assert seen == sorted(seen, reverse=True)
+    assert len(set(seen)) == 9
+
+    page = await services.LedgerService.get_statement(db_session, account_id, tx_type="DEPOSIT", min_amount=20.0)
+    assert [float(tx["amount"]) for tx in page["transactions"]] == [23.0, 22.0, 21.0]
+    assert page["next_cursor"] is None
+
+    with pytest.raises(HTTPException) as exc:
+        await services.LedgerService.get_statement(db_session, account_id, cursor="nao-e-cursor")
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_statement_csv_export_streams_in_chunks(db_session: AsyncSession, account_payload):
+    acc = await services.LedgerService.create_account(db_session, account_payload("952"))
+    account_id, user_id = acc.id, acc.user_id
+    await _seed(db_session, account_id, user_id)
+
+    chunks = [
+        chunk async for chunk in services.LedgerService.stream_statement_csv(account_id, chunk_size=2)
+    ]
+    # Cabecalho sai antes da primeira consulta; depois um pedaco por particao do cursor
+    assert chunks[0] == "date,amount,type,description\n"
+    assert len(chunks) == 6
+    rows = list(csv.reader(io.StringIO("".join(chunks))))
+    assert len(rows) == 10
+    assert rows[1][3] == "Lote 2, item 2"
+
+    filtered = [
+        chunk async for chunk in services.LedgerService.stream_statement_csv(account_id, search="Lote 0")
+    ]
+    assert len(list(csv.reader(io.StringIO("".join(filtered))))) == 4
+
+    # Filtro invalido falha antes do primeiro pedaco: a rota responde 400 em vez de um CSV cortado
+    with pytest.raises(HTTPException) as exc:
+        services.LedgerService.stream_statement_csv(account_id, start_date="ontem")
+    assert exc.value.status_code == 400
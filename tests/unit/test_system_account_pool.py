@@ -0,0 +1,58 @@
+import pytest
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.ledger import models, schemas, services
+from src.domain.reconciliation.services import ReconciliationService
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_deposits_spread_over_system_pool(db_session: AsyncSession, account_payload, monkeypatch):
+    monkeypatch.setattr(settings, "SYSTEM_ACCOUNT_STRIPES", 4)
+    acc = await services.LedgerService.create_account(db_session, account_payload("401"))
+
+    for i in range(12):
+        data = schemas.TransactionCreate(
+            account_id=acc.id, amount=10.0, type="DEPOSIT", idempotency_key=f"idem-pool-{i}"
+        )
+        await services.LedgerService.create_transaction(db_session, data, otp=None)
+    withdraw = schemas.TransactionCreate(
+        account_id=acc.id, amount=20.0, type="WITHDRAW", idempotency_key="idem-pool-wd"
+    )
+    await services.LedgerService.create_transaction(db_session, withdraw, otp=None)
+
+    pool_ids = set(services.LedgerService._system_account_ids.values())
+    assert len(pool_ids) == 4
+    stmt = select(models.Posting.account_id).where(models.Posting.account_id.in_(pool_ids))
+    res = await db_session.execute(stmt)
+    assert len({row[0] for row in res.all()}) > 1
+
+    system = await services.LedgerService.get_system_balance(db_session)
+    assert system["sub_accounts"] == 4
+    assert float(system["balance"]) == pytest.approx(-100.0)
+    assert float(system["postings_balance"]) == pytest.approx(-100.0)
+
+    res_view = await db_session.execute(text("SELECT sub_accounts, balance FROM system_account_balance"))
+    sub_accounts, balance = res_view.one()
+    assert sub_accounts == 4
+    assert float(balance) == pytest.approx(-100.0)
+
+    report = await ReconciliationService.run_reconciliation(db_session)
+    assert report.discrepancies == 0
+    assert report.total_accounts == 2
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_stale_system_account_cache_is_refreshed(db_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(services.LedgerService, "_system_account_ids", {0: 987654})
+    sys_acc = await services.LedgerService._get_system_account(db_session, for_update=True)
+    assert sys_acc.account_number == settings.SYSTEM_ACCOUNT_NUMBER
+    assert services.LedgerService._system_account_ids[0] == sys_acc.id
+
+    again = await services.LedgerService._get_system_account(db_session)
+    assert again.id == sys_acc.id
+    await db_session.commit()
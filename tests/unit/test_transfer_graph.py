@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.config import settings
+from src.domain.fraud.graph import TransferGraph
+from src.domain.ledger import schemas, services
+
+
+@pytest.mark.asyncio
+async def test_bounded_cycles_degrees_and_expiry():
+    graph = TransferGraph(backend="memory")
+    now = datetime.utcnow()
+    # 1 -> 2 -> 1 (ciclo de 2), 10 -> 11 -> 12 -> 10 (3), 20 -> 21 -> 22 -> 23 -> 20 (4)
+    # e 30 -> 31 -> ... -> 34 -> 30 (5, acima do limite padrao de 4)
+    chains = [[1, 2], [10, 11, 12], [20, 21, 22, 23], [30, 31, 32, 33, 34]]
+    await graph.record_many([
+        (chain[i], chain[(i + 1) % len(chain)], now) for chain in chains for i in range(len(chain))
+    ])
+    assert await graph.has_cycle(1, now=now)
+    assert await graph.has_cycle(11, now=now)
+    assert await graph.has_cycle(20, now=now)
+    assert not await graph.has_cycle(30, now=now)
+    assert await graph.has_cycle(30, max_length=5, now=now)
+    assert not await graph.has_cycle(20, max_length=3, now=now)
+
+    # Caminho sem volta nao e ciclo, mesmo com muitas arestas
+    await graph.record_many([(40, 41, now), (41, 42, now), (40, 42, now)])
+    assert not await graph.has_cycle(40, now=now)
+
+    await graph.record_many([(100, 200 + i, now) for i in range(5)] + [(300 + i, 100, now) for i in range(5)])
+    signals = await graph.signals(100, now=now)
+    assert signals == {"cycle": False, "mule": 1, "out_degree": 5, "in_degree": 5}
+
+    # Aresta fora da janela some na leitura
+    old = now - timedelta(days=settings.FRAUD_GRAPH_WINDOW_DAYS, hours=1)
+    await graph.record_many([(50, 51, now), (51, 50, old)])
+    assert not await graph.has_cycle(50, now=now)
+    assert await graph.degrees(51, now=now) == (0, 1)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("clean_db")
+async def test_ledger_transfers_feed_graph_and_rebuild_restores_it(
+    db_session: AsyncSession, account_payload, clear_transfer_graph
+):
+    ids = []
+    for suffix in ("961", "962", "963"):
+        acc = await services.LedgerService.create_account(db_session, account_payload(suffix))
+        ids.append(acc.id)
+    a, b, c = ids
+    for account_id in ids:
+        deposit = schemas.TransactionCreate(
+            account_id=account_id, amount=100.0, type="DEPOSIT", idempotency_key=f"graph-dep-{account_id}"
+        )
+        await services.LedgerService.create_transaction(db_session, deposit, otp=None)
+    for i, (src, dst) in enumerate([(a, b), (b, c), (c, a)]):
+        data = schemas.TransferCreate(from_account_id=src, to_account_id=dst, amount=5.0, idempotency_key=f"graph-tr-{i}")
+        await services.LedgerService.process_transfer(db_session, data, otp=None)
+
+    assert await clear_transfer_graph.has_cycle(a)
+    assert await clear_transfer_graph.degrees(a) == (1, 1)
+
+    clear_transfer_graph.memory.clear()
+    assert not await clear_transfer_graph.has_cycle(a)
+    summary = await clear_transfer_graph.rebuild(db_session, batch_size=2)
+    assert summary == {"transfers": 3}
+    assert await clear_transfer_graph.has_cycle(b)
+    assert await clear_transfer_graph.degrees(c) == (1, 1)